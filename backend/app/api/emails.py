@@ -1,27 +1,56 @@
 """
 Email conversation API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.models import EmailThread, EmailThreadWithMessages, EmailSummary, EmailMessage
+from app.models import EmailThread, EmailThreadWithMessages, EmailSummary, EmailMessage, EmailStatus
 from app.services import email_service
-from app.utils import get_db
+from app.utils import get_db, get_db_context, sse_response
 
 router = APIRouter(prefix="/emails", tags=["emails"])
 
 
 @router.get("/", response_model=List[EmailThread])
-async def list_email_threads(db: Session = Depends(get_db)):
+async def list_email_threads(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    thread_status: Optional[EmailStatus] = Query(None, alias="status"),
+    customer_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    List all email conversation threads
+    List email conversation threads, most recently active first
+    
+    Results are paginated with an opaque cursor: when more threads exist,
+    the X-Next-Cursor response header carries the cursor for the next page.
+    
+    Args:
+        limit: Page size
+        cursor: Cursor from a previous page's X-Next-Cursor header
+        thread_status: Only threads with this status
+        customer_id: Only threads for this customer
     
     Returns list of email threads with basic information
     """
     try:
-        threads = email_service.get_all_threads(db)
+        threads, next_cursor = await email_service.get_all_threads(
+            db,
+            limit=limit,
+            cursor=cursor,
+            status=thread_status,
+            customer_id=customer_id
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return threads
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -30,38 +59,31 @@ async def list_email_threads(db: Session = Depends(get_db)):
 
 
 @router.get("/{thread_id}", response_model=EmailThreadWithMessages)
-async def get_email_thread(thread_id: int, db: Session = Depends(get_db)):
+async def get_email_thread(
+    thread_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Get specific email thread with all messages
+    Get specific email thread with its messages
     
     Args:
         thread_id: Email thread ID
+        limit: Only the latest N messages
+        before: Only messages older than this message_id (for paging back)
         
     Returns:
-        Email thread with complete message history
+        Email thread with message history, oldest first
     """
     try:
-        thread_data = email_service.get_thread_by_id(db, thread_id)
-        if not thread_data:
+        thread = await email_service.get_thread_by_id(db, thread_id, limit=limit, before=before)
+        if not thread:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Email thread {thread_id} not found"
             )
         
-        # Get messages
-        messages = email_service.get_messages_for_thread(db, thread_id)
-        
-        # Build response
-        thread = EmailThreadWithMessages(
-            thread_id=thread_data["thread_id"],
-            subject=thread_data["subject"],
-            customer_name=thread_data.get("customer_name"),
-            customer_email=thread_data.get("customer_email"),
-            status=thread_data.get("status", "open"),
-            message_count=len(messages),
-            messages=messages
-        )
-        
         return thread
         
     except HTTPException:
@@ -74,18 +96,27 @@ async def get_email_thread(thread_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{thread_id}/messages", response_model=List[EmailMessage])
-async def get_thread_messages(thread_id: int, db: Session = Depends(get_db)):
+async def get_thread_messages(
+    thread_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Get all messages for a specific email thread
+    Get messages for a specific email thread
     
     Args:
         thread_id: Email thread ID
+        limit: Only the latest N messages
+        before: Only messages older than this message_id (for paging back)
         
     Returns:
         List of email messages in chronological order
     """
     try:
-        messages = email_service.get_messages_for_thread(db, thread_id)
+        messages = await email_service.get_messages_for_thread(
+            db, thread_id, limit=limit, before=before
+        )
         if not messages:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -102,7 +133,7 @@ async def get_thread_messages(thread_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/{thread_id}/summarize", response_model=EmailSummary)
-async def summarize_email_thread(thread_id: int, db: Session = Depends(get_db)):
+async def summarize_email_thread(thread_id: int, db: AsyncSession = Depends(get_db)):
     """
     Summarize an email thread using Azure GPT-4o
     
@@ -121,7 +152,7 @@ async def summarize_email_thread(thread_id: int, db: Session = Depends(get_db)):
         Structured email summary with extracted information
     """
     try:
-        summary = email_service.summarize_thread(db, thread_id)
+        summary = await email_service.summarize_thread(db, thread_id)
         if not summary:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -135,3 +166,41 @@ async def summarize_email_thread(thread_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to summarize email thread: {str(e)}"
         )
+
+
+@router.post("/{thread_id}/summarize/stream")
+async def stream_email_thread_summary(thread_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Summarize an email thread, streaming progress as server-sent events
+    
+    Events, in order:
+    - started: {"thread_id"} as soon as the thread is found
+    - token: {"stage": "summary", "text"} for each fragment of model output
+      (none when a logged summary is current)
+    - summarized: the EmailSummary
+    - error: {"detail"} if summarization fails, ending the stream
+    
+    Args:
+        thread_id: Email thread ID
+        
+    Returns:
+        text/event-stream response
+    """
+    thread = await email_service.get_thread_by_id(db, thread_id)
+    if not thread:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Email thread {thread_id} not found"
+        )
+    
+    async def produce(emit) -> None:
+        emit("started", {"thread_id": thread_id})
+        # The request session is closed once streaming starts
+        async with get_db_context() as stream_db:
+            summary = await email_service.summarize_thread(
+                stream_db, thread_id, thread=thread,
+                on_token=lambda text: emit("token", {"stage": "summary", "text": text})
+            )
+        emit("summarized", summary)
+    
+    return sse_response(produce, "Failed to summarize email thread")
@@ -1,23 +1,285 @@
 """
 Opportunity API endpoints
 """
+import base64
+import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List, Optional
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import TextClause
+from typing import Any, List, Optional, Tuple
 
-from app.utils import get_db
+from app.services import analytics_service
+from app.utils import get_db, queries
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/opportunities", tags=["opportunities"])
 
+# Sort keys accepted by GET /opportunities, each backed by an idx_opportunity_* index
+_SORT_KEYS = {
+    "created_at": "o.created_at",
+    "expected_close_date": "o.expected_close_date",
+    "opportunity_number": "o.opportunity_number",
+}
+
+# Opportunity list columns; sort_value is the column selected by the sort key
+_LIST_SELECT = """
+    SELECT 
+        o.opportunity_id,
+        o.opportunity_number,
+        o.opportunity_name,
+        o.amount,
+        c.customer_name,
+        os.stage_name,
+        o.probability_percent,
+        o.expected_close_date,
+        o.is_won,
+        o.is_closed,
+        {sort_column} as sort_value
+    FROM crm.crm_opportunity o
+    LEFT JOIN crm.crm_customer c ON o.customer_id = c.customer_id
+    LEFT JOIN crm.crm_opportunity_stage os ON o.stage_id = os.stage_id"""
+
+# Trigram search (db/migrations/007_opportunity_search.sql). Each column is
+# matched on a substring (ILIKE) or, for free text, a misspelled word (<%),
+# both served by its GIN trigram index; customer names match via their own
+# index. Matches are ranked by their best word similarity to the query, with
+# description matches weighted down.
+_SEARCH_QUERY = """
+    WITH matches AS (
+        SELECT o.opportunity_id
+        FROM crm.crm_opportunity o
+        WHERE o.opportunity_name ILIKE :pattern
+           OR o.opportunity_number ILIKE :pattern
+           OR o.description ILIKE :pattern
+           OR :q <% o.opportunity_name
+           OR :q <% o.description
+        UNION
+        SELECT o.opportunity_id
+        FROM crm.crm_customer c
+        JOIN crm.crm_opportunity o ON o.customer_id = c.customer_id
+        WHERE c.customer_name ILIKE :pattern
+           OR :q <% c.customer_name
+    ),
+    ranked AS (
+        SELECT 
+            o.opportunity_id,
+            o.opportunity_number,
+            o.opportunity_name,
+            o.amount,
+            c.customer_name,
+            os.stage_name,
+            o.probability_percent,
+            o.expected_close_date,
+            o.is_won,
+            o.is_closed,
+            GREATEST(
+                word_similarity(:q, o.opportunity_name),
+                word_similarity(:q, o.opportunity_number),
+                word_similarity(:q, c.customer_name),
+                COALESCE(word_similarity(:q, o.description), 0) * 0.5
+            )::float8 as rank{total_column}
+        FROM matches m
+        JOIN crm.crm_opportunity o ON o.opportunity_id = m.opportunity_id
+        LEFT JOIN crm.crm_customer c ON o.customer_id = c.customer_id
+        LEFT JOIN crm.crm_opportunity_stage os ON o.stage_id = os.stage_id
+        {where}
+    )
+    SELECT * FROM ranked
+    {keyset}
+    ORDER BY rank DESC, opportunity_id DESC
+    LIMIT :limit
+"""
+
+# Opportunity, its latest quote and that quote's line items in one round trip
+_OPPORTUNITY_DETAIL_QUERY = queries.register("opportunities.detail", """
+    SELECT 
+        o.opportunity_id,
+        o.opportunity_number,
+        o.opportunity_name,
+        o.amount,
+        c.customer_name,
+        os.stage_name,
+        o.probability_percent,
+        o.expected_close_date,
+        o.actual_close_date,
+        o.is_won,
+        o.is_closed,
+        o.description,
+        q.quote_number,
+        q.subtotal,
+        q.tax_rate,
+        q.tax_amount,
+        q.total_amount,
+        q.payment_terms,
+        q.notes,
+        COALESCE(items.items, '[]'::json) as items
+    FROM crm.crm_opportunity o
+    LEFT JOIN crm.crm_customer c ON o.customer_id = c.customer_id
+    LEFT JOIN crm.crm_opportunity_stage os ON o.stage_id = os.stage_id
+    LEFT JOIN LATERAL (
+        SELECT 
+            lq.quote_id, lq.quote_number, lq.subtotal, lq.tax_rate, lq.tax_amount,
+            lq.total_amount, lq.payment_terms, lq.notes
+        FROM crm.crm_quotation lq
+        WHERE lq.opportunity_id = o.opportunity_id
+        ORDER BY lq.created_at DESC
+        LIMIT 1
+    ) q ON true
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'id', li.line_item_id::text,
+            'name', li.product_name,
+            'description', li.description,
+            'quantity', li.quantity,
+            'unitPrice', COALESCE(li.unit_price, 0)::float8,
+            'total', COALESCE(li.line_total, 0)::float8,
+            'productCode', li.product_code,
+            'discountPercent', COALESCE(li.discount_percent, 0)::float8,
+            'leadTimeDays', li.lead_time_days
+        ) ORDER BY li.line_number) as items
+        FROM crm.crm_quote_line_item li
+        WHERE li.quote_id = q.quote_id
+    ) items ON true
+    WHERE o.opportunity_number = :opportunity_number
+    LIMIT 1
+""")
+
+
+@router.get("/pipeline")
+async def get_pipeline_summary(
+    summary_date: Optional[date] = None,
+    sales_rep_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the open pipeline by stage from the pre-aggregated crm_pipeline_summary
+    
+    Args:
+        summary_date: Snapshot date (defaults to the latest snapshot)
+        sales_rep_id: Only opportunities owned by this sales rep
+        team_id: Only opportunities of this team
+        
+    Returns:
+        Opportunity count, total and probability-weighted value per stage
+    """
+    try:
+        return await analytics_service.get_pipeline_summary(
+            db,
+            summary_date=summary_date,
+            sales_rep_id=sales_rep_id,
+            team_id=team_id
+        )
+    except Exception as e:
+        logger.error(f"Failed to fetch pipeline summary: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch pipeline summary: {str(e)}"
+        )
+
+
+@router.get("/search")
+async def search_opportunities(
+    response: Response,
+    q: str = Query(..., min_length=3, max_length=200),
+    db: AsyncSession = Depends(get_db),
+    customer_id: Optional[int] = None,
+    stage: Optional[str] = None,
+    is_closed: Optional[bool] = None,
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False
+):
+    """
+    Search opportunities by name, number, customer name or description
+    
+    Matches substrings and misspelled words using the pg_trgm indexes, best
+    match first. Results are keyset-paginated like GET /opportunities: the
+    X-Next-Cursor header carries the cursor for the next page. With
+    include_total, X-Total-Count carries the exact number of matches.
+    
+    Args:
+        q: Search text (at least 3 characters, the trigram length)
+        customer_id: Filter by customer ID
+        stage: Filter by stage name
+        is_closed: Filter by closed status
+        limit: Page size (default 25)
+        cursor: Cursor from a previous page's X-Next-Cursor header
+        include_total: Add the X-Total-Count header
+        
+    Returns:
+        List of opportunities with their match rank
+    """
+    try:
+        q = q.strip()
+        if len(q) < 3:
+            raise ValueError("Search text must be at least 3 characters")
+        
+        conditions = []
+        params = {"q": q, "pattern": f"%{_escape_like(q)}%", "limit": limit + 1}
+        
+        if customer_id is not None:
+            conditions.append("o.customer_id = :customer_id")
+            params["customer_id"] = customer_id
+            
+        if stage is not None:
+            conditions.append("os.stage_name = :stage")
+            params["stage"] = stage
+            
+        if is_closed is not None:
+            conditions.append("o.is_closed = :is_closed")
+            params["is_closed"] = is_closed
+        
+        if cursor:
+            params["cursor_rank"], params["cursor_id"] = _decode_search_cursor(cursor, q)
+        
+        query = queries.variant(
+            "opportunities.search",
+            (tuple(conditions), include_total, bool(cursor)),
+            lambda: _SEARCH_QUERY.format(
+                total_column=",\n            COUNT(*) OVER () as total" if include_total else "",
+                where=f"WHERE {' AND '.join(conditions)}" if conditions else "",
+                keyset="WHERE (rank, opportunity_id) < (:cursor_rank, :cursor_id)" if cursor else ""
+            )
+        )
+        result = await db.execute(query, params)
+        opportunities = result.fetchall()
+        
+        if include_total:
+            # Counted before the keyset filter, so every page carries the full total
+            response.headers["X-Total-Count"] = str(opportunities[0].total if opportunities else 0)
+        
+        # One extra row tells us whether another page exists
+        if len(opportunities) > limit:
+            opportunities = opportunities[:limit]
+            last = opportunities[-1]
+            response.headers["X-Next-Cursor"] = _encode_search_cursor(q, last.rank, last.opportunity_id)
+        
+        return [
+            {**_opportunity_summary(opp), "rank": round(opp.rank, 4)}
+            for opp in opportunities
+        ]
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to search opportunities: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search opportunities: {str(e)}"
+        )
+
 
 @router.get("/{opportunity_number}")
 async def get_opportunity_details(
     opportunity_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get detailed opportunity information including quote details
@@ -34,29 +296,9 @@ async def get_opportunity_details(
         Complete opportunity details with line items
     """
     try:
-        # Query opportunity from CRM database
-        query = """
-        SELECT 
-            o.opportunity_id,
-            o.opportunity_number,
-            o.opportunity_name,
-            o.amount,
-            c.customer_name,
-            os.stage_name,
-            o.probability_percent,
-            o.expected_close_date,
-            o.actual_close_date,
-            o.is_won,
-            o.is_closed,
-            o.description
-        FROM crm.crm_opportunity o
-        LEFT JOIN crm.crm_customer c ON o.customer_id = c.customer_id
-        LEFT JOIN crm.crm_opportunity_stage os ON o.stage_id = os.stage_id
-        WHERE o.opportunity_number = :opportunity_number
-        LIMIT 1
-        """
-        
-        result = db.execute(text(query), {"opportunity_number": opportunity_number})
+        result = await db.execute(
+            _OPPORTUNITY_DETAIL_QUERY, {"opportunity_number": opportunity_number}
+        )
         opportunity = result.fetchone()
         
         if not opportunity:
@@ -65,93 +307,7 @@ async def get_opportunity_details(
                 detail=f"Opportunity {opportunity_number} not found"
             )
         
-        # Get associated quote and line items
-        quote_query = """
-        SELECT 
-            q.quote_id,
-            q.quote_number,
-            q.quote_date,
-            q.valid_until,
-            q.subtotal,
-            q.discount_amount,
-            q.tax_rate,
-            q.tax_amount,
-            q.total_amount,
-            q.payment_terms,
-            q.notes
-        FROM crm.crm_quotation q
-        WHERE q.opportunity_id = :opportunity_id
-        ORDER BY q.created_at DESC
-        LIMIT 1
-        """
-        
-        quote_result = db.execute(
-            text(quote_query), 
-            {"opportunity_id": opportunity.opportunity_id}
-        )
-        quote = quote_result.fetchone()
-        
-        items = []
-        if quote:
-            # Get quote line items
-            items_query = """
-            SELECT 
-                line_item_id,
-                line_number,
-                product_code,
-                product_name,
-                description,
-                quantity,
-                unit_price,
-                discount_percent,
-                line_total,
-                lead_time_days
-            FROM crm.crm_quote_line_item
-            WHERE quote_id = :quote_id
-            ORDER BY line_number
-            """
-            
-            items_result = db.execute(text(items_query), {"quote_id": quote.quote_id})
-            items = [
-                {
-                    "id": str(item.line_item_id),
-                    "name": item.product_name,
-                    "description": item.description,
-                    "quantity": item.quantity,
-                    "unitPrice": float(item.unit_price) if item.unit_price else 0.0,
-                    "total": float(item.line_total) if item.line_total else 0.0,
-                    "productCode": item.product_code,
-                    "discountPercent": float(item.discount_percent) if item.discount_percent else 0.0,
-                    "leadTimeDays": item.lead_time_days
-                }
-                for item in items_result.fetchall()
-            ]
-        
-        # Build response
-        response = {
-            "id": str(opportunity.opportunity_id),
-            "opportunityId": opportunity.opportunity_number,
-            "name": opportunity.opportunity_name,
-            "customerName": opportunity.customer_name,
-            "stage": opportunity.stage_name,
-            "amount": float(opportunity.amount) if opportunity.amount else 0.0,
-            "probability": opportunity.probability_percent,
-            "expectedCloseDate": opportunity.expected_close_date.isoformat() if opportunity.expected_close_date else None,
-            "actualCloseDate": opportunity.actual_close_date.isoformat() if opportunity.actual_close_date else None,
-            "isWon": opportunity.is_won,
-            "isClosed": opportunity.is_closed,
-            "description": opportunity.description,
-            "items": items,
-            "subtotal": float(quote.subtotal) if quote and quote.subtotal else 0.0,
-            "taxRate": float(quote.tax_rate) if quote and quote.tax_rate else 0.0,
-            "taxAmount": float(quote.tax_amount) if quote and quote.tax_amount else 0.0,
-            "grandTotal": float(quote.total_amount) if quote and quote.total_amount else float(opportunity.amount) if opportunity.amount else 0.0,
-            "quoteNumber": quote.quote_number if quote else None,
-            "paymentTerms": quote.payment_terms if quote else None,
-            "notes": quote.notes if quote else None
-        }
-        
-        return response
+        return _opportunity_detail(opportunity)
         
     except HTTPException:
         raise
@@ -165,83 +321,261 @@ async def get_opportunity_details(
 
 @router.get("/")
 async def list_opportunities(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     customer_id: Optional[int] = None,
     stage: Optional[str] = None,
     is_closed: Optional[bool] = None,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "created_at",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    include_total: bool = False
 ):
     """
     List opportunities with optional filtering
     
+    Results are keyset-paginated on (sort key, opportunity_id): when more
+    opportunities exist, the X-Next-Cursor response header carries the
+    cursor for the next page. Sort keys are limited to indexed columns.
+    With include_total, X-Total-Count carries the planner's row estimate for
+    the filter, which is cheap but approximate.
+    
     Args:
         customer_id: Filter by customer ID
         stage: Filter by stage name
         is_closed: Filter by closed status
-        limit: Maximum number of results (default 100)
+        limit: Page size (default 100)
+        cursor: Cursor from a previous page's X-Next-Cursor header
+        sort: created_at, expected_close_date or opportunity_number
+        order: asc or desc
+        include_total: Add the approximate X-Total-Count header
         
     Returns:
         List of opportunities
     """
     try:
-        # Build query with filters
-        query = """
-        SELECT 
-            o.opportunity_id,
-            o.opportunity_number,
-            o.opportunity_name,
-            o.amount,
-            c.customer_name,
-            os.stage_name,
-            o.probability_percent,
-            o.expected_close_date,
-            o.is_won,
-            o.is_closed
-        FROM crm.crm_opportunity o
-        LEFT JOIN crm.crm_customer c ON o.customer_id = c.customer_id
-        LEFT JOIN crm.crm_opportunity_stage os ON o.stage_id = os.stage_id
-        WHERE 1=1
-        """
+        if sort not in _SORT_KEYS:
+            raise ValueError(f"Invalid sort key '{sort}', expected one of: {', '.join(_SORT_KEYS)}")
+        column = _SORT_KEYS[sort]
+        descending = order == "desc"
         
+        conditions = []
         params = {}
         
         if customer_id is not None:
-            query += " AND o.customer_id = :customer_id"
+            conditions.append("o.customer_id = :customer_id")
             params["customer_id"] = customer_id
             
         if stage is not None:
-            query += " AND os.stage_name = :stage"
+            conditions.append("os.stage_name = :stage")
             params["stage"] = stage
             
         if is_closed is not None:
-            query += " AND o.is_closed = :is_closed"
+            conditions.append("o.is_closed = :is_closed")
             params["is_closed"] = is_closed
         
-        query += " ORDER BY o.created_at DESC LIMIT :limit"
-        params["limit"] = limit
+        if include_total:
+            estimate = queries.variant(
+                "opportunities.list_estimate",
+                (sort, tuple(conditions)),
+                lambda: "EXPLAIN (FORMAT JSON) " + _list_query(column, conditions)
+            )
+            response.headers["X-Total-Count"] = str(await _estimate_rows(db, estimate, params))
         
-        result = db.execute(text(query), params)
+        # The page query depends on whether the cursor's sort value is NULL,
+        # not on the value itself, so each shape is compiled once
+        cursor_kind = None
+        if cursor:
+            value, params["cursor_id"] = _decode_cursor(cursor, sort, order)
+            if value is None:
+                cursor_kind = "null"
+            else:
+                cursor_kind = "value"
+                params["cursor_value"] = value
+        params["limit"] = limit + 1
+        
+        query = queries.variant(
+            "opportunities.list",
+            (sort, order, tuple(conditions), cursor_kind),
+            lambda: _list_page_query(sort, descending, conditions, cursor_kind)
+        )
+        result = await db.execute(query, params)
         opportunities = result.fetchall()
         
-        return [
-            {
-                "id": str(opp.opportunity_id),
-                "opportunityId": opp.opportunity_number,
-                "name": opp.opportunity_name,
-                "customerName": opp.customer_name,
-                "stage": opp.stage_name,
-                "amount": float(opp.amount) if opp.amount else 0.0,
-                "probability": opp.probability_percent,
-                "expectedCloseDate": opp.expected_close_date.isoformat() if opp.expected_close_date else None,
-                "isWon": opp.is_won,
-                "isClosed": opp.is_closed
-            }
-            for opp in opportunities
-        ]
+        # One extra row tells us whether another page exists
+        if len(opportunities) > limit:
+            opportunities = opportunities[:limit]
+            last = opportunities[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(
+                sort, order, last.sort_value, last.opportunity_id
+            )
+        
+        return [_opportunity_summary(opp) for opp in opportunities]
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Failed to list opportunities: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to list opportunities: {str(e)}"
         )
+
+
+def _list_query(column: str, conditions: List[str]) -> str:
+    """Opportunity list SELECT with the given sort column and WHERE conditions, unordered"""
+    where = " AND ".join(conditions)
+    return _LIST_SELECT.format(sort_column=column) + (f" WHERE {where}" if where else "")
+
+
+def _list_page_query(
+    sort: str,
+    descending: bool,
+    conditions: List[str],
+    cursor_kind: Optional[str]
+) -> str:
+    """
+    Opportunity list page SQL for a sort, filter set and cursor shape
+    
+    Args:
+        sort: Sort key from _SORT_KEYS
+        descending: Sort direction
+        conditions: Filter conditions
+        cursor_kind: None for the first page, "null" or "value" for a cursor
+            whose sort value is NULL or not (:cursor_value, :cursor_id)
+    """
+    column = _SORT_KEYS[sort]
+    
+    # NULLs sort last ascending and first descending, matching a backward
+    # scan of the plain ascending indexes
+    direction = "DESC" if descending else "ASC"
+    compare = "<" if descending else ">"
+    order_by = f" ORDER BY sort_value {direction}, opportunity_id {direction} LIMIT :limit"
+    
+    # Each branch stays a range scan; NULL sort values are a separate block
+    if cursor_kind is None:
+        branches = [conditions]
+    elif cursor_kind == "null":
+        branches = [conditions + [f"{column} IS NULL", f"o.opportunity_id {compare} :cursor_id"]]
+        if descending:
+            branches.append(conditions + [f"{column} IS NOT NULL"])
+    else:
+        branches = [conditions + [f"({column}, o.opportunity_id) {compare} (:cursor_value, :cursor_id)"]]
+        if not descending and sort != "opportunity_number":
+            branches.append(conditions + [f"{column} IS NULL"])
+    
+    if len(branches) == 1:
+        return _list_query(column, branches[0]) + order_by
+    return " UNION ALL ".join(
+        f"({_list_query(column, branch)}{order_by})" for branch in branches
+    ) + order_by
+
+
+async def _estimate_rows(db: AsyncSession, query: TextClause, params: dict) -> int:
+    """Planner row estimate for an EXPLAIN (FORMAT JSON) statement, without running the query"""
+    result = await db.execute(query, params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _encode_cursor(sort: str, order: str, value, opportunity_id: int) -> str:
+    """Opaque page cursor for the last opportunity on a page"""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps([sort, order, value, opportunity_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    """Inverse of _encode_cursor; the cursor must belong to the same sort"""
+    try:
+        cursor_sort, cursor_order, value, opportunity_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise ValueError("sort mismatch")
+        if value is not None and sort == "created_at":
+            value = datetime.fromisoformat(value)
+        elif value is not None and sort == "expected_close_date":
+            value = date.fromisoformat(value)
+        return value, int(opportunity_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _encode_search_cursor(q: str, rank: float, opportunity_id: int) -> str:
+    """Opaque page cursor for the last search result on a page"""
+    payload = json.dumps([q, rank, opportunity_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_search_cursor(cursor: str, q: str) -> Tuple[float, int]:
+    """Inverse of _encode_search_cursor; the cursor must belong to the same search"""
+    try:
+        cursor_q, rank, opportunity_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if cursor_q != q:
+            raise ValueError("search mismatch")
+        return float(rank), int(opportunity_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _opportunity_summary(row) -> dict:
+    """Response payload for one opportunity list or search row"""
+    return {
+        "id": str(row.opportunity_id),
+        "opportunityId": row.opportunity_number,
+        "name": row.opportunity_name,
+        "customerName": row.customer_name,
+        "stage": row.stage_name,
+        "amount": float(row.amount) if row.amount else 0.0,
+        "probability": row.probability_percent,
+        "expectedCloseDate": row.expected_close_date.isoformat() if row.expected_close_date else None,
+        "isWon": row.is_won,
+        "isClosed": row.is_closed
+    }
+
+
+def _float(value) -> float:
+    """Decimal column to float, with NULL (and zero) as 0.0"""
+    return float(value) if value else 0.0
+
+
+def _opportunity_detail(row) -> dict:
+    """Response payload for one _OPPORTUNITY_DETAIL_QUERY row"""
+    items = row.items
+    if isinstance(items, str):
+        items = json.loads(items)
+    return {
+        "id": str(row.opportunity_id),
+        "opportunityId": row.opportunity_number,
+        "name": row.opportunity_name,
+        "customerName": row.customer_name,
+        "stage": row.stage_name,
+        "amount": _float(row.amount),
+        "probability": row.probability_percent,
+        "expectedCloseDate": row.expected_close_date.isoformat() if row.expected_close_date else None,
+        "actualCloseDate": row.actual_close_date.isoformat() if row.actual_close_date else None,
+        "isWon": row.is_won,
+        "isClosed": row.is_closed,
+        "description": row.description,
+        "items": items,
+        "subtotal": _float(row.subtotal),
+        "taxRate": _float(row.tax_rate),
+        "taxAmount": _float(row.tax_amount),
+        "grandTotal": _float(row.total_amount) or _float(row.amount),
+        "quoteNumber": row.quote_number,
+        "paymentTerms": row.payment_terms,
+        "notes": row.notes
+    }
@@ -1,15 +1,23 @@
 """
 Quote generation API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
 import os
 
-from app.models import Quote, QuoteWithLineItems, QuoteCreate, ProductPricing
-from app.services import email_service, quote_service, pdf_service
-from app.utils import get_db
+from app.models import Quote, QuoteWithLineItems, QuoteCreate, QuoteDescriptionMode, ProductPricing
+from app.services import email_service, quote_service, pdf_service, analytics_service
+from app.services.pdf_service import PDFRenderBusyError
+from app.utils import get_db, get_db_context, sse_response
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/quotes", tags=["quotes"])
 
@@ -17,7 +25,9 @@ router = APIRouter(prefix="/quotes", tags=["quotes"])
 @router.post("/generate", response_model=QuoteWithLineItems)
 async def generate_quote(
     thread_id: int,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    description: Optional[QuoteDescriptionMode] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate a quote from an email conversation
@@ -27,25 +37,30 @@ async def generate_quote(
     2. Extracts product requirements and quantities
     3. Fetches pricing from PostgreSQL based on previous purchases
     4. Calculates totals with tax and discounts
-    5. Generates a standardized quote
+    5. Generates a standardized quote and stores it in crm_quotation
+    
+    The AI description is generated alongside pricing (inline), after the
+    response is sent and stored as the quote's notes (deferred), or not at
+    all (none). Defaults to QUOTE_DESCRIPTION_MODE.
     
     Args:
         thread_id: Email thread ID to generate quote from
+        description: When to generate the quote description
         
     Returns:
         Complete quote with line items and pricing
     """
     try:
         # Get email thread
-        thread_data = email_service.get_thread_by_id(db, thread_id)
-        if not thread_data:
+        thread = await email_service.get_thread_by_id(db, thread_id)
+        if not thread:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Email thread {thread_id} not found"
             )
         
         # Summarize the email conversation
-        summary = email_service.summarize_thread(db, thread_id)
+        summary = await email_service.summarize_thread(db, thread_id, thread=thread)
         if not summary:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -53,29 +68,118 @@ async def generate_quote(
             )
         
         # Generate quote from summary
-        quote = quote_service.generate_quote_from_summary(
+        description_mode = description or QuoteDescriptionMode(settings.QUOTE_DESCRIPTION_MODE)
+        quote = await quote_service.generate_quote_from_summary(
             db=db,
             summary=summary,
-            customer_name=thread_data.get("customer_name", "Customer"),
-            customer_email=thread_data.get("customer_email", ""),
-            customer_company=None
+            customer_name=thread.customer_name or "Customer",
+            customer_email=thread.customer_email or "",
+            customer_company=None,
+            description_mode=description_mode
         )
         
+        # Persist so the PDF endpoint can load it by number; a quote the
+        # client cannot fetch again is an error, not a partial success
+        try:
+            quote = await quote_service.save_quote(db, quote)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Quote {quote.quote_number} could not be saved: {str(e)}"
+            )
+        
+        if description_mode == QuoteDescriptionMode.DEFERRED:
+            background_tasks.add_task(
+                quote_service.fill_quote_description, quote.quote_number, summary
+            )
+        
         return quote
         
     except HTTPException:
         raise
     except Exception as e:
+        logger.error(f"Failed to generate quote: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate quote: {str(e)}"
         )
 
 
+@router.post("/generate/stream")
+async def stream_generate_quote(thread_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Generate a quote from an email conversation, streaming progress as
+    server-sent events
+    
+    The description is always generated inline, alongside pricing, and its
+    text is streamed as it is written.
+    
+    Events, in order:
+    - started: {"thread_id"} as soon as the thread is found
+    - token: {"stage": "summary" | "description", "text"} model output fragments
+    - summarized: the EmailSummary
+    - priced: the quote with line items and totals, without notes
+    - described: {"notes"} once the description is complete
+    - saved: the final quote, with its quote_id
+    - error: {"detail"} if generation or saving fails, ending the stream
+    
+    Args:
+        thread_id: Email thread ID to generate quote from
+        
+    Returns:
+        text/event-stream response
+    """
+    thread = await email_service.get_thread_by_id(db, thread_id)
+    if not thread:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Email thread {thread_id} not found"
+        )
+    
+    async def produce(emit) -> None:
+        emit("started", {"thread_id": thread_id})
+        # The request session is closed once streaming starts
+        async with get_db_context() as stream_db:
+            summary = await email_service.summarize_thread(
+                stream_db, thread_id, thread=thread,
+                on_token=lambda text: emit("token", {"stage": "summary", "text": text})
+            )
+            if not summary:
+                raise RuntimeError("Failed to summarize email conversation")
+            emit("summarized", summary)
+            
+            # Description only needs the summary, so it streams while pricing runs
+            description_task = asyncio.ensure_future(quote_service.generate_description(
+                summary,
+                on_token=lambda text: emit("token", {"stage": "description", "text": text})
+            ))
+            try:
+                quote = await quote_service.generate_quote_from_summary(
+                    db=stream_db,
+                    summary=summary,
+                    customer_name=thread.customer_name or "Customer",
+                    customer_email=thread.customer_email or "",
+                    customer_company=None,
+                    description_mode=QuoteDescriptionMode.NONE
+                )
+                emit("priced", quote)
+                
+                quote.notes = await description_task
+            except BaseException:
+                description_task.cancel()
+                raise
+            emit("described", {"notes": quote.notes})
+            
+            quote = await quote_service.save_quote(stream_db, quote)
+            emit("saved", quote)
+    
+    return sse_response(produce, "Failed to generate quote")
+
+
 @router.post("/preview", response_model=QuoteWithLineItems)
 async def preview_quote(
     quote_data: QuoteCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Preview a quote before finalizing
@@ -101,44 +205,189 @@ async def preview_quote(
         )
 
 
+@router.get("/export")
+async def export_quote_pdfs(
+    customer_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status_code: Optional[str] = Query(None, alias="status"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Export stored quotes as a ZIP of PDFs
+    
+    Quotes matching the filter are rendered in parallel and streamed out
+    as one archive member per quote, without building the whole ZIP in
+    memory.
+    
+    Args:
+        customer_id: Only quotes for this customer
+        date_from: Earliest quote date (inclusive)
+        date_to: Latest quote date (inclusive)
+        status_code: Quote status (e.g. draft, sent, accepted)
+        limit: Maximum number of quotes (capped at PDF_EXPORT_MAX_QUOTES)
+        
+    Returns:
+        Streaming ZIP archive
+    """
+    try:
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="date_from must not be after date_to"
+            )
+        
+        max_quotes = settings.PDF_EXPORT_MAX_QUOTES
+        quotes = await quote_service.list_quotes(
+            db,
+            customer_id=customer_id,
+            date_from=date_from,
+            date_to=date_to,
+            status=status_code,
+            limit=min(limit or max_quotes, max_quotes)
+        )
+        
+        if not quotes:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No quotes match the export filter"
+            )
+        
+        await pdf_service.ensure_templates(db)
+        filename = f"quotes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return StreamingResponse(
+            pdf_service.stream_quotes_zip(quotes),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Quote-Count": str(len(quotes))
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export quotes: {str(e)}"
+        )
+
+
+@router.get("/analytics")
+async def get_quote_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sales_rep_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    industry_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get daily quote performance from the pre-aggregated crm_quote_analytics
+    
+    Figures are as of the last analytics refresh (refreshedAt).
+    
+    Args:
+        date_from: Earliest quote date (inclusive)
+        date_to: Latest quote date (inclusive)
+        sales_rep_id: Only quotes owned by this sales rep
+        team_id: Only quotes owned by this team's reps
+        industry_id: Only quotes for customers in this industry
+        
+    Returns:
+        Quote counts, values and conversion per quote date
+    """
+    try:
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="date_from must not be after date_to"
+            )
+        
+        return await analytics_service.get_quote_analytics(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            sales_rep_id=sales_rep_id,
+            team_id=team_id,
+            industry_id=industry_id
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to fetch quote analytics: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch quote analytics: {str(e)}"
+        )
+
+
 @router.get("/{quote_number}/pdf")
 async def download_quote_pdf(
     quote_number: str,
-    thread_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    thread_id: Optional[int] = Query(None, deprecated=True),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Download quote as PDF
     
-    Generates a professional PDF document of the quote
+    Loads the stored quote by number and renders it as a professional PDF
+    document. Generated quotes are always stored, so an unknown number is
+    a 404.
+    
+    Responses carry an ETag derived from the quote's content, so a
+    matching If-None-Match request gets 304 Not Modified.
     
     Args:
         quote_number: Quote number
-        thread_id: Associated email thread ID
+        thread_id: Ignored; kept so existing clients do not break
         
     Returns:
         PDF file for download
     """
     try:
-        # Generate the quote first
-        thread_data = email_service.get_thread_by_id(db, thread_id)
-        if not thread_data:
+        quote = await quote_service.get_quote_by_number(db, quote_number)
+        
+        if quote is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Email thread {thread_id} not found"
+                detail=f"Quote {quote_number} not found"
             )
         
-        summary = email_service.summarize_thread(db, thread_id)
-        quote = quote_service.generate_quote_from_summary(
-            db=db,
-            summary=summary,
-            customer_name=thread_data.get("customer_name", "Customer"),
-            customer_email=thread_data.get("customer_email", ""),
-            customer_company=None
-        )
+        # Conditional GET - skip rendering if the client copy is current
+        await pdf_service.ensure_templates(db)
+        etag = f'"{pdf_service.quote_fingerprint(quote)}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
         
-        # Generate PDF
-        pdf_path = pdf_service.generate_quote_pdf(quote)
+        # Same Last-Modified whether streamed or served from the cached file,
+        # whose mtime is the render time rather than the quote's
+        updated_at = quote.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        pdf_headers = {
+            "Content-Disposition": f"attachment; filename=quote_{quote_number}.pdf",
+            "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+            **cache_headers
+        }
+        
+        if not pdf_service.persist_to_disk:
+            # Render in memory and stream straight to the client
+            pdf_bytes = await pdf_service.render_quote_pdf_async(quote)
+            pdf_headers["Content-Length"] = str(len(pdf_bytes))
+            return StreamingResponse(
+                pdf_service.iter_pdf_chunks(pdf_bytes),
+                media_type="application/pdf",
+                headers=pdf_headers
+            )
+        
+        # Generate PDF (reuses the cached artifact when unchanged)
+        pdf_path = await pdf_service.generate_quote_pdf_async(quote)
         
         if not os.path.exists(pdf_path):
             raise HTTPException(
@@ -150,11 +399,21 @@ async def download_quote_pdf(
             path=pdf_path,
             media_type="application/pdf",
             filename=f"quote_{quote_number}.pdf",
-            headers={"Content-Disposition": f"attachment; filename=quote_{quote_number}.pdf"}
+            headers=pdf_headers
         )
         
     except HTTPException:
         raise
+    except PDFRenderBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"PDF renderer is busy, retry shortly: {str(e)}"
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Timed out rendering PDF"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -165,7 +424,7 @@ async def download_quote_pdf(
 @router.get("/pricing/{product_code}", response_model=ProductPricing)
 async def get_product_pricing(
     product_code: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get pricing for a specific product
@@ -179,7 +438,7 @@ async def get_product_pricing(
         Product pricing information
     """
     try:
-        pricing_list = quote_service.get_product_pricing(db, [product_code])
+        pricing_list = await quote_service.get_product_pricing(db, [product_code])
         if not pricing_list:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -193,3 +452,32 @@ async def get_product_pricing(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch pricing: {str(e)}"
         )
+
+
+
+@router.get("/pricing/cache/stats")
+async def get_pricing_cache_stats():
+    """
+    Get price book cache statistics
+    
+    Returns:
+        Cache size, TTL and hit/miss counters
+    """
+    return quote_service.price_cache.stats()
+
+
+@router.post("/pricing/cache/invalidate")
+async def invalidate_pricing_cache(
+    product_code: Optional[List[str]] = Query(default=None)
+):
+    """
+    Invalidate cached product pricing
+    
+    Args:
+        product_code: Product codes to invalidate (repeatable); clears the whole price book if omitted
+        
+    Returns:
+        Number of cache entries removed
+    """
+    removed = quote_service.invalidate_pricing(product_code)
+    return {"invalidated": removed}
@@ -14,6 +14,22 @@ class Settings(BaseSettings):
     AZURE_OPENAI_API_KEY: str = ""
     AZURE_OPENAI_DEPLOYMENT_NAME: str = "gpt-4o"
     AZURE_OPENAI_API_VERSION: str = "2024-02-15-preview"
+    AZURE_OPENAI_MAX_CONCURRENCY: int = 8  # In-flight requests per worker
+    AZURE_OPENAI_MAX_CONNECTIONS: int = 20
+    AZURE_OPENAI_TIMEOUT_SECONDS: float = 60.0
+    AZURE_OPENAI_MAX_RETRIES: int = 3
+    AZURE_OPENAI_RETRY_BASE_SECONDS: float = 1.0
+    AZURE_OPENAI_RETRY_MAX_SECONDS: float = 30.0
+    
+    # LLM Backend ("azure", or "stub" for offline benchmarking)
+    LLM_BACKEND: str = "azure"
+    LLM_STUB_LATENCY_MS: float = 800.0
+    LLM_STUB_LATENCY_JITTER_MS: float = 200.0
+    LLM_STUB_RATE_LIMIT_RATE: float = 0.0  # Fraction of calls answered with 429
+    LLM_STUB_ERROR_RATE: float = 0.0  # Fraction of calls failing with 503
+    LLM_STUB_TIMEOUT_RATE: float = 0.0  # Fraction of calls timing out
+    LLM_STUB_RETRY_AFTER_MS: int = 500
+    LLM_STUB_SEED: int = 0
     
     # PostgreSQL Database Configuration
     DATABASE_HOST: str = "localhost"
@@ -21,6 +37,7 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "hackathon_db"
     DATABASE_USER: str = "postgres"
     DATABASE_PASSWORD: str = "postgres"
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # Per pooled connection; 0 behind PgBouncer transaction pooling
     
     # Application Configuration
     APP_NAME: str = "Email Summarization & Quote Generation API"
@@ -32,8 +49,43 @@ class Settings(BaseSettings):
     # CORS Configuration
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:5173"
     
+    # Quote Generation
+    QUOTE_DESCRIPTION_MODE: str = "inline"  # inline, deferred or none
+    
     # PDF Generation
     PDF_OUTPUT_DIR: str = "./output/pdfs"
+    PDF_PERSIST_TO_DISK: bool = True  # False renders in memory and streams to the client
+    PDF_CACHE_MAX_BYTES: int = 500 * 1024 * 1024  # 500 MB
+    PDF_CACHE_MAX_AGE_SECONDS: int = 604800  # 7 days
+    PDF_RENDER_WORKERS: int = 2  # Render processes; 0 renders on a background thread
+    PDF_RENDER_MAX_QUEUE: int = 32
+    PDF_RENDER_TIMEOUT_SECONDS: int = 30
+    PDF_EXPORT_MAX_QUOTES: int = 500  # Per bulk export request
+    PDF_TEMPLATE_REFRESH_SECONDS: int = 300  # crm_quote_template reload interval
+    
+    # Price Book Cache
+    PRICE_CACHE_MAX_SIZE: int = 1000
+    PRICE_CACHE_TTL_SECONDS: int = 300
+    PRICE_CACHE_NOTIFY_CHANNEL: str = ""  # e.g. "price_book_changed"; empty disables LISTEN/NOTIFY
+    
+    # Summary Cache
+    SUMMARY_CACHE_ENABLED: bool = True
+    SUMMARY_CACHE_DIR: str = "./output/summary_cache"
+    SUMMARY_CACHE_TTL_SECONDS: int = 604800  # 7 days
+    SUMMARY_CACHE_MAX_ENTRIES: int = 5000
+    SUMMARY_PROMPT_TOKEN_BUDGET: int = 12000  # Conversation tokens per summarization call
+    SUMMARY_MAX_INCREMENTAL_UPDATES: int = 10  # Full re-summarization after this many updates
+    
+    # Background Summary Worker
+    SUMMARY_WORKER_ENABLED: bool = False  # Run inside the API process
+    SUMMARY_WORKER_BATCH_SIZE: int = 20
+    SUMMARY_WORKER_CONCURRENCY: int = 4
+    SUMMARY_WORKER_POLL_SECONDS: int = 60
+    SUMMARY_WORKER_MAX_BACKOFF_SECONDS: int = 3600  # Retry cap for threads that keep failing
+    
+    # Analytics Refresh (crm_pipeline_summary, crm_quote_analytics)
+    ANALYTICS_REFRESH_ENABLED: bool = False  # Run inside the API process
+    ANALYTICS_REFRESH_INTERVAL_SECONDS: int = 300
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -43,6 +95,11 @@ class Settings(BaseSettings):
         """Construct PostgreSQL connection URL"""
         return f"postgresql://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
     
+    @property
+    def async_database_url(self) -> str:
+        """Construct asyncpg PostgreSQL connection URL"""
+        return f"postgresql+asyncpg://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
+    
     @property
     def allowed_origins_list(self) -> List[str]:
         """Parse CORS allowed origins"""
@@ -9,7 +9,10 @@ import time
 
 from app.config import settings
 from app.api import api_router
-from app.utils import test_db_connection
+from app.services import azure_openai_service, pricing_listener, pdf_service
+from app.services.summary_worker import summary_worker
+from app.services.analytics_refresher import analytics_refresher
+from app.utils import test_db_connection, close_db
 
 # Configure logging
 logging.basicConfig(
@@ -53,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 
@@ -91,7 +95,7 @@ async def health_check():
     
     Returns API status and database connectivity
     """
-    db_status = "healthy" if test_db_connection() else "unhealthy"
+    db_status = "healthy" if await test_db_connection() else "unhealthy"
     
     return {
         "status": "healthy" if db_status == "healthy" else "degraded",
@@ -156,11 +160,23 @@ async def startup_event():
     logger.info(f"API Prefix: {settings.API_PREFIX}")
     
     # Test database connection
-    if test_db_connection():
+    if await test_db_connection():
         logger.info("Database connection successful")
     else:
         logger.warning("Database connection failed - some features may not work")
     
+    # Start price book cache invalidation listener (optional)
+    if settings.PRICE_CACHE_NOTIFY_CHANNEL:
+        await pricing_listener.start()
+    
+    # Start background email summarization (optional)
+    if settings.SUMMARY_WORKER_ENABLED:
+        summary_worker.start()
+    
+    # Start scheduled pipeline/quote analytics refresh (optional)
+    if settings.ANALYTICS_REFRESH_ENABLED:
+        analytics_refresher.start()
+    
     # Check Azure OpenAI configuration
     if settings.AZURE_OPENAI_API_KEY:
         logger.info("Azure OpenAI configured")
@@ -173,6 +189,12 @@ async def startup_event():
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info("Shutting down application")
+    await pricing_listener.stop()
+    await summary_worker.stop()
+    await analytics_refresher.stop()
+    pdf_service.shutdown()
+    await azure_openai_service.close()
+    await close_db()
 
 
 if __name__ == "__main__":
@@ -12,6 +12,7 @@ from .quote import (
     QuoteCreate,
     QuoteWithLineItems,
     QuoteLineItem,
+    QuoteDescriptionMode,
     ProductPricing,
 )
 
@@ -26,5 +27,6 @@ __all__ = [
     "QuoteCreate",
     "QuoteWithLineItems",
     "QuoteLineItem",
+    "QuoteDescriptionMode",
     "ProductPricing",
 ]
@@ -5,6 +5,14 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime, date
 from decimal import Decimal
+from enum import Enum
+
+
+class QuoteDescriptionMode(str, Enum):
+    """When the AI quote description is generated"""
+    INLINE = "inline"  # Before the quote is returned
+    DEFERRED = "deferred"  # In the background after the quote is saved
+    NONE = "none"  # Not generated
 
 
 class QuoteLineItem(BaseModel):
@@ -55,6 +63,7 @@ class Quote(BaseModel):
     delivery_terms: Optional[str] = None
     notes: Optional[str] = None
     status: str = "draft"
+    template_code: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
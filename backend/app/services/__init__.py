@@ -3,10 +3,14 @@ from .azure_openai_service import azure_openai_service
 from .email_service import email_service
 from .quote_service import quote_service
 from .pdf_service import pdf_service
+from .pricing_listener import pricing_listener
+from .analytics_service import analytics_service
 
 __all__ = [
     "azure_openai_service",
     "email_service",
     "quote_service",
     "pdf_service",
+    "pricing_listener",
+    "analytics_service",
 ]
@@ -0,0 +1,106 @@
+"""
+Scheduled incremental refresh of crm_pipeline_summary and crm_quote_analytics
+
+Runs inside the API process when ANALYTICS_REFRESH_ENABLED is set, or as a
+separate process (e.g. from cron):
+
+    python -m app.services.analytics_refresher [--once] [--full]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.analytics_service import analytics_service, PIPELINE_SUMMARY, QUOTE_ANALYTICS
+from app.utils.database import get_db_context, close_db
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsRefresher:
+    """Refreshes the pre-aggregated analytics tables on an interval"""
+
+    def __init__(self):
+        """Initialize refresher"""
+        self.interval_seconds = settings.ANALYTICS_REFRESH_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def run_once(self, full: bool = False) -> Dict[str, Optional[int]]:
+        """
+        Refresh both aggregates, each in its own transaction
+
+        Args:
+            full: Rebuild instead of refreshing incrementally
+
+        Returns:
+            Groups re-aggregated per table (None if skipped or failed)
+        """
+        refreshed: Dict[str, Optional[int]] = {}
+        for aggregate, refresh in (
+            (PIPELINE_SUMMARY, analytics_service.refresh_pipeline_summary),
+            (QUOTE_ANALYTICS, analytics_service.refresh_quote_analytics),
+        ):
+            try:
+                async with get_db_context() as db:
+                    refreshed[aggregate] = await refresh(db, full=full)
+            except Exception as e:
+                logger.error(f"Failed to refresh {aggregate}: {e}")
+                refreshed[aggregate] = None
+        return refreshed
+
+    async def run_forever(self) -> None:
+        """Refresh every interval until stopped"""
+        while not self._stopping.is_set():
+            await self.run_once()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Run the refresher as a task on the current event loop"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+            logger.info("Analytics refresher started")
+
+    async def stop(self) -> None:
+        """Stop the refresher task"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Global refresher instance
+analytics_refresher = AnalyticsRefresher()
+
+
+async def _main(once: bool, full: bool) -> None:
+    try:
+        if once or full:
+            await analytics_refresher.run_once(full=full)
+        else:
+            await analytics_refresher.run_forever()
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh crm_pipeline_summary and crm_quote_analytics")
+    parser.add_argument("--once", action="store_true", help="Refresh once and exit")
+    parser.add_argument("--full", action="store_true", help="Rebuild both tables once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(_main(args.once, args.full))
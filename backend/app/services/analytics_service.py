@@ -0,0 +1,480 @@
+"""
+Pre-aggregated pipeline and quote analytics
+
+Maintains crm_pipeline_summary and crm_quote_analytics incrementally (see
+db/migrations/006_analytics_refresh.sql) and serves dashboard reads from them.
+
+crm_pipeline_summary holds one snapshot of the open pipeline per day, grouped
+by owner, team and stage. crm_quote_analytics holds quote outcomes grouped by
+quote date, owner, the owner's team and the customer's industry.
+"""
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_SUMMARY = "crm_pipeline_summary"
+QUOTE_ANALYTICS = "crm_quote_analytics"
+
+# Changes are re-read this far behind the watermark, so rows written by
+# transactions that were still open at the previous refresh are not missed.
+# Re-aggregating a group is idempotent.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Group keys; team_id and industry_id may be NULL, so groups are matched with
+# equality on the NOT NULL columns and IS NOT DISTINCT FROM on the rest
+_PIPELINE_GROUP_MATCH = """
+    {a}.sales_rep_id = {b}.sales_rep_id
+    AND {a}.stage_id = {b}.stage_id
+    AND {a}.team_id IS NOT DISTINCT FROM {b}.team_id"""
+
+_QUOTE_GROUP_MATCH = """
+    {a}.analytics_date = {b}.analytics_date
+    AND {a}.sales_rep_id = {b}.sales_rep_id
+    AND {a}.team_id IS NOT DISTINCT FROM {b}.team_id
+    AND {a}.industry_id IS NOT DISTINCT FROM {b}.industry_id"""
+
+# Open opportunities as pipeline members
+_PIPELINE_MEMBER_SELECT = """
+    SELECT o.opportunity_id, o.owner_id, o.team_id, o.stage_id
+    FROM crm.crm_opportunity o
+    WHERE o.is_closed IS NOT TRUE"""
+
+# Quotes as analytics members
+_QUOTE_MEMBER_SELECT = """
+    SELECT q.quote_id, q.quote_date, q.owner_id, r.team_id, c.industry_id
+    FROM crm.crm_quotation q
+    LEFT JOIN crm.crm_sales_rep r ON r.sales_rep_id = q.owner_id
+    LEFT JOIN crm.crm_customer c ON c.customer_id = q.customer_id"""
+
+# Today's pipeline snapshot for the member groups ({scope} limits the groups)
+_PIPELINE_AGGREGATE = """
+    INSERT INTO crm.crm_pipeline_summary (
+        summary_date, sales_rep_id, team_id, stage_id,
+        opportunity_count, total_value, weighted_value, avg_days_in_stage
+    )
+    SELECT
+        CURRENT_DATE,
+        m.sales_rep_id,
+        m.team_id,
+        m.stage_id,
+        COUNT(*),
+        COALESCE(SUM(o.amount), 0),
+        COALESCE(SUM(o.amount * COALESCE(o.probability_percent, os.probability_percent, 0) / 100.0), 0),
+        AVG(CURRENT_DATE - COALESCE(h.entered_at, o.created_at)::date)
+    FROM crm.crm_pipeline_summary_member m
+    {scope}
+    JOIN crm.crm_opportunity o ON o.opportunity_id = m.opportunity_id
+    LEFT JOIN crm.crm_opportunity_stage os ON os.stage_id = m.stage_id
+    LEFT JOIN LATERAL (
+        SELECT MAX(sh.changed_at) as entered_at
+        FROM crm.crm_opportunity_stage_history sh
+        WHERE sh.opportunity_id = o.opportunity_id AND sh.new_stage_id = m.stage_id
+    ) h ON true
+    GROUP BY m.sales_rep_id, m.team_id, m.stage_id
+"""
+
+# Quote analytics for the member groups ({scope} limits the groups)
+_QUOTE_AGGREGATE = """
+    INSERT INTO crm.crm_quote_analytics (
+        analytics_date, sales_rep_id, team_id, industry_id,
+        quotes_created, quotes_sent, quotes_accepted, quotes_rejected, quotes_expired,
+        total_value_quoted, total_value_won, avg_quote_value, avg_discount_percent,
+        avg_response_time_hours, conversion_rate
+    )
+    SELECT
+        g.analytics_date, g.sales_rep_id, g.team_id, g.industry_id,
+        g.created, g.sent, g.accepted, g.rejected, g.expired,
+        g.value_quoted, g.value_won, g.avg_value, g.avg_discount, g.avg_response_hours,
+        g.accepted * 100.0 / NULLIF(g.sent, 0)
+    FROM (
+        SELECT
+            m.analytics_date,
+            m.sales_rep_id,
+            m.team_id,
+            m.industry_id,
+            COUNT(*) as created,
+            COUNT(*) FILTER (
+                WHERE q.sent_at IS NOT NULL
+                   OR qs.status_code IN ('SENT', 'OPENED', 'NEGOTIATING', 'ACCEPTED', 'REJECTED')
+            ) as sent,
+            COUNT(*) FILTER (WHERE qs.status_code = 'ACCEPTED') as accepted,
+            COUNT(*) FILTER (WHERE qs.status_code = 'REJECTED') as rejected,
+            COUNT(*) FILTER (WHERE qs.status_code = 'EXPIRED') as expired,
+            COALESCE(SUM(q.total_amount), 0) as value_quoted,
+            COALESCE(SUM(q.total_amount) FILTER (WHERE qs.status_code = 'ACCEPTED'), 0) as value_won,
+            AVG(q.total_amount) as avg_value,
+            AVG(q.discount_amount * 100 / NULLIF(q.subtotal, 0)) as avg_discount,
+            AVG(EXTRACT(EPOCH FROM q.responded_at - q.sent_at) / 3600) as avg_response_hours
+        FROM crm.crm_quote_analytics_member m
+        {scope}
+        JOIN crm.crm_quotation q ON q.quote_id = m.quote_id
+        LEFT JOIN crm.crm_quote_status qs ON qs.status_id = q.status_id
+        GROUP BY m.analytics_date, m.sales_rep_id, m.team_id, m.industry_id
+    ) g
+"""
+
+
+class AnalyticsService:
+    """Refreshes and reads the pre-aggregated analytics tables"""
+
+    async def refresh_pipeline_summary(self, db: AsyncSession, full: bool = False) -> Optional[int]:
+        """
+        Bring today's crm_pipeline_summary snapshot up to date
+
+        The first refresh of a day carries the previous snapshot forward,
+        aging avg_days_in_stage by the days in between. Then only the groups
+        that opportunities changed since the watermark left or joined are
+        re-aggregated. Without a watermark, or with full=True, today's
+        snapshot is rebuilt from all open opportunities.
+
+        Args:
+            db: Database session, committed by this method
+            full: Rebuild instead of refreshing incrementally
+
+        Returns:
+            Number of groups re-aggregated, or None when another refresh
+            holds the lock
+        """
+        watermark = await self._begin(db, PIPELINE_SUMMARY)
+        if watermark is False:
+            return None
+
+        if full or watermark is None:
+            await db.execute(text("DELETE FROM crm.crm_pipeline_summary_member"))
+            await db.execute(text(
+                f"INSERT INTO crm.crm_pipeline_summary_member {_PIPELINE_MEMBER_SELECT}"
+            ))
+            await db.execute(text("DELETE FROM crm.crm_pipeline_summary WHERE summary_date = CURRENT_DATE"))
+            result = await db.execute(text(_PIPELINE_AGGREGATE.format(scope="")))
+            return await self._finish(db, PIPELINE_SUMMARY, result.rowcount, full=True)
+
+        await db.execute(text("""
+            INSERT INTO crm.crm_pipeline_summary (
+                summary_date, sales_rep_id, team_id, stage_id,
+                opportunity_count, total_value, weighted_value, avg_days_in_stage
+            )
+            SELECT
+                CURRENT_DATE, sales_rep_id, team_id, stage_id,
+                opportunity_count, total_value, weighted_value,
+                avg_days_in_stage + (CURRENT_DATE - summary_date)
+            FROM crm.crm_pipeline_summary
+            WHERE summary_date = (SELECT MAX(summary_date) FROM crm.crm_pipeline_summary)
+              AND summary_date < CURRENT_DATE
+        """))
+
+        params = {"since": watermark - WATERMARK_OVERLAP}
+        # Groups the changed opportunities were counted in, and belong to now
+        await db.execute(text(f"""
+            CREATE TEMP TABLE pipeline_affected ON COMMIT DROP AS
+            SELECT m.sales_rep_id, m.team_id, m.stage_id
+            FROM crm.crm_pipeline_summary_member m
+            JOIN crm.crm_opportunity o ON o.opportunity_id = m.opportunity_id
+            WHERE o.updated_at > :since
+            UNION
+            SELECT c.owner_id, c.team_id, c.stage_id
+            FROM ({_PIPELINE_MEMBER_SELECT} AND o.updated_at > :since) c
+        """), params)
+        await db.execute(text("""
+            DELETE FROM crm.crm_pipeline_summary_member m
+            USING crm.crm_opportunity o
+            WHERE o.opportunity_id = m.opportunity_id AND o.updated_at > :since
+        """), params)
+        await db.execute(text(
+            f"INSERT INTO crm.crm_pipeline_summary_member {_PIPELINE_MEMBER_SELECT} AND o.updated_at > :since"
+        ), params)
+
+        await db.execute(text(f"""
+            DELETE FROM crm.crm_pipeline_summary s
+            USING pipeline_affected a
+            WHERE s.summary_date = CURRENT_DATE AND {_PIPELINE_GROUP_MATCH.format(a="s", b="a")}
+        """))
+        scope = f"JOIN pipeline_affected a ON {_PIPELINE_GROUP_MATCH.format(a='m', b='a')}"
+        await db.execute(text(_PIPELINE_AGGREGATE.format(scope=scope)))
+
+        result = await db.execute(text("SELECT COUNT(*) FROM pipeline_affected"))
+        return await self._finish(db, PIPELINE_SUMMARY, result.scalar())
+
+    async def refresh_quote_analytics(self, db: AsyncSession, full: bool = False) -> Optional[int]:
+        """
+        Bring crm_quote_analytics up to date
+
+        Only the groups that quotes changed since the watermark left or
+        joined are re-aggregated. Without a watermark, or with full=True,
+        the table is rebuilt from all quotes.
+
+        Args:
+            db: Database session, committed by this method
+            full: Rebuild instead of refreshing incrementally
+
+        Returns:
+            Number of groups re-aggregated, or None when another refresh
+            holds the lock
+        """
+        watermark = await self._begin(db, QUOTE_ANALYTICS)
+        if watermark is False:
+            return None
+
+        if full or watermark is None:
+            await db.execute(text("DELETE FROM crm.crm_quote_analytics_member"))
+            await db.execute(text(
+                f"INSERT INTO crm.crm_quote_analytics_member {_QUOTE_MEMBER_SELECT}"
+            ))
+            await db.execute(text("DELETE FROM crm.crm_quote_analytics"))
+            result = await db.execute(text(_QUOTE_AGGREGATE.format(scope="")))
+            return await self._finish(db, QUOTE_ANALYTICS, result.rowcount, full=True)
+
+        params = {"since": watermark - WATERMARK_OVERLAP}
+        await db.execute(text(f"""
+            CREATE TEMP TABLE quote_affected ON COMMIT DROP AS
+            SELECT m.analytics_date, m.sales_rep_id, m.team_id, m.industry_id
+            FROM crm.crm_quote_analytics_member m
+            JOIN crm.crm_quotation q ON q.quote_id = m.quote_id
+            WHERE q.updated_at > :since
+            UNION
+            SELECT c.quote_date, c.owner_id, c.team_id, c.industry_id
+            FROM ({_QUOTE_MEMBER_SELECT} WHERE q.updated_at > :since) c
+        """), params)
+        await db.execute(text("""
+            DELETE FROM crm.crm_quote_analytics_member m
+            USING crm.crm_quotation q
+            WHERE q.quote_id = m.quote_id AND q.updated_at > :since
+        """), params)
+        await db.execute(text(
+            f"INSERT INTO crm.crm_quote_analytics_member {_QUOTE_MEMBER_SELECT} WHERE q.updated_at > :since"
+        ), params)
+
+        await db.execute(text(f"""
+            DELETE FROM crm.crm_quote_analytics s
+            USING quote_affected a
+            WHERE {_QUOTE_GROUP_MATCH.format(a="s", b="a")}
+        """))
+        scope = f"JOIN quote_affected a ON {_QUOTE_GROUP_MATCH.format(a='m', b='a')}"
+        await db.execute(text(_QUOTE_AGGREGATE.format(scope=scope)))
+
+        result = await db.execute(text("SELECT COUNT(*) FROM quote_affected"))
+        return await self._finish(db, QUOTE_ANALYTICS, result.scalar())
+
+    async def get_pipeline_summary(
+        self,
+        db: AsyncSession,
+        summary_date: Optional[date] = None,
+        sales_rep_id: Optional[int] = None,
+        team_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Read a pipeline snapshot by stage
+
+        Args:
+            db: Database session
+            summary_date: Snapshot date (latest snapshot if None)
+            sales_rep_id: Filter by opportunity owner
+            team_id: Filter by team
+
+        Returns:
+            Snapshot date, refresh time, totals and per-stage rows
+        """
+        conditions = [
+            "s.summary_date = COALESCE(:summary_date, "
+            "(SELECT MAX(summary_date) FROM crm.crm_pipeline_summary))"
+        ]
+        params: Dict[str, Any] = {"summary_date": summary_date}
+        if sales_rep_id is not None:
+            conditions.append("s.sales_rep_id = :sales_rep_id")
+            params["sales_rep_id"] = sales_rep_id
+        if team_id is not None:
+            conditions.append("s.team_id = :team_id")
+            params["team_id"] = team_id
+
+        result = await db.execute(text(f"""
+            SELECT
+                s.summary_date,
+                s.stage_id,
+                os.stage_code,
+                os.stage_name,
+                os.probability_percent,
+                SUM(s.opportunity_count) as opportunity_count,
+                SUM(s.total_value) as total_value,
+                SUM(s.weighted_value) as weighted_value,
+                SUM(s.avg_days_in_stage * s.opportunity_count)
+                    / NULLIF(SUM(s.opportunity_count), 0) as avg_days_in_stage
+            FROM crm.crm_pipeline_summary s
+            LEFT JOIN crm.crm_opportunity_stage os ON os.stage_id = s.stage_id
+            WHERE {" AND ".join(conditions)}
+            GROUP BY s.summary_date, s.stage_id, os.stage_code, os.stage_name,
+                     os.probability_percent, os.display_order
+            ORDER BY os.display_order, s.stage_id
+        """), params)
+        rows = result.fetchall()
+
+        stages = [
+            {
+                "stageId": row.stage_id,
+                "stageCode": row.stage_code,
+                "stageName": row.stage_name,
+                "probabilityPercent": row.probability_percent,
+                "opportunityCount": int(row.opportunity_count),
+                "totalValue": float(row.total_value or 0),
+                "weightedValue": float(row.weighted_value or 0),
+                "avgDaysInStage": round(float(row.avg_days_in_stage), 2)
+                if row.avg_days_in_stage is not None else None,
+            }
+            for row in rows
+        ]
+        return {
+            "summaryDate": rows[0].summary_date.isoformat() if rows else None,
+            "refreshedAt": await self._refreshed_at(db, PIPELINE_SUMMARY),
+            "opportunityCount": sum(stage["opportunityCount"] for stage in stages),
+            "totalValue": sum(stage["totalValue"] for stage in stages),
+            "weightedValue": sum(stage["weightedValue"] for stage in stages),
+            "stages": stages,
+        }
+
+    async def get_quote_analytics(
+        self,
+        db: AsyncSession,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        sales_rep_id: Optional[int] = None,
+        team_id: Optional[int] = None,
+        industry_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Read daily quote analytics
+
+        Groups matching the filters are combined per day; averages are
+        weighted by the number of quotes behind them.
+
+        Args:
+            db: Database session
+            date_from: First quote date (inclusive)
+            date_to: Last quote date (inclusive)
+            sales_rep_id: Filter by quote owner
+            team_id: Filter by the owner's team
+            industry_id: Filter by customer industry
+
+        Returns:
+            Refresh time and one row per quote date, newest first
+        """
+        conditions = ["1=1"]
+        params: Dict[str, Any] = {}
+        for column, value in (
+            ("sales_rep_id", sales_rep_id),
+            ("team_id", team_id),
+            ("industry_id", industry_id),
+        ):
+            if value is not None:
+                conditions.append(f"a.{column} = :{column}")
+                params[column] = value
+        if date_from is not None:
+            conditions.append("a.analytics_date >= :date_from")
+            params["date_from"] = date_from
+        if date_to is not None:
+            conditions.append("a.analytics_date <= :date_to")
+            params["date_to"] = date_to
+
+        result = await db.execute(text(f"""
+            SELECT
+                a.analytics_date,
+                SUM(a.quotes_created) as quotes_created,
+                SUM(a.quotes_sent) as quotes_sent,
+                SUM(a.quotes_accepted) as quotes_accepted,
+                SUM(a.quotes_rejected) as quotes_rejected,
+                SUM(a.quotes_expired) as quotes_expired,
+                SUM(a.total_value_quoted) as total_value_quoted,
+                SUM(a.total_value_won) as total_value_won,
+                SUM(a.avg_discount_percent * a.quotes_created)
+                    / NULLIF(SUM(a.quotes_created) FILTER (WHERE a.avg_discount_percent IS NOT NULL), 0)
+                    as avg_discount_percent,
+                SUM(a.avg_response_time_hours * a.quotes_sent)
+                    / NULLIF(SUM(a.quotes_sent) FILTER (WHERE a.avg_response_time_hours IS NOT NULL), 0)
+                    as avg_response_time_hours
+            FROM crm.crm_quote_analytics a
+            WHERE {" AND ".join(conditions)}
+            GROUP BY a.analytics_date
+            ORDER BY a.analytics_date DESC
+        """), params)
+
+        days = []
+        for row in result.fetchall():
+            created = int(row.quotes_created)
+            sent = int(row.quotes_sent)
+            accepted = int(row.quotes_accepted)
+            value_quoted = float(row.total_value_quoted or 0)
+            days.append({
+                "date": row.analytics_date.isoformat(),
+                "quotesCreated": created,
+                "quotesSent": sent,
+                "quotesAccepted": accepted,
+                "quotesRejected": int(row.quotes_rejected),
+                "quotesExpired": int(row.quotes_expired),
+                "totalValueQuoted": value_quoted,
+                "totalValueWon": float(row.total_value_won or 0),
+                "avgQuoteValue": round(value_quoted / created, 2) if created else None,
+                "avgDiscountPercent": _round(row.avg_discount_percent),
+                "avgResponseTimeHours": _round(row.avg_response_time_hours),
+                "conversionRate": round(accepted * 100 / sent, 2) if sent else None,
+            })
+        return {
+            "refreshedAt": await self._refreshed_at(db, QUOTE_ANALYTICS),
+            "days": days,
+        }
+
+    async def _begin(self, db: AsyncSession, aggregate: str):
+        """
+        Open the refresh transaction
+
+        Runs at REPEATABLE READ so every step sees the same changes, and
+        takes a transaction-scoped advisory lock so concurrent refreshers
+        (other API instances, the CLI) skip instead of double counting.
+
+        Returns:
+            The aggregate's watermark, None if it has never been refreshed,
+            or False if another refresh holds the lock
+        """
+        await db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+        result = await db.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:aggregate))"), {"aggregate": aggregate}
+        )
+        if not result.scalar():
+            await db.rollback()
+            logger.info(f"Skipping {aggregate} refresh; another refresh is running")
+            return False
+
+        result = await db.execute(text("""
+            SELECT high_watermark FROM crm.crm_aggregate_watermark WHERE aggregate_name = :aggregate
+        """), {"aggregate": aggregate})
+        return result.scalar()
+
+    async def _finish(self, db: AsyncSession, aggregate: str, groups: int, full: bool = False) -> int:
+        """Advance the watermark to the start of this refresh and commit"""
+        await db.execute(text("""
+            INSERT INTO crm.crm_aggregate_watermark (aggregate_name, high_watermark, rows_refreshed, refreshed_at)
+            VALUES (:aggregate, CURRENT_TIMESTAMP, :groups, clock_timestamp())
+            ON CONFLICT (aggregate_name) DO UPDATE
+            SET high_watermark = EXCLUDED.high_watermark,
+                rows_refreshed = EXCLUDED.rows_refreshed,
+                refreshed_at = EXCLUDED.refreshed_at
+        """), {"aggregate": aggregate, "groups": groups})
+        await db.commit()
+        logger.info(f"Refreshed {aggregate}: {groups} groups{' (full rebuild)' if full else ''}")
+        return groups
+
+    async def _refreshed_at(self, db: AsyncSession, aggregate: str) -> Optional[str]:
+        result = await db.execute(text("""
+            SELECT refreshed_at FROM crm.crm_aggregate_watermark WHERE aggregate_name = :aggregate
+        """), {"aggregate": aggregate})
+        refreshed_at = result.scalar()
+        return refreshed_at.isoformat() if refreshed_at else None
+
+
+def _round(value) -> Optional[float]:
+    return round(float(value), 2) if value is not None else None
+
+
+# Global service instance
+analytics_service = AnalyticsService()
@@ -1,94 +1,232 @@
 """
 Azure OpenAI GPT-4o service for email summarization
 """
+import asyncio
 import logging
-from typing import Dict, Any, List
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Any, List, Optional
+import hashlib
 import json
-from openai import AzureOpenAI
+import httpx
+from openai import AsyncAzureOpenAI, APIConnectionError, APIStatusError, APITimeoutError
 
 from app.config import settings
+from app.utils.cache import DiskCache
+from app.utils.thread_compaction import chunk_thread
+from app.services.llm_stub import StubOpenAIClient
 
 logger = logging.getLogger(__name__)
 
+# Receives each generated text fragment as it streams in
+TokenCallback = Callable[[str], None]
+
+# Bump whenever the summarization prompt or its output schema changes
+SUMMARIZATION_PROMPT_VERSION = "2"
+
+# Structured fields extracted from every conversation
+SUMMARY_JSON_SCHEMA = """{
+    "summary": "A concise summary of the entire conversation (2-3 sentences)",
+    "requested_products": ["list of specific products or equipment mentioned"],
+    "quantities": {"product_name": quantity},
+    "urgency": "low/normal/high/urgent - assess based on timeline mentioned",
+    "shipping_address": "full shipping address if mentioned, otherwise null",
+    "delivery_deadline": "specific date or timeframe mentioned, otherwise null",
+    "customer_comments": "any special requirements, concerns, or important comments",
+    "estimated_budget": numeric value if budget is mentioned (number only, no currency symbol),
+    "key_requirements": ["list of specific requirements or specifications"],
+    "decision_stage": "inquiry/evaluation/negotiation/ready_to_order",
+    "next_steps": "what needs to happen next based on the conversation",
+    "confidence_score": 0.0-1.0 indicating confidence in the extracted information
+}"""
+
 
 class AzureOpenAIService:
     """Service for interacting with Azure OpenAI GPT-4o"""
     
-    def __init__(self):
-        """Initialize Azure OpenAI client"""
+    def __init__(self, client=None):
+        """
+        Initialize Azure OpenAI client
+        
+        Args:
+            client: Chat completions client to use instead of the one selected
+                by LLM_BACKEND ("azure", or "stub" for the local stand-in)
+        """
         try:
-            self.client = AzureOpenAI(
-                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-                api_key=settings.AZURE_OPENAI_API_KEY,
-                api_version=settings.AZURE_OPENAI_API_VERSION
+            # One pooled HTTP client shared by every request
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.AZURE_OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AZURE_OPENAI_MAX_CONNECTIONS
+                ),
+                timeout=settings.AZURE_OPENAI_TIMEOUT_SECONDS
             )
+            if client is not None:
+                self.client = client
+            elif settings.LLM_BACKEND == "stub":
+                self.client = StubOpenAIClient.from_settings(settings)
+                logger.warning("Using the local LLM stub instead of Azure OpenAI")
+            elif settings.LLM_BACKEND == "azure":
+                # Retries are handled here so they can be jittered and bounded
+                self.client = AsyncAzureOpenAI(
+                    azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                    api_key=settings.AZURE_OPENAI_API_KEY,
+                    api_version=settings.AZURE_OPENAI_API_VERSION,
+                    http_client=self.http_client,
+                    max_retries=0
+                )
+            else:
+                raise ValueError(f"Unknown LLM_BACKEND '{settings.LLM_BACKEND}'")
+            self._semaphore = asyncio.Semaphore(settings.AZURE_OPENAI_MAX_CONCURRENCY)
             self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
-            logger.info("Azure OpenAI client initialized successfully")
+            self.summary_cache = DiskCache(
+                settings.SUMMARY_CACHE_DIR,
+                ttl=settings.SUMMARY_CACHE_TTL_SECONDS,
+                max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES
+            ) if settings.SUMMARY_CACHE_ENABLED else None
+            logger.info(f"LLM client initialized successfully ({settings.LLM_BACKEND})")
         except Exception as e:
             logger.error(f"Failed to initialize Azure OpenAI client: {e}")
             raise
     
-    def summarize_email_conversation(
+    async def summarize_email_conversation(
         self, 
-        email_thread: List[Dict[str, Any]]
+        email_thread: List[Dict[str, Any]],
+        on_token: Optional[TokenCallback] = None
     ) -> Dict[str, Any]:
         """
         Summarize an email conversation thread and extract structured data
         
+        The thread is compacted first (quoted history, signatures and
+        repeated paragraphs removed). A thread still larger than
+        SUMMARY_PROMPT_TOKEN_BUDGET is summarized in chunks, each later
+        chunk folded into the running summary. Results are cached on disk
+        by a hash of the compacted text, the prompt version and the
+        deployment, so unchanged threads skip the LLM.
+        
         Args:
             email_thread: List of email messages with sender, content, timestamp
+            on_token: Called with each fragment of the model output as it streams
             
         Returns:
             Dictionary with summary and extracted information
         """
         try:
-            # Build conversation text
-            conversation_text = self._format_email_thread(email_thread)
-            
-            # Create prompt for GPT-4o
-            prompt = self._create_summarization_prompt(conversation_text)
+            # Build compacted conversation text
+            chunks = chunk_thread(email_thread, settings.SUMMARY_PROMPT_TOKEN_BUDGET)
+            if len(chunks) > 1:
+                logger.info(f"Email conversation over token budget, summarizing in {len(chunks)} chunks")
             
-            # Call Azure OpenAI
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert sales assistant analyzing email conversations between customers and sales representatives. Extract key information and provide structured summaries."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
+            result = await self._summarize(
+                chunks[0], self._create_summarization_prompt(chunks[0]), on_token
             )
+            for chunk in chunks[1:]:
+                result = await self._fold_into_summary(result, chunk, on_token)
+            return result
             
-            # Parse response
-            result = json.loads(response.choices[0].message.content)
-            logger.info(f"Email summarization completed successfully")
+        except Exception as e:
+            logger.error(f"Error summarizing email conversation: {e}")
+            raise
+    
+    async def update_email_summary(
+        self,
+        previous_summary: Dict[str, Any],
+        new_messages: List[Dict[str, Any]],
+        first_message_number: int,
+        on_token: Optional[TokenCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Fold new messages into an existing structured summary
+        
+        Only the prior summary and the messages since it are sent, so the
+        prompt size no longer grows with the length of the thread.
+        
+        Args:
+            previous_summary: Structured summary of the earlier messages
+            new_messages: Messages received since that summary, oldest first
+            first_message_number: Position of the first new message in the thread
+            on_token: Called with each fragment of the model output as it streams
             
+        Returns:
+            Dictionary with the updated summary and extracted information
+        """
+        try:
+            chunks = chunk_thread(
+                new_messages, settings.SUMMARY_PROMPT_TOKEN_BUDGET, start=first_message_number
+            )
+            result = previous_summary
+            for chunk in chunks:
+                result = await self._fold_into_summary(result, chunk, on_token)
             return result
             
         except Exception as e:
-            logger.error(f"Error summarizing email conversation: {e}")
+            logger.error(f"Error updating email summary: {e}")
             raise
     
-    def _format_email_thread(self, email_thread: List[Dict[str, Any]]) -> str:
-        """Format email thread for GPT-4o processing"""
-        formatted = []
-        for idx, email in enumerate(email_thread, 1):
-            formatted.append(f"Message {idx}:")
-            formatted.append(f"From: {email.get('from_name', 'Unknown')} <{email.get('from_email', '')}>")
-            formatted.append(f"To: {', '.join(email.get('to_emails', []))}")
-            formatted.append(f"Date: {email.get('sent_at', '')}")
-            formatted.append(f"Subject: {email.get('subject', '')}")
-            formatted.append(f"\n{email.get('body_text', '')}")
-            formatted.append("\n" + "="*80 + "\n")
+    async def _fold_into_summary(
+        self,
+        previous_summary: Dict[str, Any],
+        conversation_text: str,
+        on_token: Optional[TokenCallback] = None
+    ) -> Dict[str, Any]:
+        """Update a structured summary with already formatted messages"""
+        previous_text = json.dumps(previous_summary, indent=2, sort_keys=True, default=str)
+        prompt = self._create_update_prompt(previous_text, conversation_text)
+        return await self._summarize(f"{previous_text}\0{conversation_text}", prompt, on_token)
+    
+    async def _summarize(
+        self,
+        cache_text: str,
+        prompt: str,
+        on_token: Optional[TokenCallback] = None
+    ) -> Dict[str, Any]:
+        """Run a summarization prompt, serving repeats from the summary cache"""
+        # Serve unchanged threads from the summary cache
+        cache_key = self._summary_cache_key(cache_text)
+        if self.summary_cache is not None:
+            cached = self.summary_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Email summarization served from cache")
+                return cached
+        
+        # Call Azure OpenAI
+        content = await self._complete_text(
+            on_token,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert sales assistant analyzing email conversations between customers and sales representatives. Extract key information and provide structured summaries."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0.3,
+            max_tokens=1500,
+            response_format={"type": "json_object"}
+        )
         
-        return "\n".join(formatted)
+        # Parse response
+        result = json.loads(content)
+        logger.info(f"Email summarization completed successfully")
+        
+        if self.summary_cache is not None:
+            try:
+                self.summary_cache.set(cache_key, result)
+            except OSError as e:
+                logger.warning(f"Failed to cache email summary: {e}")
+        
+        return result
+    
+    def _summary_cache_key(self, conversation_text: str) -> str:
+        """Content-address a summary by thread text, prompt version and deployment"""
+        digest = hashlib.sha256()
+        for part in (SUMMARIZATION_PROMPT_VERSION, self.deployment_name, conversation_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
     
     def _create_summarization_prompt(self, conversation_text: str) -> str:
         """Create prompt for email summarization"""
@@ -96,20 +234,7 @@ class AzureOpenAIService:
 Analyze the following email conversation between a customer and a sales representative. 
 Extract and structure the following information in JSON format:
 
-{{
-    "summary": "A concise summary of the entire conversation (2-3 sentences)",
-    "requested_products": ["list of specific products or equipment mentioned"],
-    "quantities": {{"product_name": quantity}},
-    "urgency": "low/normal/high/urgent - assess based on timeline mentioned",
-    "shipping_address": "full shipping address if mentioned, otherwise null",
-    "delivery_deadline": "specific date or timeframe mentioned, otherwise null",
-    "customer_comments": "any special requirements, concerns, or important comments",
-    "estimated_budget": numeric value if budget is mentioned (number only, no currency symbol),
-    "key_requirements": ["list of specific requirements or specifications"],
-    "decision_stage": "inquiry/evaluation/negotiation/ready_to_order",
-    "next_steps": "what needs to happen next based on the conversation",
-    "confidence_score": 0.0-1.0 indicating confidence in the extracted information
-}}
+{SUMMARY_JSON_SCHEMA}
 
 Email Conversation:
 {conversation_text}
@@ -117,10 +242,31 @@ Email Conversation:
 Provide ONLY valid JSON output without any additional text or explanation.
 """
     
-    def generate_quote_description(
+    def _create_update_prompt(self, previous_summary: str, new_messages_text: str) -> str:
+        """Create prompt for folding new messages into an existing summary"""
+        return f"""
+Below is the structured summary of an email conversation between a customer and a sales
+representative, followed by the new messages received since that summary was written.
+Update the summary so it reflects the whole conversation: keep facts that still hold, revise
+anything the new messages change (quantities, products, deadlines, addresses, budget, stage),
+and add new information. Use exactly this JSON format:
+
+{SUMMARY_JSON_SCHEMA}
+
+Current Summary:
+{previous_summary}
+
+New Messages:
+{new_messages_text}
+
+Provide ONLY valid JSON output without any additional text or explanation.
+"""
+    
+    async def generate_quote_description(
         self, 
         summary: Dict[str, Any],
-        products_info: List[Dict[str, Any]]
+        products_info: List[Dict[str, Any]],
+        on_token: Optional[TokenCallback] = None
     ) -> str:
         """
         Generate professional quote description based on email summary
@@ -128,6 +274,7 @@ Provide ONLY valid JSON output without any additional text or explanation.
         Args:
             summary: Email conversation summary
             products_info: List of products with pricing
+            on_token: Called with each fragment of the description as it streams
             
         Returns:
             Professional quote description text
@@ -141,16 +288,16 @@ quote introduction/description (2-3 paragraphs) that:
 3. Highlights key benefits and value proposition
 
 Customer Requirements:
-{json.dumps(summary, indent=2)}
+{json.dumps(summary, indent=2, default=str)}
 
 Proposed Products:
-{json.dumps(products_info, indent=2)}
+{json.dumps(products_info, indent=2, default=str)}
 
 Generate a professional, concise quote description:
 """
             
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
+            content = await self._complete_text(
+                on_token,
                 messages=[
                     {
                         "role": "system",
@@ -165,12 +312,137 @@ Generate a professional, concise quote description:
                 max_tokens=500
             )
             
-            return response.choices[0].message.content.strip()
+            return content.strip()
             
         except Exception as e:
             logger.error(f"Error generating quote description: {e}")
             return "Thank you for your interest. Please find below our quotation for the requested items."
 
+    
+    async def close(self) -> None:
+        """Close pooled HTTP connections"""
+        await self.http_client.aclose()
+    
+    async def _chat_completion(self, **kwargs):
+        """
+        Chat completion with bounded concurrency, a per-call timeout and
+        jittered retries on throttling and server errors
+        
+        At most AZURE_OPENAI_MAX_CONCURRENCY calls are in flight; retry
+        waits happen outside that limit so they do not hold a slot.
+        """
+        max_retries = settings.AZURE_OPENAI_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            async with self._semaphore:
+                try:
+                    return await self.client.chat.completions.create(
+                        model=self.deployment_name,
+                        timeout=settings.AZURE_OPENAI_TIMEOUT_SECONDS,
+                        **kwargs
+                    )
+                except (APIStatusError, APITimeoutError, APIConnectionError) as e:
+                    if attempt >= max_retries or not self._is_retryable(e):
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                    error_name = e.__class__.__name__
+            
+            logger.warning(
+                f"Azure OpenAI call failed ({error_name}), "
+                f"retry {attempt + 1}/{max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    async def _complete_text(self, on_token: Optional[TokenCallback], **kwargs) -> str:
+        """Completion text, streamed through on_token when one is given"""
+        if on_token is None:
+            response = await self._chat_completion(**kwargs)
+            return response.choices[0].message.content
+        return await self._stream_chat_completion(on_token, **kwargs)
+    
+    async def _stream_chat_completion(self, on_token: TokenCallback, **kwargs) -> str:
+        """
+        Streaming chat completion, passing each content delta to on_token
+        
+        Uses the same concurrency limit and retry policy as _chat_completion,
+        except that a call is only retried if it failed before the first
+        token was delivered.
+        
+        Returns:
+            The complete generated text
+        """
+        max_retries = settings.AZURE_OPENAI_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            parts: List[str] = []
+            async with self._semaphore:
+                try:
+                    stream = await self.client.chat.completions.create(
+                        model=self.deployment_name,
+                        timeout=settings.AZURE_OPENAI_TIMEOUT_SECONDS,
+                        stream=True,
+                        **kwargs
+                    )
+                    async for chunk in stream:
+                        # Azure sends a first chunk with no choices (content filter results)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            parts.append(delta)
+                            on_token(delta)
+                    return "".join(parts)
+                except (APIStatusError, APITimeoutError, APIConnectionError) as e:
+                    if parts or attempt >= max_retries or not self._is_retryable(e):
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                    error_name = e.__class__.__name__
+            
+            logger.warning(
+                f"Azure OpenAI stream failed ({error_name}), "
+                f"retry {attempt + 1}/{max_retries} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Timeouts, connection errors, 408/409/429 and 5xx are retried"""
+        if isinstance(error, APIStatusError):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return True
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Honor Retry-After when the service sends it, else full-jitter backoff"""
+        cap = settings.AZURE_OPENAI_RETRY_MAX_SECONDS
+        retry_after = None
+        if isinstance(error, APIStatusError):
+            retry_after = self._parse_retry_after(error.response.headers)
+        
+        if retry_after is not None:
+            # Small jitter so throttled callers do not all return at once
+            return min(cap, retry_after) + random.uniform(0, 0.5)
+        
+        backoff = settings.AZURE_OPENAI_RETRY_BASE_SECONDS * (2 ** attempt)
+        return random.uniform(0, min(cap, backoff))
+    
+    def _parse_retry_after(self, headers: httpx.Headers) -> Optional[float]:
+        """Seconds to wait from retry-after-ms / Retry-After, if present"""
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return max(0.0, float(retry_after_ms) / 1000)
+            except ValueError:
+                pass
+        
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
 
 # Global service instance
 azure_openai_service = AzureOpenAIService()
@@ -1,215 +1,487 @@
 """
 Email conversation management service
 """
+import base64
+import json
 import logging
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+import time
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import datetime
 
-from app.models import EmailThread, EmailMessage, EmailSummary, EmailStatus
-from app.services.azure_openai_service import azure_openai_service
+from app.config import settings
+from app.models import EmailThread, EmailThreadWithMessages, EmailMessage, EmailSummary, EmailStatus
+from app.services.azure_openai_service import (
+    azure_openai_service, SUMMARIZATION_PROMPT_VERSION, TokenCallback
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Thread columns shared by the list and detail queries
+_THREAD_COLUMNS = """
+        t.thread_id,
+        t.thread_subject,
+        COALESCE(NULLIF(TRIM(CONCAT(ct.first_name, ' ', ct.last_name)), ''), c.customer_name) as customer_name,
+        ct.email as customer_email,
+        t.status,
+        t.message_count,
+        t.first_message_at,
+        t.last_message_at,
+        CASE WHEN t.reference_type = 'QUOTATION' THEN t.reference_id END as quote_id,
+        t.created_at,
+        t.updated_at
+"""
+
+_THREAD_FROM = """
+    FROM crm.crm_email_thread t
+    LEFT JOIN crm.crm_contact ct ON t.contact_id = ct.contact_id
+    LEFT JOIN crm.crm_customer c ON t.customer_id = c.customer_id
+"""
+
+_THREAD_SELECT = "SELECT" + _THREAD_COLUMNS + _THREAD_FROM
+
+
 class EmailService:
     """Service for managing email conversations"""
     
-    def __init__(self):
-        """Initialize email service"""
-        self.mock_emails = []  # Will be loaded from MockData
-    
-    def load_mock_emails(self) -> List[Dict[str, Any]]:
-        """
-        Load mock email conversations from the MockData file
-        This is a simplified version - in production, you'd parse the actual file
+    async def get_all_threads(
+        self,
+        db: AsyncSession,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[EmailStatus] = None,
+        customer_id: Optional[int] = None
+    ) -> Tuple[List[EmailThread], Optional[str]]:
         """
-        # Sample mock data based on the MockMailConversations.md
-        mock_conversations = [
-            {
-                "thread_id": 21,
-                "subject": "Quotation #Q-2025-1201 - CAT 320 Excavator",
-                "customer_name": "Mark Thompson",
-                "customer_email": "m.thompson@thompsonexcavating.com",
-                "status": "quote_generated",
-                "messages": [
-                    {
-                        "from_name": "Mark Thompson",
-                        "from_email": "m.thompson@thompsonexcavating.com",
-                        "to_emails": ["lisa.anderson@heavyequipdealer.com"],
-                        "subject": "CAT 320 Excavator Inquiry",
-                        "body_text": "Hi Lisa, I'm interested in purchasing a CAT 320 Excavator for our excavating business. We need it with a 42-inch bucket, standard tracks, AC cabin, and rear camera. Our budget is around $290,000. Can you provide a quote? We need delivery within 3-4 weeks.",
-                        "sent_at": "2025-12-10T09:00:00",
-                        "direction": "inbound"
-                    },
-                    {
-                        "from_name": "Lisa Anderson",
-                        "from_email": "lisa.anderson@heavyequipdealer.com",
-                        "to_emails": ["m.thompson@thompsonexcavating.com"],
-                        "subject": "RE: CAT 320 Excavator Inquiry",
-                        "body_text": "Dear Mr. Thompson, Thank you for your interest. I can offer the CAT 320 with your specified configuration at $295,000. Payment terms: 30% deposit, balance on delivery. Delivery: 3-4 weeks. Please let me know if you have any questions.",
-                        "sent_at": "2025-12-10T11:00:00",
-                        "direction": "outbound"
-                    }
-                ]
-            },
-            {
-                "thread_id": 22,
-                "subject": "Wheel Loader Fleet Purchase",
-                "customer_name": "Susan Baker",
-                "customer_email": "s.baker@bakerquarry.com",
-                "status": "open",
-                "messages": [
-                    {
-                        "from_name": "Susan Baker",
-                        "from_email": "s.baker@bakerquarry.com",
-                        "to_emails": ["mike.thompson@heavyequipdealer.com"],
-                        "subject": "Fleet Purchase - 3 Wheel Loaders",
-                        "body_text": "Mike, We're looking to purchase 3 Komatsu WA380-8 Wheel Loaders for our quarry operations. We need extended warranty (5 years) on all units. Delivery should be staggered over 6-8 weeks. What's your best fleet pricing? Our shipping address is Baker Quarry Operations, 5678 Quarry Road, Denver, CO 80201.",
-                        "sent_at": "2025-12-11T10:00:00",
-                        "direction": "inbound"
-                    }
-                ]
-            },
-            {
-                "thread_id": 23,
-                "subject": "URGENT - Mini Excavator Needed",
-                "customer_name": "Tony Russo",
-                "customer_email": "t.russo@russolandscaping.com",
-                "status": "open",
-                "messages": [
-                    {
-                        "from_name": "Tony Russo",
-                        "from_email": "t.russo@russolandscaping.com",
-                        "to_emails": ["sarah.johnson@heavyequipdealer.com"],
-                        "subject": "URGENT: Mini Excavator Required by Monday",
-                        "body_text": "Sarah, URGENT REQUEST! We need a Kubota KX040-4 Mini Excavator by Monday. Our current equipment broke down and we have a project starting. Budget is $55,000 max. Can you help? Ship to: Russo Landscaping, 234 Garden Way, Atlanta, GA 30301. Please respond ASAP!",
-                        "sent_at": "2025-12-14T08:00:00",
-                        "direction": "inbound"
-                    }
-                ]
-            }
-        ]
+        Get one page of email threads, most recently active first
         
-        self.mock_emails = mock_conversations
-        return mock_conversations
-    
-    def get_all_threads(self, db: Session) -> List[EmailThread]:
-        """Get all email threads"""
-        try:
-            # Load mock data if not already loaded
-            if not self.mock_emails:
-                self.load_mock_emails()
-            
-            threads = []
-            for conv in self.mock_emails:
-                thread = EmailThread(
-                    thread_id=conv["thread_id"],
-                    subject=conv["subject"],
-                    customer_name=conv.get("customer_name"),
-                    customer_email=conv.get("customer_email"),
-                    status=EmailStatus(conv.get("status", "open")),
-                    message_count=len(conv.get("messages", [])),
-                    first_message_at=datetime.fromisoformat(conv["messages"][0]["sent_at"]) if conv.get("messages") else None,
-                    last_message_at=datetime.fromisoformat(conv["messages"][-1]["sent_at"]) if conv.get("messages") else None
-                )
-                threads.append(thread)
+        Pages are keyset-paginated on (last_message_at, thread_id), so each
+        page costs the same regardless of how deep the caller has scrolled.
+        
+        Args:
+            db: Async database session
+            limit: Page size
+            cursor: Opaque cursor returned with the previous page
+            status: Only threads with this status
+            customer_id: Only threads for this customer
             
-            return threads
+        Returns:
+            Tuple of (threads, cursor for the next page or None)
             
-        except Exception as e:
-            logger.error(f"Error fetching email threads: {e}")
-            return []
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        conditions = []
+        params: Dict[str, Any] = {"limit": limit + 1}
+        
+        if status is not None:
+            conditions.append("t.status = :status")
+            params["status"] = status.value.upper()
+        if customer_id is not None:
+            conditions.append("t.customer_id = :customer_id")
+            params["customer_id"] = customer_id
+        
+        def page_query(extra: List[str]) -> str:
+            where = " AND ".join(conditions + extra)
+            return (
+                _THREAD_SELECT + (f"WHERE {where} " if where else "") +
+                "ORDER BY t.last_message_at DESC NULLS LAST, t.thread_id DESC LIMIT :limit"
+            )
+        
+        if not cursor:
+            query = text(page_query([]))
+        else:
+            last_message_at, thread_id = self._decode_cursor(cursor)
+            params["cursor_id"] = thread_id
+            if last_message_at is None:
+                query = text(page_query(["t.last_message_at IS NULL", "t.thread_id < :cursor_id"]))
+            else:
+                # Threads without messages sort after every dated thread; each
+                # branch stays a range scan on the keyset index
+                params["cursor_at"] = last_message_at
+                query = text(
+                    f"({page_query(['(t.last_message_at, t.thread_id) < (:cursor_at, :cursor_id)'])}) "
+                    f"UNION ALL ({page_query(['t.last_message_at IS NULL'])}) "
+                    "ORDER BY last_message_at DESC NULLS LAST, thread_id DESC LIMIT :limit"
+                )
+        
+        rows = (await db.execute(query, params)).fetchall()
+        
+        # One extra row tells us whether another page exists
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1].last_message_at, rows[-1].thread_id)
+        
+        return [self._row_to_thread(row) for row in rows], next_cursor
     
-    def get_thread_by_id(self, db: Session, thread_id: int) -> Optional[Dict[str, Any]]:
-        """Get specific email thread with messages"""
-        try:
-            if not self.mock_emails:
-                self.load_mock_emails()
-            
-            for conv in self.mock_emails:
-                if conv["thread_id"] == thread_id:
-                    return conv
-            
-            return None
+    async def get_thread_by_id(
+        self,
+        db: AsyncSession,
+        thread_id: int,
+        limit: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> Optional[EmailThreadWithMessages]:
+        """
+        Get an email thread with its messages in a single query
+        
+        Messages come back oldest first. With limit, only the latest
+        ``limit`` messages (older than ``before`` when given) are loaded, so
+        long threads can be paged backwards.
+        
+        Args:
+            db: Async database session
+            thread_id: Email thread ID
+            limit: Maximum number of messages to load
+            before: Only messages older than this message_id
             
+        Returns:
+            Thread with messages, or None if the thread does not exist
+        """
+        before_condition = ""
+        if before is not None:
+            before_condition = """
+                  AND (m.sent_at, m.message_id) < (
+                      SELECT b.sent_at, b.message_id
+                      FROM crm.crm_email_message b
+                      WHERE b.message_id = :before AND b.thread_id = :thread_id
+                  )"""
+        
+        # One row per message (or a single row with NULL message columns)
+        query = text(f"""
+            SELECT {_THREAD_COLUMNS},
+                m.message_id,
+                m.direction,
+                m.from_email,
+                m.from_name,
+                m.to_emails,
+                m.subject,
+                m.body_text,
+                m.sent_at,
+                m.is_read
+            {_THREAD_FROM}
+            LEFT JOIN LATERAL (
+                SELECT 
+                    m.message_id, m.direction, m.from_email, m.from_name, m.to_emails,
+                    m.subject, m.body_text, m.sent_at, m.is_read
+                FROM crm.crm_email_message m
+                WHERE m.thread_id = t.thread_id{before_condition}
+                ORDER BY m.sent_at DESC, m.message_id DESC
+                LIMIT :limit
+            ) m ON true
+            WHERE t.thread_id = :thread_id
+        """)
+        
+        try:
+            rows = (await db.execute(query, {
+                "thread_id": thread_id,
+                "limit": limit,
+                "before": before
+            })).fetchall()
         except Exception as e:
             logger.error(f"Error fetching email thread {thread_id}: {e}")
+            raise
+        
+        if not rows:
             return None
+        
+        # Rows arrive newest first so LIMIT keeps the latest messages
+        messages = [
+            EmailMessage(
+                message_id=row.message_id,
+                thread_id=thread_id,
+                direction=(row.direction or "inbound").lower(),
+                from_email=row.from_email,
+                from_name=row.from_name,
+                to_emails=list(row.to_emails or []),
+                subject=row.subject,
+                body_text=row.body_text or "",
+                sent_at=row.sent_at,
+                is_read=bool(row.is_read)
+            )
+            for row in reversed(rows)
+            if row.message_id is not None
+        ]
+        
+        thread = self._row_to_thread(rows[0])
+        return EmailThreadWithMessages(**thread.model_dump(), messages=messages)
     
-    def summarize_thread(self, db: Session, thread_id: int) -> Optional[EmailSummary]:
+    async def summarize_thread(
+        self,
+        db: AsyncSession,
+        thread_id: int,
+        thread: Optional[EmailThreadWithMessages] = None,
+        use_precomputed: bool = True,
+        store: bool = True,
+        on_token: Optional[TokenCallback] = None
+    ) -> Optional[EmailSummary]:
         """
         Summarize an email thread using Azure OpenAI
         
+        A logged summary that already covers the thread's latest message is
+        returned as is. When the logged summary is older, only the messages
+        after the last one it processed are sent, together with the previous
+        summary. A full pass is made when there is no usable summary for the
+        current prompt version, or after SUMMARY_MAX_INCREMENTAL_UPDATES
+        incremental updates in a row.
+        
         Args:
-            db: Database session
+            db: Async database session
             thread_id: Email thread ID
+            thread: Already loaded thread, to avoid fetching it again
+            use_precomputed: Start from the logged summary when there is one
+            store: Log the new summary to crm_ai_recommendation_log (best
+                effort; the summary is still returned if logging fails)
+            on_token: Called with each fragment of the model output as it streams
             
         Returns:
             EmailSummary object with extracted information
         """
         try:
             # Get the email thread
-            thread_data = self.get_thread_by_id(db, thread_id)
-            if not thread_data:
+            if thread is None:
+                thread = await self.get_thread_by_id(db, thread_id)
+            if not thread:
                 logger.error(f"Email thread {thread_id} not found")
                 return None
             
-            # Call Azure OpenAI for summarization
-            summary_data = azure_openai_service.summarize_email_conversation(
-                thread_data["messages"]
-            )
+            previous = await self.get_latest_summary(db, thread_id) if use_precomputed else None
+            if previous and self._covers(previous, thread):
+                logger.info(f"Email thread {thread_id} summary served from log")
+                return self._summary_from_data(thread_id, previous["data"])
             
-            # Create EmailSummary object
-            summary = EmailSummary(
-                thread_id=thread_id,
-                summary_text=summary_data.get("summary", ""),
-                requested_products=summary_data.get("requested_products", []),
-                quantities=summary_data.get("quantities", {}),
-                urgency=summary_data.get("urgency", "normal"),
-                shipping_address=summary_data.get("shipping_address"),
-                delivery_deadline=summary_data.get("delivery_deadline"),
-                customer_comments=summary_data.get("customer_comments"),
-                estimated_budget=summary_data.get("estimated_budget"),
-                confidence_score=summary_data.get("confidence_score")
-            )
+            started = time.perf_counter()
+            new_messages = self._messages_after(previous, thread)
+            if new_messages is None:
+                # Call Azure OpenAI for summarization
+                summary_data = await azure_openai_service.summarize_email_conversation(
+                    [message.model_dump() for message in thread.messages],
+                    on_token=on_token
+                )
+                incremental_count = 0
+                logger.info(f"Email thread {thread_id} summarized successfully")
+            elif not new_messages:
+                summary_data = previous["data"]
+                incremental_count = previous["incremental_count"]
+            else:
+                summary_data = await azure_openai_service.update_email_summary(
+                    previous["data"],
+                    [message.model_dump() for message in new_messages],
+                    first_message_number=len(thread.messages) - len(new_messages) + 1,
+                    on_token=on_token
+                )
+                incremental_count = previous["incremental_count"] + 1
+                logger.info(
+                    f"Email thread {thread_id} summary updated with "
+                    f"{len(new_messages)} new message(s)"
+                )
+            processing_time_ms = int((time.perf_counter() - started) * 1000)
             
-            logger.info(f"Email thread {thread_id} summarized successfully")
-            return summary
+            if store:
+                try:
+                    await self.store_summary(db, thread, summary_data, processing_time_ms, incremental_count)
+                except Exception as e:
+                    # The LLM call is already paid for; the summary is still usable
+                    logger.error(f"Failed to log summary for email thread {thread_id}: {e}")
+                    await db.rollback()
+            return self._summary_from_data(thread_id, summary_data)
             
         except Exception as e:
             logger.error(f"Error summarizing email thread {thread_id}: {e}")
             raise
     
-    def get_messages_for_thread(self, db: Session, thread_id: int) -> List[EmailMessage]:
-        """Get all messages for a specific thread"""
-        try:
-            thread_data = self.get_thread_by_id(db, thread_id)
-            if not thread_data:
-                return []
-            
-            messages = []
-            for idx, msg_data in enumerate(thread_data.get("messages", []), 1):
-                message = EmailMessage(
-                    message_id=idx,
-                    thread_id=thread_id,
-                    direction=msg_data.get("direction", "inbound"),
-                    from_email=msg_data["from_email"],
-                    from_name=msg_data.get("from_name"),
-                    to_emails=msg_data["to_emails"],
-                    subject=msg_data["subject"],
-                    body_text=msg_data["body_text"],
-                    sent_at=datetime.fromisoformat(msg_data["sent_at"]),
-                    is_read=True
-                )
-                messages.append(message)
-            
-            return messages
+    async def get_latest_summary(
+        self,
+        db: AsyncSession,
+        thread_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Latest logged summary of a thread for the current prompt version
+        
+        Args:
+            db: Async database session
+            thread_id: Email thread ID
             
-        except Exception as e:
-            logger.error(f"Error fetching messages for thread {thread_id}: {e}")
-            return []
+        Returns:
+            Dictionary with the summary data, the last_message_at and
+            last_message_id it covers and its incremental_count, or None
+        """
+        row = (await db.execute(text("""
+            SELECT 
+                l.recommendation_data,
+                (l.input_data->>'last_message_at')::timestamptz as last_message_at,
+                (l.input_data->>'last_message_id')::bigint as last_message_id,
+                COALESCE((l.input_data->>'incremental_count')::int, 0) as incremental_count
+            FROM crm.crm_ai_recommendation_log l
+            WHERE l.recommendation_type = 'EMAIL_SUMMARY'
+              AND l.reference_type = 'EMAIL_THREAD'
+              AND l.reference_id = :thread_id
+              AND l.input_data->>'prompt_version' = :prompt_version
+            ORDER BY l.created_at DESC, l.recommendation_id DESC
+            LIMIT 1
+        """), {
+            "thread_id": thread_id,
+            "prompt_version": SUMMARIZATION_PROMPT_VERSION
+        })).fetchone()
+        if not row or not row.recommendation_data:
+            return None
+        
+        data = row.recommendation_data
+        if isinstance(data, str):
+            data = json.loads(data)
+        return {
+            "data": data,
+            "last_message_at": row.last_message_at,
+            "last_message_id": row.last_message_id,
+            "incremental_count": row.incremental_count
+        }
+    
+    async def store_summary(
+        self,
+        db: AsyncSession,
+        thread: EmailThreadWithMessages,
+        summary_data: Dict[str, Any],
+        processing_time_ms: int,
+        incremental_count: int = 0
+    ) -> None:
+        """
+        Log a thread summary to crm_ai_recommendation_log
+        
+        Args:
+            db: Async database session
+            thread: Summarized thread
+            summary_data: Raw summary returned by the LLM
+            processing_time_ms: Time spent producing the summary
+            incremental_count: Incremental updates since the last full pass
+        """
+        last_message_at = thread.last_message_at.isoformat() if thread.last_message_at else None
+        last_message_id = thread.messages[-1].message_id if thread.messages else None
+        await db.execute(text("""
+            INSERT INTO crm.crm_ai_recommendation_log (
+                recommendation_type, reference_type, reference_id, customer_id,
+                input_data, recommendation_data, confidence_score, model_version,
+                processing_time_ms
+            )
+            SELECT 
+                'EMAIL_SUMMARY', 'EMAIL_THREAD', t.thread_id, t.customer_id,
+                CAST(:input_data AS JSONB), CAST(:recommendation_data AS JSONB),
+                :confidence_score, :model_version, :processing_time_ms
+            FROM crm.crm_email_thread t
+            WHERE t.thread_id = :thread_id
+        """), {
+            "thread_id": thread.thread_id,
+            "input_data": json.dumps({
+                "prompt_version": SUMMARIZATION_PROMPT_VERSION,
+                "last_message_at": last_message_at,
+                "last_message_id": last_message_id,
+                "message_count": len(thread.messages),
+                "incremental_count": incremental_count
+            }),
+            "recommendation_data": json.dumps(summary_data, default=str),
+            "confidence_score": self._confidence(summary_data),
+            "model_version": azure_openai_service.deployment_name,
+            "processing_time_ms": processing_time_ms
+        })
+        await db.commit()
+    
+    async def get_messages_for_thread(
+        self,
+        db: AsyncSession,
+        thread_id: int,
+        limit: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> List[EmailMessage]:
+        """Get messages for a specific thread, oldest first"""
+        thread = await self.get_thread_by_id(db, thread_id, limit=limit, before=before)
+        return thread.messages if thread else []
+    
+    def _covers(self, previous: Dict[str, Any], thread: EmailThreadWithMessages) -> bool:
+        """Whether a logged summary already includes the thread's latest message"""
+        if thread.last_message_at is None or previous["last_message_at"] is None:
+            return False
+        return previous["last_message_at"] >= thread.last_message_at
+    
+    def _messages_after(
+        self,
+        previous: Optional[Dict[str, Any]],
+        thread: EmailThreadWithMessages
+    ) -> Optional[List[EmailMessage]]:
+        """
+        Messages added since a logged summary, or None when a full pass is needed
+        
+        A full pass is needed without a previous summary, when the last message
+        it processed is no longer in the thread, or once the incremental update
+        limit is reached so drift from repeated rewrites cannot accumulate.
+        """
+        if not previous or previous["last_message_id"] is None:
+            return None
+        if previous["incremental_count"] >= settings.SUMMARY_MAX_INCREMENTAL_UPDATES:
+            return None
+        for idx, message in enumerate(thread.messages):
+            if message.message_id == previous["last_message_id"]:
+                return thread.messages[idx + 1:]
+        return None
+    
+    def _summary_from_data(self, thread_id: int, summary_data: Dict[str, Any]) -> EmailSummary:
+        """Build an EmailSummary from raw LLM output"""
+        return EmailSummary(
+            thread_id=thread_id,
+            summary_text=summary_data.get("summary", ""),
+            requested_products=summary_data.get("requested_products", []),
+            quantities=summary_data.get("quantities", {}),
+            urgency=summary_data.get("urgency", "normal"),
+            shipping_address=summary_data.get("shipping_address"),
+            delivery_deadline=summary_data.get("delivery_deadline"),
+            customer_comments=summary_data.get("customer_comments"),
+            estimated_budget=summary_data.get("estimated_budget"),
+            confidence_score=summary_data.get("confidence_score")
+        )
+    
+    def _confidence(self, summary_data: Dict[str, Any]) -> Optional[float]:
+        """Confidence score clamped to the log column's 0-1 range"""
+        try:
+            return min(1.0, max(0.0, float(summary_data.get("confidence_score"))))
+        except (TypeError, ValueError):
+            return None
+    
+    def _row_to_thread(self, row) -> EmailThread:
+        """Build a thread model from a _THREAD_SELECT row"""
+        try:
+            thread_status = EmailStatus((row.status or "open").lower())
+        except ValueError:
+            thread_status = EmailStatus.OPEN
+        
+        return EmailThread(
+            thread_id=row.thread_id,
+            subject=row.thread_subject,
+            customer_name=row.customer_name,
+            customer_email=row.customer_email,
+            status=thread_status,
+            message_count=row.message_count or 0,
+            first_message_at=row.first_message_at,
+            last_message_at=row.last_message_at,
+            quote_id=row.quote_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at
+        )
+    
+    def _encode_cursor(self, last_message_at: Optional[datetime], thread_id: int) -> str:
+        """Opaque page cursor for the last thread on a page"""
+        payload = json.dumps([last_message_at.isoformat() if last_message_at else None, thread_id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+    
+    def _decode_cursor(self, cursor: str) -> Tuple[Optional[datetime], int]:
+        """Inverse of _encode_cursor"""
+        try:
+            last_message_at, thread_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return (
+                datetime.fromisoformat(last_message_at) if last_message_at else None,
+                int(thread_id)
+            )
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 # Global service instance
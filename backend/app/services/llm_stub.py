@@ -0,0 +1,292 @@
+"""
+Deterministic local stand-in for the Azure OpenAI chat completions API
+
+Selected with LLM_BACKEND=stub. It implements the small part of the openai
+client that AzureOpenAIService uses (client.chat.completions.create, with and
+without stream=True), answers summarization prompts with schema-valid JSON
+extracted from the conversation text, and injects configurable latency,
+throttling, server errors and timeouts. The service's concurrency limit,
+retries and caching run unchanged on top of it, so the whole pipeline can be
+benchmarked offline.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import APITimeoutError, InternalServerError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+_STUB_URL = "http://llm-stub.local/openai/deployments/stub/chat/completions"
+
+# Equipment vocabulary, matched case-insensitively, longest first
+_PRODUCTS = [
+    ("mini excavator", "Kubota KX040 Mini Excavator"),
+    ("kx040", "Kubota KX040 Mini Excavator"),
+    ("wheel loader", "Komatsu WA380 Wheel Loader"),
+    ("wa380", "Komatsu WA380 Wheel Loader"),
+    ("bulldozer", "CAT D6 Bulldozer"),
+    ("dozer", "CAT D6 Bulldozer"),
+    ("cat 320", "CAT 320 Excavator"),
+    ("excavator", "CAT 320 Excavator"),
+]
+_QUANTITY = re.compile(
+    r"(?<!cat )\b(\d{1,2})\s+(?:units?|machines?|(?:[\w-]+\s+){0,2}(?:excavators?|loaders?|dozers?|bulldozers?))\b",
+    re.IGNORECASE
+)
+_BUDGET = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{2})?\s*(k|K)?")
+_URGENT = re.compile(r"\b(urgent|asap|emergency|immediately)\b", re.IGNORECASE)
+_SOON = re.compile(r"\b(this week|next week|within \d+ (?:days|weeks))\b", re.IGNORECASE)
+_ADDRESS = re.compile(r"\b\d{2,5} [A-Z][\w ]+ (?:St|Street|Ave|Avenue|Blvd|Road|Rd|Dr|Drive)\b[^\n]*")
+_DEADLINE = re.compile(r"\b(?:by|before|within)\s+([^.,\n]{3,40})", re.IGNORECASE)
+
+
+class StubStats:
+    """Counters for benchmark reports"""
+
+    def __init__(self):
+        self.calls = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class StubChatCompletions:
+    """chat.completions endpoint of the stub client"""
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        latency_jitter_ms: float = 200.0,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        retry_after_ms: int = 500,
+        stream_chunk_chars: int = 24,
+        seed: int = 0
+    ):
+        """
+        Initialize stub
+
+        Args:
+            latency_ms: Mean time to a complete response
+            latency_jitter_ms: Uniform +/- jitter around latency_ms
+            rate_limit_rate: Fraction of calls answered with 429 (with retry-after-ms)
+            error_rate: Fraction of calls failing with 503 after the latency
+            timeout_rate: Fraction of calls failing with a timeout after the latency
+            retry_after_ms: retry-after-ms header sent with 429s
+            stream_chunk_chars: Characters per streamed chunk
+            seed: Seed for latency and error draws
+        """
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.retry_after_ms = retry_after_ms
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self._rng = random.Random(seed)
+        self.stats = StubStats()
+
+    async def create(self, *, messages: List[Dict[str, str]], stream: bool = False, **kwargs):
+        """Mimics AsyncCompletions.create for the arguments the service passes"""
+        self.stats.calls += 1
+        # Draw everything up front so a call's fate depends only on call order
+        roll = self._rng.random()
+        latency = max(0.0, self.latency_ms + self._rng.uniform(-1, 1) * self.latency_jitter_ms) / 1000
+
+        if roll < self.rate_limit_rate:
+            self.stats.rate_limited += 1
+            raise RateLimitError(
+                "Rate limit exceeded (stub)",
+                response=httpx.Response(
+                    429,
+                    headers={"retry-after-ms": str(self.retry_after_ms)},
+                    request=httpx.Request("POST", _STUB_URL)
+                ),
+                body=None
+            )
+
+        content = self._respond(messages, kwargs.get("response_format"))
+        if stream:
+            return self._stream(content, latency, roll)
+
+        self._enter()
+        try:
+            await asyncio.sleep(latency)
+            self._maybe_fail(roll)
+        finally:
+            self._leave()
+        self.stats.completed += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(role="assistant", content=content),
+                finish_reason="stop"
+            )],
+            model=kwargs.get("model", "stub"),
+            created=int(time.time())
+        )
+
+    async def _stream(self, content: str, latency: float, roll: float) -> AsyncIterator[Any]:
+        """Chunks arrive after a time-to-first-token of half the latency"""
+        pieces = [
+            content[i:i + self.stream_chunk_chars]
+            for i in range(0, len(content), self.stream_chunk_chars)
+        ] or [""]
+        self._enter()
+        try:
+            await asyncio.sleep(latency / 2)
+            self._maybe_fail(roll)
+            # Azure's first chunk carries content filter results and no choices
+            yield SimpleNamespace(choices=[])
+            gap = latency / 2 / len(pieces)
+            for piece in pieces:
+                yield SimpleNamespace(choices=[SimpleNamespace(
+                    delta=SimpleNamespace(content=piece), finish_reason=None
+                )])
+                await asyncio.sleep(gap)
+        finally:
+            self._leave()
+        self.stats.completed += 1
+
+    def _enter(self) -> None:
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+
+    def _leave(self) -> None:
+        self.stats.in_flight -= 1
+
+    def _maybe_fail(self, roll: float) -> None:
+        """Server errors and timeouts occupy the bands above the 429 band"""
+        band = roll - self.rate_limit_rate
+        request = httpx.Request("POST", _STUB_URL)
+        if 0 <= band < self.error_rate:
+            self.stats.server_errors += 1
+            raise InternalServerError(
+                "Service unavailable (stub)",
+                response=httpx.Response(503, request=request),
+                body=None
+            )
+        if 0 <= band - self.error_rate < self.timeout_rate:
+            self.stats.timeouts += 1
+            raise APITimeoutError(request=request)
+
+    def _respond(self, messages: List[Dict[str, str]], response_format: Optional[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        if response_format and response_format.get("type") == "json_object":
+            return json.dumps(self._summarize(prompt))
+        return (
+            "Thank you for the opportunity to quote on your equipment needs. Based on your "
+            "requirements, we have prepared the configuration below, priced from our current "
+            "price book with your account discounts applied.\n\n"
+            "Every unit ships with the standard warranty and dealer support, and our team "
+            "can coordinate delivery to your site on your timeline."
+        )
+
+    def _summarize(self, prompt: str) -> Dict[str, Any]:
+        """Schema-valid summary built from the conversation in the prompt"""
+        previous: Dict[str, Any] = {}
+        if "Current Summary:" in prompt and "New Messages:" in prompt:
+            previous_text = prompt.split("Current Summary:", 1)[1].split("New Messages:", 1)[0]
+            try:
+                previous = json.loads(previous_text)
+            except ValueError:
+                previous = {}
+            conversation = prompt.split("New Messages:", 1)[1]
+        elif "Email Conversation:" in prompt:
+            conversation = prompt.split("Email Conversation:", 1)[1]
+        else:
+            conversation = prompt
+        conversation = conversation.rsplit("Provide ONLY valid JSON", 1)[0]
+
+        lowered = conversation.lower()
+        products = list(previous.get("requested_products") or [])
+        for needle, product in _PRODUCTS:
+            if needle in lowered and product not in products:
+                products.append(product)
+
+        quantities = dict(previous.get("quantities") or {})
+        quantity_match = _QUANTITY.search(conversation)
+        for product in products:
+            if quantity_match or product not in quantities:
+                quantities[product] = int(quantity_match.group(1)) if quantity_match else 1
+
+        budget = previous.get("estimated_budget")
+        budget_match = _BUDGET.search(conversation)
+        if budget_match:
+            budget = float(budget_match.group(1).replace(",", "")) * (1000 if budget_match.group(2) else 1)
+
+        if _URGENT.search(conversation):
+            urgency = "urgent"
+        elif _SOON.search(conversation):
+            urgency = "high"
+        else:
+            urgency = previous.get("urgency") or "normal"
+
+        address_match = _ADDRESS.search(conversation)
+        deadline_match = _DEADLINE.search(conversation)
+        body_lines = [
+            line.strip() for line in conversation.splitlines()
+            if line.strip() and not re.match(r"^(Message \d+:|From:|To:|Date:|Subject:|---)", line.strip())
+        ]
+        sentences = re.split(r"(?<=[a-z0-9][.!?])\s", " ".join(body_lines[:8]))
+        first_sentence = next((s for s in sentences if len(s.split()) >= 6), "")[:200]
+
+        if "purchase order" in lowered or "deal!" in lowered:
+            stage = "ready_to_order"
+        elif "quote" in lowered or "quotation" in lowered or "price" in lowered:
+            stage = "negotiation" if budget_match else "evaluation"
+        else:
+            stage = previous.get("decision_stage") or "inquiry"
+
+        return {
+            "summary": previous.get("summary") or first_sentence or "Customer inquiry about equipment.",
+            "requested_products": products,
+            "quantities": quantities,
+            "urgency": urgency,
+            "shipping_address": address_match.group(0).strip() if address_match else previous.get("shipping_address"),
+            "delivery_deadline": deadline_match.group(1).strip() if deadline_match else previous.get("delivery_deadline"),
+            "customer_comments": previous.get("customer_comments"),
+            "estimated_budget": budget,
+            "key_requirements": list(previous.get("key_requirements") or []),
+            "decision_stage": stage,
+            "next_steps": "Send a formal quotation" if stage != "ready_to_order" else "Confirm the purchase order",
+            "confidence_score": 0.8 if products else 0.4,
+        }
+
+
+class StubOpenAIClient:
+    """Object with the chat.completions shape of AsyncAzureOpenAI"""
+
+    def __init__(self, **options):
+        """Options are passed to StubChatCompletions"""
+        self.chat = SimpleNamespace(completions=StubChatCompletions(**options))
+
+    @property
+    def stats(self) -> StubStats:
+        return self.chat.completions.stats
+
+    @classmethod
+    def from_settings(cls, settings) -> "StubOpenAIClient":
+        """Stub configured by the LLM_STUB_* settings"""
+        return cls(
+            latency_ms=settings.LLM_STUB_LATENCY_MS,
+            latency_jitter_ms=settings.LLM_STUB_LATENCY_JITTER_MS,
+            rate_limit_rate=settings.LLM_STUB_RATE_LIMIT_RATE,
+            error_rate=settings.LLM_STUB_ERROR_RATE,
+            timeout_rate=settings.LLM_STUB_TIMEOUT_RATE,
+            retry_after_ms=settings.LLM_STUB_RETRY_AFTER_MS,
+            seed=settings.LLM_STUB_SEED
+        )
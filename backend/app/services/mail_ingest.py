@@ -0,0 +1,435 @@
+"""
+Bulk ingestion of Markdown mock-mail conversations
+
+Parses files in the MockData/MockMailConversations.md format and loads them
+into crm_email_thread / crm_email_message with COPY. The parsed conversations
+can also be used as templates for scaled-up synthetic corpora, for
+benchmarking the email endpoints at production-like volume:
+
+    python -m app.services.mail_ingest ../MockData                  # load as is
+    python -m app.services.mail_ingest ../MockData --messages 1000000
+    python -m app.services.mail_ingest --purge                      # remove loaded mail
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+
+from app.config import settings
+from app.utils.database import engine
+
+logger = logging.getLogger(__name__)
+
+# message_uid prefix of everything loaded by this module, used by --purge
+MOCK_UID_PREFIX = "mock:"
+
+THREAD_COLUMNS = [
+    "thread_id", "thread_subject", "customer_id", "contact_id", "status",
+    "message_count", "first_message_at", "last_message_at"
+]
+MESSAGE_COLUMNS = [
+    "thread_id", "message_uid", "direction", "from_email", "from_name", "to_emails",
+    "cc_emails", "subject", "body_text", "sent_at", "is_read"
+]
+
+_CONVERSATION = re.compile(r"^#{2,4}\s+Conversation\b.*$")
+_FIELD = re.compile(r"^\*\*(Subject|From|To|CC|Date):\*\*\s*(.*?)\s*$")
+_SEPARATOR = re.compile(r"^-{3,}\s*$")
+_NOTE = re.compile(r"^\*\[(.+)\]\*\s*$")
+_ADDRESS = re.compile(r"^(?P<name>.*?)\s*(\((?P<role>[^)]*)\))?\s*<(?P<email>[^>]+)>$")
+_DATE_FORMATS = ["%B %d, %Y %I:%M %p", "%B %d, %Y %H:%M", "%Y-%m-%d %H:%M", "%B %d, %Y"]
+
+
+@dataclass
+class MockMessage:
+    """One parsed email"""
+    from_name: str
+    from_email: str
+    from_role: Optional[str]
+    to_emails: List[str]
+    cc_emails: List[str]
+    subject: str
+    body_text: str
+    sent_at: datetime
+
+    @property
+    def direction(self) -> str:
+        return "OUTBOUND" if (self.from_role or "").lower() == "salesperson" else "INBOUND"
+
+
+@dataclass
+class MockThread:
+    """One parsed conversation thread"""
+    subject: str
+    title: str = ""
+    status: str = "OPEN"
+    messages: List[MockMessage] = field(default_factory=list)
+
+    @property
+    def customer_email(self) -> Optional[str]:
+        for message in self.messages:
+            if (message.from_role or "").lower() == "customer":
+                return message.from_email
+        return None
+
+
+def _parse_address(value: str) -> Tuple[str, Optional[str], str]:
+    """'Name (Role) <email>' -> (name, role, email)"""
+    match = _ADDRESS.match(value.strip())
+    if not match:
+        return value.strip(), None, value.strip()
+    return match.group("name").strip(), match.group("role"), match.group("email").strip()
+
+
+def _parse_addresses(value: str) -> List[str]:
+    return [_parse_address(part)[2] for part in re.split(r",\s*(?=[^,]*<)", value) if part.strip()]
+
+
+def _reply_subject(subject: str) -> str:
+    return subject if subject.lower().startswith("re:") else f"RE: {subject}"
+
+
+def _parse_date(value: str) -> datetime:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+
+def parse_conversations(lines: Iterable[str], source: str = "<input>") -> Iterator[MockThread]:
+    """
+    Stream threads out of Markdown mock-mail lines
+
+    A conversation starts at a "### Conversation ..." heading. Each message
+    is a block of **From:** / **To:** / **CC:** / **Date:** fields followed
+    by a --- line, the body, and a closing --- line. A **Subject:** line
+    before a message sets its subject; one that appears after messages
+    starts a new thread within the conversation. An italic *[...]* note
+    containing "closed" marks the thread CLOSED.
+
+    Args:
+        lines: Lines of one file, read lazily
+        source: File name used in warnings
+
+    Yields:
+        Parsed threads with at least one message
+    """
+    thread: Optional[MockThread] = None
+    title = ""
+    subject: Optional[str] = None
+    headers: Dict[str, str] = {}
+    body: Optional[List[str]] = None
+
+    def finish_message() -> None:
+        nonlocal headers, body
+        try:
+            name, role, email = _parse_address(headers["From"])
+            thread.messages.append(MockMessage(
+                from_name=name,
+                from_email=email,
+                from_role=role,
+                to_emails=_parse_addresses(headers.get("To", "")),
+                cc_emails=_parse_addresses(headers.get("CC", "")),
+                subject=_reply_subject(thread.subject) if thread.messages else thread.subject,
+                body_text="\n".join(body).strip(),
+                sent_at=_parse_date(headers["Date"])
+            ))
+        except (KeyError, ValueError) as e:
+            logger.warning(f"{source}: skipping message in '{title}': {e}")
+        headers, body = {}, None
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if body is not None:
+            # Inside a message body, which ends at the next separator
+            if _SEPARATOR.match(line):
+                finish_message()
+            else:
+                body.append(line)
+            continue
+
+        if _CONVERSATION.match(line):
+            if thread and thread.messages:
+                yield thread
+            title = line.lstrip("#").strip()
+            thread, subject, headers = None, None, {}
+            continue
+
+        field_match = _FIELD.match(line.strip())
+        if field_match and title:
+            name, value = field_match.groups()
+            if name == "Subject":
+                if thread and thread.messages:
+                    yield thread
+                    thread = None
+                subject = value
+                continue
+            if thread is None:
+                thread = MockThread(subject=subject or "(no subject)", title=title)
+            headers[name] = value
+            continue
+
+        if _SEPARATOR.match(line) and "From" in headers:
+            body = []
+            continue
+
+        note = _NOTE.match(line.strip())
+        if note and thread is not None and "closed" in note.group(1).lower():
+            thread.status = "CLOSED"
+
+    if thread and thread.messages:
+        yield thread
+
+
+def read_threads(paths: List[str]) -> Iterator[MockThread]:
+    """Parse every .md file under the given files and directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names if name.lower().endswith(".md")
+            )
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, encoding="utf-8") as handle:
+                yield from parse_conversations(handle, source=file_path)
+
+
+def synthesize(
+    templates: List[MockThread],
+    target_messages: int,
+    seed: int = 0,
+    span_days: int = 365
+) -> Iterator[MockThread]:
+    """
+    Scaled-up corpus built from template threads
+
+    Templates are cycled until target_messages messages have been produced.
+    Each copy gets a numbered subject and is shifted to a random start time
+    within the last span_days days, keeping the template's message spacing.
+    The start is chosen so the copy's last message is not in the future; a
+    template longer than span_days ends now.
+
+    Args:
+        templates: Parsed threads to copy
+        target_messages: Total messages to produce
+        seed: Random seed, for reproducible corpora
+        span_days: Time window the copies are spread over
+
+    Yields:
+        Synthetic threads
+    """
+    if not templates:
+        raise ValueError("No template conversations to synthesize from")
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    produced = 0
+    for copy_number, template in enumerate(itertools.cycle(templates), 1):
+        if produced >= target_messages:
+            return
+        messages = template.messages[:target_messages - produced]
+        first_sent = min(message.sent_at for message in messages)
+        duration = max(message.sent_at for message in messages) - first_sent
+        window = max(int(span_days * 86400 - duration.total_seconds()), 1)
+        start = now - duration - timedelta(seconds=rng.randrange(window))
+        offset = start - first_sent
+        suffix = f" [#{copy_number}]"
+        yield MockThread(
+            subject=template.subject + suffix,
+            title=template.title,
+            status=template.status,
+            messages=[
+                MockMessage(
+                    from_name=message.from_name,
+                    from_email=message.from_email,
+                    from_role=message.from_role,
+                    to_emails=message.to_emails,
+                    cc_emails=message.cc_emails,
+                    subject=message.subject + suffix,
+                    body_text=message.body_text,
+                    sent_at=message.sent_at + offset
+                )
+                for message in messages
+            ]
+        )
+        produced += len(messages)
+
+
+class MailLoader:
+    """Loads parsed threads into crm_email_thread / crm_email_message with COPY"""
+
+    def __init__(self, batch_threads: int = 5000):
+        """
+        Initialize loader
+
+        Args:
+            batch_threads: Threads per COPY batch (one transaction each)
+        """
+        self.batch_threads = batch_threads
+        self.run_id = uuid.uuid4().hex[:8]
+        self.threads_loaded = 0
+        self.messages_loaded = 0
+
+    async def load(self, threads: Iterable[MockThread], assign_customers: bool = False) -> None:
+        """
+        Load threads in batches
+
+        Threads are linked to crm_contact by the customer's email address;
+        with assign_customers, unmatched threads (e.g. synthetic copies) are
+        spread round-robin over existing contacts so customer filters have
+        realistic selectivity.
+
+        Args:
+            threads: Threads to load, consumed lazily
+            assign_customers: Assign a contact to threads without a match
+        """
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            pg = raw.driver_connection
+
+            contacts = await pg.fetch(
+                "SELECT contact_id, customer_id, lower(email) AS email FROM crm.crm_contact ORDER BY contact_id"
+            )
+            by_email = {row["email"]: (row["customer_id"], row["contact_id"]) for row in contacts}
+            round_robin = itertools.cycle(
+                [(row["customer_id"], row["contact_id"]) for row in contacts] or [(None, None)]
+            )
+
+            batch: List[MockThread] = []
+            for thread in threads:
+                batch.append(thread)
+                if len(batch) >= self.batch_threads:
+                    await self._copy_batch(pg, batch, by_email, round_robin if assign_customers else None)
+                    batch = []
+            if batch:
+                await self._copy_batch(pg, batch, by_email, round_robin if assign_customers else None)
+
+    async def _copy_batch(self, pg, batch: List[MockThread], by_email, round_robin) -> None:
+        """COPY one batch of threads and their messages in a single transaction"""
+        async with pg.transaction():
+            thread_ids = [row[0] for row in await pg.fetch(
+                "SELECT nextval(pg_get_serial_sequence('crm.crm_email_thread', 'thread_id')) "
+                "FROM generate_series(1, $1)", len(batch)
+            )]
+
+            thread_rows = []
+            message_rows = []
+            for thread_id, thread in zip(thread_ids, batch):
+                match = by_email.get((thread.customer_email or "").lower())
+                if match is None:
+                    match = next(round_robin) if round_robin else (None, None)
+                customer_id, contact_id = match
+                thread_rows.append((
+                    thread_id, thread.subject[:500], customer_id, contact_id, thread.status,
+                    len(thread.messages), thread.messages[0].sent_at, thread.messages[-1].sent_at
+                ))
+                for number, message in enumerate(thread.messages, 1):
+                    message_rows.append((
+                        thread_id,
+                        f"{MOCK_UID_PREFIX}{self.run_id}:{thread_id}:{number}",
+                        message.direction,
+                        message.from_email[:255],
+                        message.from_name[:200],
+                        message.to_emails,
+                        message.cc_emails or None,
+                        message.subject[:500],
+                        message.body_text,
+                        message.sent_at,
+                        True
+                    ))
+
+            await pg.copy_records_to_table(
+                "crm_email_thread", schema_name="crm", records=thread_rows, columns=THREAD_COLUMNS
+            )
+            await pg.copy_records_to_table(
+                "crm_email_message", schema_name="crm", records=message_rows, columns=MESSAGE_COLUMNS
+            )
+
+        self.threads_loaded += len(thread_rows)
+        self.messages_loaded += len(message_rows)
+        logger.info(f"Loaded {self.threads_loaded} threads / {self.messages_loaded} messages")
+
+
+async def purge_mock_mail() -> int:
+    """
+    Delete threads loaded by this module (messages cascade)
+
+    Returns:
+        Number of threads deleted
+    """
+    async with engine.begin() as conn:
+        result = await conn.execute(text("""
+            DELETE FROM crm.crm_email_thread t
+            WHERE EXISTS (
+                SELECT 1 FROM crm.crm_email_message m
+                WHERE m.thread_id = t.thread_id AND m.message_uid LIKE :prefix
+            )
+        """), {"prefix": MOCK_UID_PREFIX + "%"})
+        return result.rowcount
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        if args.purge:
+            deleted = await purge_mock_mail()
+            logger.info(f"Purged {deleted} mock email threads")
+            if not args.paths:
+                return
+
+        loader = MailLoader(batch_threads=args.batch_threads)
+        started = time.perf_counter()
+        if args.messages:
+            templates = list(read_threads(args.paths))
+            threads = synthesize(templates, args.messages, seed=args.seed, span_days=args.span_days)
+            await loader.load(threads, assign_customers=True)
+        else:
+            await loader.load(read_threads(args.paths))
+        elapsed = time.perf_counter() - started
+
+        rate = loader.messages_loaded / elapsed if elapsed else 0
+        logger.info(
+            f"Loaded {loader.threads_loaded} threads and {loader.messages_loaded} messages "
+            f"in {elapsed:.1f}s ({rate:,.0f} messages/s)"
+        )
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE crm.crm_email_thread"))
+            await conn.execute(text("ANALYZE crm.crm_email_message"))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load Markdown mock-mail conversations into the CRM")
+    parser.add_argument("paths", nargs="*", help="Markdown files or directories of them")
+    parser.add_argument("--messages", type=int, default=0,
+                        help="Synthesize a corpus of this many messages from the parsed conversations")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthesized corpora")
+    parser.add_argument("--span-days", type=int, default=365,
+                        help="Spread synthesized threads over this many days")
+    parser.add_argument("--batch-threads", type=int, default=5000, help="Threads per COPY batch")
+    parser.add_argument("--purge", action="store_true",
+                        help="Delete previously loaded mock mail first")
+    args = parser.parse_args()
+    if not args.paths and not args.purge:
+        parser.error("give at least one path, or --purge")
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(_main(args))
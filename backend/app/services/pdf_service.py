@@ -1,22 +1,37 @@
 """
 PDF generation service for quotes
 """
+import asyncio
+import hashlib
+import io
 import logging
+import multiprocessing
 import os
-from typing import Optional
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import QuoteWithLineItems
 from app.config import settings
+from app.services.pdf_template import QuotePDFTemplate, template_fingerprint
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the PDF layout changes so cached renders are not reused
+PDF_TEMPLATE_VERSION = "1"
+
+
+class PDFRenderBusyError(RuntimeError):
+    """Raised when too many PDF renders are already queued"""
+
 
 class PDFService:
     """Service for generating PDF documents"""
@@ -24,198 +39,562 @@ class PDFService:
     def __init__(self):
         """Initialize PDF service"""
         self.output_dir = settings.PDF_OUTPUT_DIR
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.persist_to_disk = settings.PDF_PERSIST_TO_DISK
+        if self.persist_to_disk:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self._executor: Optional[Executor] = None
+        self._pending_renders = 0
+        
+        # Layouts are compiled once and shared across renders
+        self.default_template = QuotePDFTemplate()
+        self._templates: Dict[str, QuotePDFTemplate] = {}
+        self._default_template_code: Optional[str] = None
+        self._templates_loaded_at: Optional[float] = None
+        self._compiled_specs: Dict[str, QuotePDFTemplate] = {}
     
-    def generate_quote_pdf(self, quote: QuoteWithLineItems) -> str:
+    def quote_fingerprint(self, quote: QuoteWithLineItems) -> str:
         """
-        Generate PDF for a quote
+        Content hash of everything that affects a quote's rendered PDF
         
         Args:
             quote: Quote with line items
             
         Returns:
-            Path to generated PDF file
+            Hex digest used as the artifact name and HTTP ETag
         """
-        try:
-            # Create filename
-            filename = f"quote_{quote.quote_number.replace('-', '_')}.pdf"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(
-                filepath,
-                pagesize=letter,
-                rightMargin=0.75*inch,
-                leftMargin=0.75*inch,
-                topMargin=0.75*inch,
-                bottomMargin=0.75*inch
-            )
-            
-            # Build document content
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Add custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=colors.HexColor('#1a237e'),
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            # Title
-            story.append(Paragraph("QUOTATION", title_style))
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Quote information
-            quote_info_data = [
-                ['Quote Number:', quote.quote_number, 'Date:', quote.quote_date.strftime('%B %d, %Y')],
-                ['Valid Until:', quote.valid_until.strftime('%B %d, %Y'), 'Status:', quote.status.upper()],
-            ]
-            
-            quote_info_table = Table(quote_info_data, colWidths=[1.5*inch, 2.5*inch, 1.2*inch, 2*inch])
-            quote_info_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
-            story.append(quote_info_table)
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Customer information
-            story.append(Paragraph("<b>Customer Information:</b>", styles['Heading2']))
-            customer_data = [
-                ['Name:', quote.customer_name],
-                ['Email:', quote.customer_email],
-            ]
-            if quote.customer_company:
-                customer_data.append(['Company:', quote.customer_company])
-            if quote.shipping_address:
-                customer_data.append(['Shipping Address:', quote.shipping_address])
-            
-            customer_table = Table(customer_data, colWidths=[1.5*inch, 5.5*inch])
-            customer_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
-            story.append(customer_table)
-            story.append(Spacer(1, 0.3*inch))
-            
-            # Quote description/notes
-            if quote.notes:
-                story.append(Paragraph("<b>Description:</b>", styles['Heading2']))
-                story.append(Paragraph(quote.notes, styles['Normal']))
-                story.append(Spacer(1, 0.3*inch))
-            
-            # Line items
-            story.append(Paragraph("<b>Items:</b>", styles['Heading2']))
-            
-            # Table headers
-            line_items_data = [
-                ['#', 'Product Code', 'Description', 'Qty', 'Unit Price', 'Total']
-            ]
-            
-            # Add line items
-            for item in quote.line_items:
-                line_items_data.append([
-                    str(item.line_number),
-                    item.product_code,
-                    item.product_name,
-                    str(item.quantity),
-                    f"${float(item.unit_price):,.2f}",
-                    f"${float(item.line_total):,.2f}"
-                ])
+        payload = quote.model_dump_json(exclude={"created_at", "updated_at"})
+        template = self.get_template(quote.template_code)
+        digest = hashlib.sha256(
+            f"{PDF_TEMPLATE_VERSION}:{template.fingerprint}:{payload}".encode("utf-8")
+        )
+        return digest.hexdigest()
+    
+    def get_template(self, template_code: Optional[str] = None) -> QuotePDFTemplate:
+        """
+        Compiled layout for a crm_quote_template code
+        
+        Falls back to the CRM default template, then the built-in layout.
+        """
+        if template_code and template_code in self._templates:
+            return self._templates[template_code]
+        if self._default_template_code:
+            return self._templates[self._default_template_code]
+        return self.default_template
+    
+    async def load_templates(self, db: AsyncSession) -> int:
+        """
+        Compile active branded layouts from crm_quote_template
+        
+        Args:
+            db: Async database session
             
-            # Create table
-            line_items_table = Table(
-                line_items_data,
-                colWidths=[0.4*inch, 1.2*inch, 2.5*inch, 0.6*inch, 1.2*inch, 1.2*inch]
+        Returns:
+            Number of templates loaded
+        """
+        query = text("""
+            SELECT 
+                template_code,
+                primary_color,
+                secondary_color,
+                header_content,
+                footer_content,
+                terms_conditions,
+                is_default
+            FROM crm.crm_quote_template
+            WHERE is_active = true
+            ORDER BY is_default DESC, template_id
+        """)
+        rows = (await db.execute(query)).fetchall()
+        
+        templates = {}
+        default_code = None
+        for row in rows:
+            templates[row.template_code] = QuotePDFTemplate(
+                template_code=row.template_code,
+                primary_color=row.primary_color,
+                secondary_color=row.secondary_color,
+                header_content=row.header_content,
+                footer_content=row.footer_content,
+                terms_conditions=row.terms_conditions
             )
+            if row.is_default and default_code is None:
+                default_code = row.template_code
+        
+        self._templates = templates
+        self._default_template_code = default_code
+        self._templates_loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(templates)} quote PDF templates")
+        return len(templates)
+    
+    async def ensure_templates(self, db: AsyncSession) -> None:
+        """Reload branded layouts once PDF_TEMPLATE_REFRESH_SECONDS have passed"""
+        loaded_at = self._templates_loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < settings.PDF_TEMPLATE_REFRESH_SECONDS:
+            return
+        
+        try:
+            await self.load_templates(db)
+        except Exception as e:
+            # Keep rendering with the layouts we already have
+            logger.warning(f"Could not load quote PDF templates: {e}")
+            self._templates_loaded_at = time.monotonic()
+    
+    def template_from_spec(self, spec: dict) -> QuotePDFTemplate:
+        """Compiled layout for a template spec, built once per process"""
+        fingerprint = template_fingerprint(spec)
+        template = self._compiled_specs.get(fingerprint)
+        if template is None:
+            template = QuotePDFTemplate.from_spec(spec)
+            self._compiled_specs[fingerprint] = template
+        return template
+    
+    def render_quote_pdf(
+        self,
+        quote: QuoteWithLineItems,
+        template: Optional[QuotePDFTemplate] = None
+    ) -> bytes:
+        """
+        Render a quote PDF in memory
+        
+        Args:
+            quote: Quote with line items
+            template: Layout to use; defaults to the quote's template
             
-            line_items_table.setStyle(TableStyle([
-                # Header row styling
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a237e')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                
-                # Data rows styling
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('ALIGN', (0, 1), (0, -1), 'CENTER'),
-                ('ALIGN', (-2, 1), (-1, -1), 'RIGHT'),
-                
-                # Grid
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                
-                # Alternating row colors
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),
-            ]))
-            
-            story.append(line_items_table)
+        Returns:
+            PDF document bytes
+        """
+        template = template or self.get_template(quote.template_code)
+        buffer = io.BytesIO()
+        
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            rightMargin=0.75*inch,
+            leftMargin=0.75*inch,
+            topMargin=0.75*inch,
+            bottomMargin=0.75*inch
+        )
+        
+        # Build document content
+        story = []
+        
+        # Title
+        story.append(Paragraph("QUOTATION", template.title_style))
+        if template.header_content:
+            story.append(Paragraph(template.header_content, template.header_style))
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Quote information
+        quote_info_data = [
+            ['Quote Number:', quote.quote_number, 'Date:', quote.quote_date.strftime('%B %d, %Y')],
+            ['Valid Until:', quote.valid_until.strftime('%B %d, %Y'), 'Status:', quote.status.upper()],
+        ]
+        
+        quote_info_table = Table(quote_info_data, colWidths=template.QUOTE_INFO_COL_WIDTHS)
+        quote_info_table.setStyle(template.quote_info_style)
+        story.append(quote_info_table)
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Customer information
+        story.append(Paragraph("<b>Customer Information:</b>", template.heading2_style))
+        customer_data = [
+            ['Name:', quote.customer_name],
+            ['Email:', quote.customer_email],
+        ]
+        if quote.customer_company:
+            customer_data.append(['Company:', quote.customer_company])
+        if quote.shipping_address:
+            customer_data.append(['Shipping Address:', quote.shipping_address])
+        
+        customer_table = Table(customer_data, colWidths=template.CUSTOMER_COL_WIDTHS)
+        customer_table.setStyle(template.customer_style)
+        story.append(customer_table)
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Quote description/notes
+        if quote.notes:
+            story.append(Paragraph("<b>Description:</b>", template.heading2_style))
+            story.append(Paragraph(quote.notes, template.normal_style))
             story.append(Spacer(1, 0.3*inch))
-            
-            # Totals
-            totals_data = [
-                ['Subtotal:', f"${float(quote.subtotal):,.2f}"],
-                ['Tax ({:.1f}%):'.format(float(quote.tax_rate)), f"${float(quote.tax_amount):,.2f}"],
-            ]
-            
-            if quote.shipping_amount and quote.shipping_amount > 0:
-                totals_data.append(['Shipping:', f"${float(quote.shipping_amount):,.2f}"])
-            
-            if quote.discount_amount and quote.discount_amount > 0:
-                totals_data.append(['Discount:', f"-${float(quote.discount_amount):,.2f}"])
-            
-            totals_data.append(['', ''])  # Spacer row
-            totals_data.append(['TOTAL:', f"${float(quote.total_amount):,.2f}"])
-            
-            totals_table = Table(totals_data, colWidths=[5*inch, 2*inch])
-            totals_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (0, -2), 'Helvetica'),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -2), 10),
-                ('FONTSIZE', (0, -1), (-1, -1), 12),
-                ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-                ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
-                ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#1a237e')),
-            ]))
-            
-            story.append(totals_table)
-            story.append(Spacer(1, 0.4*inch))
-            
-            # Terms and conditions
-            story.append(Paragraph("<b>Payment Terms:</b>", styles['Heading3']))
-            story.append(Paragraph(quote.payment_terms, styles['Normal']))
+        
+        # Line items
+        story.append(Paragraph("<b>Items:</b>", template.heading2_style))
+        
+        # Table headers
+        line_items_data = [
+            ['#', 'Product Code', 'Description', 'Qty', 'Unit Price', 'Total']
+        ]
+        
+        # Add line items
+        for item in quote.line_items:
+            line_items_data.append([
+                str(item.line_number),
+                item.product_code,
+                item.product_name,
+                str(item.quantity),
+                f"${float(item.unit_price):,.2f}",
+                f"${float(item.line_total):,.2f}"
+            ])
+        
+        # Create table
+        line_items_table = Table(line_items_data, colWidths=template.LINE_ITEMS_COL_WIDTHS)
+        line_items_table.setStyle(template.line_items_style)
+        
+        story.append(line_items_table)
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Totals
+        totals_data = [
+            ['Subtotal:', f"${float(quote.subtotal):,.2f}"],
+            ['Tax ({:.1f}%):'.format(float(quote.tax_rate)), f"${float(quote.tax_amount):,.2f}"],
+        ]
+        
+        if quote.shipping_amount and quote.shipping_amount > 0:
+            totals_data.append(['Shipping:', f"${float(quote.shipping_amount):,.2f}"])
+        
+        if quote.discount_amount and quote.discount_amount > 0:
+            totals_data.append(['Discount:', f"-${float(quote.discount_amount):,.2f}"])
+        
+        totals_data.append(['', ''])  # Spacer row
+        totals_data.append(['TOTAL:', f"${float(quote.total_amount):,.2f}"])
+        
+        totals_table = Table(totals_data, colWidths=template.TOTALS_COL_WIDTHS)
+        totals_table.setStyle(template.totals_style)
+        
+        story.append(totals_table)
+        story.append(Spacer(1, 0.4*inch))
+        
+        # Terms and conditions
+        story.append(Paragraph("<b>Payment Terms:</b>", template.heading3_style))
+        story.append(Paragraph(quote.payment_terms, template.normal_style))
+        story.append(Spacer(1, 0.2*inch))
+        
+        if quote.delivery_terms:
+            story.append(Paragraph("<b>Delivery Terms:</b>", template.heading3_style))
+            story.append(Paragraph(quote.delivery_terms, template.normal_style))
+            story.append(Spacer(1, 0.2*inch))
+        
+        if template.terms_conditions:
+            story.append(Paragraph("<b>Terms and Conditions:</b>", template.heading3_style))
+            story.append(Paragraph(template.terms_conditions, template.normal_style))
             story.append(Spacer(1, 0.2*inch))
+        
+        # Footer
+        story.append(Spacer(1, 0.5*inch))
+        story.append(Paragraph(template.footer_content, template.normal_style))
+        
+        # Build PDF
+        doc.build(story)
+        
+        return buffer.getvalue()
+    
+    def iter_pdf_chunks(self, pdf_bytes: bytes, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield an in-memory PDF in chunks for a streaming response"""
+        view = memoryview(pdf_bytes)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
+    
+    def generate_quote_pdf(self, quote: QuoteWithLineItems) -> str:
+        """
+        Generate PDF for a quote
+        
+        Rendered PDFs are stored under the quote's content hash and reused
+        while the quote is unchanged.
+        
+        Args:
+            quote: Quote with line items
             
-            if quote.delivery_terms:
-                story.append(Paragraph("<b>Delivery Terms:</b>", styles['Heading3']))
-                story.append(Paragraph(quote.delivery_terms, styles['Normal']))
-                story.append(Spacer(1, 0.2*inch))
+        Returns:
+            Path to generated PDF file
+        """
+        filepath = self._artifact_path(quote)
+        if self._reuse_artifact(filepath):
+            return filepath
+        
+        try:
+            return self._store_artifact(filepath, self.render_quote_pdf(quote))
+        except Exception as e:
+            logger.error(f"Error generating PDF: {e}")
+            raise
+    
+    async def render_quote_pdf_async(self, quote: QuoteWithLineItems) -> bytes:
+        """
+        Render a quote PDF in the worker process pool
+        
+        ReportLab rendering is CPU-bound, so it runs outside the event loop
+        with a bounded number of queued jobs and a per-render timeout. A job
+        counts against the queue until the worker is done with it, even when
+        the caller has already timed out.
+        
+        Args:
+            quote: Quote with line items
             
-            # Footer
-            story.append(Spacer(1, 0.5*inch))
-            footer_text = "Thank you for your business! This quote is valid until the date specified above."
-            story.append(Paragraph(footer_text, styles['Normal']))
+        Returns:
+            PDF document bytes
             
-            # Build PDF
-            doc.build(story)
+        Raises:
+            PDFRenderBusyError: If PDF_RENDER_MAX_QUEUE renders are already pending
+            asyncio.TimeoutError: If rendering exceeds PDF_RENDER_TIMEOUT_SECONDS
+        """
+        if self._pending_renders >= settings.PDF_RENDER_MAX_QUEUE:
+            raise PDFRenderBusyError(
+                f"PDF render queue is full ({self._pending_renders} pending)"
+            )
+        
+        loop = asyncio.get_running_loop()
+        self._pending_renders += 1
+        try:
+            # Send a plain dict so the payload pickles cheaply
+            job = self._get_executor().submit(
+                _render_quote_pdf_job,
+                quote.model_dump(mode="json"),
+                self.get_template(quote.template_code).spec()
+            )
+        except BaseException:
+            self._pending_renders -= 1
+            raise
+        # Timing out only cancels the wait, not a render already running in
+        # the pool, so the slot is released when the job itself finishes
+        job.add_done_callback(lambda _: self._release_render(loop))
+        return await asyncio.wait_for(asyncio.wrap_future(job), timeout=settings.PDF_RENDER_TIMEOUT_SECONDS)
+    
+    async def generate_quote_pdf_async(self, quote: QuoteWithLineItems) -> str:
+        """
+        Generate PDF for a quote, rendering in the worker process pool
+        
+        Args:
+            quote: Quote with line items
             
-            logger.info(f"Generated PDF for quote {quote.quote_number}: {filepath}")
+        Returns:
+            Path to generated PDF file
+        """
+        filepath = self._artifact_path(quote)
+        if self._reuse_artifact(filepath):
             return filepath
-            
+        
+        try:
+            return self._store_artifact(filepath, await self.render_quote_pdf_async(quote))
+        except PDFRenderBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error generating PDF: {e}")
             raise
+    
+    async def get_quote_pdf_bytes(self, quote: QuoteWithLineItems) -> bytes:
+        """
+        PDF bytes for a quote, reusing the on-disk artifact when persisting
+        
+        Args:
+            quote: Quote with line items
+            
+        Returns:
+            PDF document bytes
+        """
+        if not self.persist_to_disk:
+            return await self.render_quote_pdf_async(quote)
+        
+        filepath = await self.generate_quote_pdf_async(quote)
+        with open(filepath, "rb") as f:
+            return f.read()
+    
+    async def stream_quotes_zip(
+        self,
+        quotes: List[QuoteWithLineItems]
+    ) -> AsyncIterator[bytes]:
+        """
+        Render quotes in parallel and stream them as a ZIP archive
+        
+        A sliding window of renders (sized to the worker pool and bounded
+        by PDF_RENDER_MAX_QUEUE) runs ahead of the writer; each finished
+        PDF is written as one archive member and flushed straight to the
+        caller, so at most one window of PDFs is held in memory. Quotes
+        that fail to render are skipped and listed in export_errors.txt.
+        
+        Args:
+            quotes: Quotes to export, in archive order
+            
+        Yields:
+            Chunks of the ZIP archive
+        """
+        window = max(1, min(max(1, settings.PDF_RENDER_WORKERS) * 2, settings.PDF_RENDER_MAX_QUEUE // 2))
+        sink = _ZipChunkSink()
+        pending: deque = deque()
+        remaining = iter(quotes)
+        errors = []
+        
+        def schedule_next() -> None:
+            quote = next(remaining, None)
+            if quote is not None:
+                pending.append((quote, asyncio.ensure_future(self._render_for_export(quote))))
+        
+        try:
+            for _ in range(window):
+                schedule_next()
+            
+            # PDFs are already compressed, so members are stored as-is
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+                while pending:
+                    quote, task = pending.popleft()
+                    try:
+                        pdf_bytes = await task
+                    except Exception as e:
+                        logger.error(f"Skipping quote {quote.quote_number} in export: {e}")
+                        errors.append(f"{quote.quote_number}: {str(e) or type(e).__name__}")
+                        pdf_bytes = None
+                    schedule_next()
+                    
+                    if pdf_bytes is not None:
+                        archive.writestr(f"quote_{quote.quote_number}.pdf", pdf_bytes)
+                        yield sink.drain()
+                
+                if errors:
+                    archive.writestr("export_errors.txt", "\n".join(errors) + "\n")
+            
+            # Central directory is written when the archive closes
+            yield sink.drain()
+        finally:
+            for _, task in pending:
+                task.cancel()
+    
+    async def _render_for_export(self, quote: QuoteWithLineItems) -> bytes:
+        """Render for a bulk export, backing off while the render queue is full"""
+        for attempt in range(5):
+            try:
+                return await self.get_quote_pdf_bytes(quote)
+            except PDFRenderBusyError:
+                await asyncio.sleep(0.5 * (attempt + 1))
+        return await self.get_quote_pdf_bytes(quote)
+    
+    def shutdown(self) -> None:
+        """Stop the render worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def _get_executor(self) -> Executor:
+        """Create the render process pool on first use"""
+        if self._executor is None:
+            if settings.PDF_RENDER_WORKERS > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.PDF_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                # Rendering still leaves the event loop, on a single thread
+                self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+    
+    def _release_render(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Free a render queue slot; called from the pool when a job finishes"""
+        try:
+            loop.call_soon_threadsafe(self._decrement_pending)
+        except RuntimeError:  # Event loop already closed
+            self._pending_renders -= 1
+    
+    def _decrement_pending(self) -> None:
+        self._pending_renders -= 1
+    
+    def _artifact_path(self, quote: QuoteWithLineItems) -> str:
+        """Cached artifact path from the quote number and content hash"""
+        fingerprint = self.quote_fingerprint(quote)
+        filename = f"quote_{quote.quote_number.replace('-', '_')}_{fingerprint[:16]}.pdf"
+        return os.path.join(self.output_dir, filename)
+    
+    def _reuse_artifact(self, filepath: str) -> bool:
+        """Reuse the cached artifact if this exact quote was rendered before"""
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return False
+        # Recency for pruning goes in the access time; the modification time
+        # stays the render time
+        os.utime(filepath, (time.time(), stat.st_mtime))
+        logger.info(f"Reusing cached PDF: {filepath}")
+        return True
+    
+    def _store_artifact(self, filepath: str, pdf_bytes: bytes) -> str:
+        """Write rendered bytes into place atomically and prune the cache"""
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        logger.info(f"Generated PDF: {filepath}")
+        self.prune_output_dir()
+        return filepath
+    
+    def prune_output_dir(self) -> int:
+        """
+        Evict cached PDFs unused for PDF_CACHE_MAX_AGE_SECONDS, then the least
+        recently used ones until the directory fits in PDF_CACHE_MAX_BYTES
+        
+        Last use is the file's access time, set on every reuse.
+        
+        Returns:
+            Number of files removed
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.output_dir):
+            if not entry.is_file() or not entry.name.endswith(".pdf"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+        
+        # Oldest first
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for last_used, size, path in entries:
+            expired = now - last_used > settings.PDF_CACHE_MAX_AGE_SECONDS
+            if not expired and total_bytes <= settings.PDF_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+                removed += 1
+            except OSError:
+                continue
+        
+        if removed:
+            logger.info(f"Evicted {removed} cached PDFs from {self.output_dir}")
+        return removed
+
+
+class _ZipChunkSink:
+    """Write-only file object that hands buffered ZIP output back in chunks"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _render_quote_pdf_job(quote_data: dict, template_spec: dict) -> bytes:
+    """Process pool entry point: rebuild the quote and render it"""
+    return pdf_service.render_quote_pdf(
+        QuoteWithLineItems(**quote_data),
+        pdf_service.template_from_spec(template_spec)
+    )
 
 
 # Global service instance
@@ -0,0 +1,167 @@
+"""
+Precompiled ReportLab layouts for quote PDFs
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.platypus import TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_CODE = "DEFAULT"
+DEFAULT_PRIMARY_COLOR = "#1a237e"
+DEFAULT_SECONDARY_COLOR = "#f5f5f5"
+DEFAULT_FOOTER = "Thank you for your business! This quote is valid until the date specified above."
+
+
+def template_fingerprint(spec: Dict[str, Any]) -> str:
+    """Short content hash of a template spec, used in PDF cache keys"""
+    payload = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class QuotePDFTemplate:
+    """
+    Paragraph and table styles for one quote layout
+
+    Styles are built once when the template is created and shared by every
+    render that uses it. Branding fields mirror crm_quote_template.
+    """
+
+    # Column widths per table
+    QUOTE_INFO_COL_WIDTHS = [1.5*inch, 2.5*inch, 1.2*inch, 2*inch]
+    CUSTOMER_COL_WIDTHS = [1.5*inch, 5.5*inch]
+    LINE_ITEMS_COL_WIDTHS = [0.4*inch, 1.2*inch, 2.5*inch, 0.6*inch, 1.2*inch, 1.2*inch]
+    TOTALS_COL_WIDTHS = [5*inch, 2*inch]
+
+    def __init__(
+        self,
+        template_code: str = DEFAULT_TEMPLATE_CODE,
+        primary_color: Optional[str] = None,
+        secondary_color: Optional[str] = None,
+        header_content: Optional[str] = None,
+        footer_content: Optional[str] = None,
+        terms_conditions: Optional[str] = None
+    ):
+        """
+        Build the layout
+
+        Args:
+            template_code: crm_quote_template code
+            primary_color: Hex color for the title, table header and total
+            secondary_color: Hex color for alternating line item rows
+            header_content: Text shown under the title
+            footer_content: Footer text replacing the default thank-you note
+            terms_conditions: Terms and conditions section
+        """
+        self.template_code = template_code
+        self.primary_hex = _valid_hex_color(primary_color, DEFAULT_PRIMARY_COLOR)
+        self.secondary_hex = _valid_hex_color(secondary_color, DEFAULT_SECONDARY_COLOR)
+        self.header_content = header_content or None
+        self.footer_content = footer_content or DEFAULT_FOOTER
+        self.terms_conditions = terms_conditions or None
+        self.fingerprint = template_fingerprint(self.spec())
+        self._compile()
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "QuotePDFTemplate":
+        """Rebuild a template from spec(), e.g. inside a render worker"""
+        return cls(**spec)
+
+    def spec(self) -> Dict[str, Any]:
+        """Plain, picklable description of the template"""
+        return {
+            "template_code": self.template_code,
+            "primary_color": self.primary_hex,
+            "secondary_color": self.secondary_hex,
+            "header_content": self.header_content,
+            "footer_content": self.footer_content,
+            "terms_conditions": self.terms_conditions,
+        }
+
+    def _compile(self) -> None:
+        """Build the paragraph and table styles"""
+        primary = colors.HexColor(self.primary_hex)
+        secondary = colors.HexColor(self.secondary_hex)
+
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+        self.heading2_style = styles['Heading2']
+        self.heading3_style = styles['Heading3']
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=primary,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        self.header_style = ParagraphStyle(
+            'TemplateHeader',
+            parent=styles['Normal'],
+            alignment=TA_CENTER
+        )
+
+        self.quote_info_style = TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+
+        self.customer_style = TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+
+        self.line_items_style = TableStyle([
+            # Header row styling
+            ('BACKGROUND', (0, 0), (-1, 0), primary),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+            # Data rows styling
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+            ('ALIGN', (-2, 1), (-1, -1), 'RIGHT'),
+
+            # Grid
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+
+            # Alternating row colors
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, secondary]),
+        ])
+
+        self.totals_style = TableStyle([
+            ('FONTNAME', (0, 0), (0, -2), 'Helvetica'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -2), 10),
+            ('FONTSIZE', (0, -1), (-1, -1), 12),
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.black),
+            ('TEXTCOLOR', (0, -1), (-1, -1), primary),
+        ])
+
+
+def _valid_hex_color(value: Optional[str], default: str) -> str:
+    """Return value if ReportLab can parse it as a color, otherwise default"""
+    if not value:
+        return default
+    try:
+        colors.HexColor(value)
+        return value
+    except (ValueError, TypeError):
+        logger.warning(f"Ignoring invalid template color '{value}'")
+        return default
@@ -0,0 +1,119 @@
+"""
+Postgres LISTEN/NOTIFY driven invalidation for the price book cache
+"""
+import asyncio
+import logging
+from typing import Optional
+import asyncpg
+
+from app.config import settings
+from app.services.quote_service import quote_service
+
+logger = logging.getLogger(__name__)
+
+# Reconnect backoff after the listener connection is lost
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+
+
+class PricingInvalidationListener:
+    """Listens for price book change notifications and invalidates cached pricing"""
+
+    def __init__(self, channel: str):
+        """
+        Initialize listener
+
+        Args:
+            channel: Postgres notification channel carrying changed product codes
+        """
+        self.channel = channel
+        self.connection: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        """Open a dedicated connection and LISTEN on the channel, retrying in the background"""
+        if not self.channel or self.connection is not None or self._reconnect_task is not None:
+            return
+
+        self._stopping = False
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.error(f"Failed to start price book listener: {e}")
+            self._schedule_reconnect()
+
+    async def stop(self) -> None:
+        """Stop listening and close the connection"""
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+
+        if self.connection is None:
+            return
+
+        connection, self.connection = self.connection, None
+        try:
+            connection.remove_termination_listener(self._on_terminate)
+            await connection.remove_listener(self.channel, self._on_notify)
+            await connection.close()
+        except Exception as e:
+            logger.error(f"Error stopping price book listener: {e}")
+
+    async def _connect(self) -> None:
+        """Open the connection and subscribe, dropping pricing cached while not listening"""
+        connection = await asyncpg.connect(settings.database_url)
+        try:
+            await connection.add_listener(self.channel, self._on_notify)
+        except BaseException:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._on_terminate)
+        self.connection = connection
+        # Changes made while nobody was listening were never notified
+        quote_service.invalidate_pricing()
+        logger.info(f"Listening for price book changes on channel '{self.channel}'")
+
+    def _on_terminate(self, connection) -> None:
+        """Connection lost: cached prices can go stale unnoticed, so drop them and reconnect"""
+        if connection is not self.connection:
+            return
+        self.connection = None
+        if self._stopping:
+            return
+        logger.error("Price book listener connection lost; clearing the price cache and reconnecting")
+        quote_service.invalidate_pricing()
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None and not self._stopping:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        """Retry with exponential backoff until connected or stopped"""
+        delay = RECONNECT_MIN_SECONDS
+        try:
+            while not self._stopping:
+                await asyncio.sleep(delay)
+                try:
+                    await self._connect()
+                    return
+                except Exception as e:
+                    delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                    logger.error(f"Price book listener reconnect failed, retrying in {delay:.0f}s: {e}")
+        finally:
+            self._reconnect_task = None
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Invalidate the notified product, or the whole price book if no code is sent"""
+        product_code = payload.strip()
+        quote_service.invalidate_pricing([product_code] if product_code else None)
+
+
+# Global listener instance
+pricing_listener = PricingInvalidationListener(settings.PRICE_CACHE_NOTIFY_CHANNEL)
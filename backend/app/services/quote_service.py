@@ -1,22 +1,172 @@
 """
 Quote generation service with pricing from PostgreSQL
 """
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+import json
 import uuid
 
 from app.models import (
     Quote, QuoteWithLineItems, QuoteLineItem, 
-    ProductPricing, EmailSummary
+    ProductPricing, EmailSummary, QuoteDescriptionMode
 )
-from app.services.azure_openai_service import azure_openai_service
+from app.services.azure_openai_service import azure_openai_service, TokenCallback
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.database import get_db_context
+from app.utils.queries import queries
 
 logger = logging.getLogger(__name__)
 
+# Stored quote with its line items aggregated in a single round trip
+_QUOTE_SELECT = """
+    SELECT 
+        q.quote_id,
+        q.quote_number,
+        q.source_thread_id,
+        COALESCE(NULLIF(TRIM(CONCAT(ct.first_name, ' ', ct.last_name)), ''), c.customer_name) as customer_name,
+        COALESCE(ct.email, '') as customer_email,
+        c.customer_name as customer_company,
+        q.quote_date,
+        q.valid_until,
+        q.subtotal,
+        q.discount_amount,
+        q.tax_rate,
+        q.tax_amount,
+        q.shipping_amount,
+        q.total_amount,
+        q.shipping_address_text,
+        q.payment_terms,
+        q.delivery_terms,
+        q.notes,
+        qs.status_code,
+        tpl.template_code,
+        q.created_at,
+        q.updated_at,
+        COALESCE(items.line_items, '[]'::json) as line_items
+    FROM crm.crm_quotation q
+    JOIN crm.crm_customer c ON q.customer_id = c.customer_id
+    LEFT JOIN crm.crm_contact ct ON q.contact_id = ct.contact_id
+    LEFT JOIN crm.crm_quote_status qs ON q.status_id = qs.status_id
+    LEFT JOIN crm.crm_quote_template tpl ON q.template_id = tpl.template_id
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'line_number', li.line_number,
+            'product_code', COALESCE(li.product_code, ''),
+            'product_name', li.product_name,
+            'description', li.description,
+            'quantity', li.quantity,
+            'unit_price', li.unit_price,
+            'discount_percent', COALESCE(li.discount_percent, 0),
+            'line_total', li.line_total,
+            'lead_time_days', li.lead_time_days
+        ) ORDER BY li.line_number) as line_items
+        FROM crm.crm_quote_line_item li
+        WHERE li.quote_id = q.quote_id
+    ) items ON true
+"""
+
+_QUOTE_BY_NUMBER_QUERY = queries.register(
+    "quotes.by_number", _QUOTE_SELECT + "WHERE q.quote_number = :quote_number"
+)
+
+# Pricing for every product from the ERP database, joined with the grouped
+# erp_product_pricing / crm_product_price_history data
+_PRODUCT_PRICING_QUERY = queries.register("quotes.product_pricing", """
+    SELECT 
+        p.product_code,
+        p.product_name,
+        pc.category_name as category,
+        COALESCE(pp.unit_cost, 100000.00) as base_price,
+        p.lead_time_days,
+        cur.currency_code as currency,
+        COALESCE(hist.purchase_count, 0) as purchase_count,
+        hist.avg_discount
+    FROM erp.erp_product p
+    LEFT JOIN erp.erp_product_category pc ON p.category_id = pc.category_id
+    LEFT JOIN LATERAL (
+        SELECT pp.unit_cost 
+        FROM erp.erp_product_pricing pp 
+        WHERE pp.product_id = p.product_id 
+        AND pp.is_active = true 
+        AND CURRENT_DATE BETWEEN pp.effective_from AND COALESCE(pp.effective_to, '2099-12-31')
+        ORDER BY pp.effective_from DESC 
+        LIMIT 1
+    ) pp ON true
+    LEFT JOIN (
+        SELECT 
+            product_id,
+            COUNT(*) as purchase_count,
+            AVG(discount_percent) as avg_discount
+        FROM crm.crm_product_price_history
+        WHERE customer_id = :customer_id
+        AND was_accepted = true
+        GROUP BY product_id
+    ) hist ON hist.product_id = p.product_id
+    LEFT JOIN erp.erp_currency cur ON cur.currency_id = :currency_id
+    WHERE p.product_code = ANY(:product_codes)
+    AND p.is_active = true
+""")
+
+_FILL_DESCRIPTION_QUERY = queries.register("quotes.fill_description", """
+    UPDATE crm.crm_quotation
+    SET notes = :notes, updated_at = CURRENT_TIMESTAMP
+    WHERE quote_number = :quote_number AND notes IS NULL
+""")
+
+_INSERT_QUOTE_QUERY = queries.register("quotes.insert", """
+    WITH ctx AS (
+        SELECT 
+            ct.customer_id,
+            ct.contact_id,
+            COALESCE(
+                c.assigned_sales_rep_id,
+                (SELECT MIN(sales_rep_id) FROM crm.crm_sales_rep WHERE is_active = true)
+            ) as owner_id
+        FROM crm.crm_contact ct
+        JOIN crm.crm_customer c ON ct.customer_id = c.customer_id
+        WHERE LOWER(ct.email) = LOWER(:customer_email)
+        ORDER BY ct.is_primary DESC NULLS LAST, ct.contact_id
+        LIMIT 1
+    )
+    INSERT INTO crm.crm_quotation (
+        quote_number, quote_name, customer_id, contact_id, status_id, owner_id,
+        quote_date, valid_until, currency_id, subtotal, discount_amount,
+        tax_rate, tax_amount, shipping_amount, total_amount, delivery_terms,
+        payment_terms, notes, ai_generated_pricing, source_thread_id,
+        shipping_address_text, template_id
+    )
+    SELECT 
+        :quote_number, :quote_name, ctx.customer_id, ctx.contact_id,
+        (SELECT status_id FROM crm.crm_quote_status WHERE status_code = UPPER(:status)),
+        ctx.owner_id, :quote_date, :valid_until,
+        (SELECT currency_id FROM crm.crm_currency WHERE currency_code = 'USD'),
+        :subtotal, :discount_amount, :tax_rate, :tax_amount, :shipping_amount,
+        :total_amount, :delivery_terms, :payment_terms, :notes, true,
+        :thread_id, :shipping_address,
+        (SELECT template_id FROM crm.crm_quote_template WHERE template_code = :template_code)
+    FROM ctx
+    RETURNING quote_id
+""")
+
+_INSERT_LINE_ITEM_QUERY = queries.register("quotes.insert_line_item", """
+    INSERT INTO crm.crm_quote_line_item (
+        quote_id, line_number, product_id, product_code, product_name,
+        description, quantity, unit_price, discount_percent, line_total,
+        lead_time_days
+    )
+    VALUES (
+        :quote_id, :line_number,
+        (SELECT product_id FROM crm.crm_product WHERE product_code = :product_code),
+        :product_code, :product_name, :description, :quantity, :unit_price,
+        :discount_percent, :line_total, :lead_time_days
+    )
+""")
+
 
 class QuoteService:
     """Service for generating and managing quotes"""
@@ -25,10 +175,15 @@ class QuoteService:
         """Initialize quote service"""
         self.tax_rate = Decimal("0.08")  # 8% tax rate
         self.standard_validity_days = 30
+        self.currency_id = 1  # Price book currency (erp_currency)
+        self.price_cache = TTLCache(
+            maxsize=settings.PRICE_CACHE_MAX_SIZE,
+            ttl=settings.PRICE_CACHE_TTL_SECONDS
+        )
     
-    def get_product_pricing(
+    async def get_product_pricing(
         self, 
-        db: Session, 
+        db: AsyncSession, 
         product_codes: List[str],
         customer_id: Optional[int] = None
     ) -> List[ProductPricing]:
@@ -36,182 +191,181 @@ class QuoteService:
         Get pricing for products from PostgreSQL database
         Uses previous purchase history to determine best pricing
         
+        Prices are cached per (product_code, pricing date, currency, customer).
+        Products not in the cache are priced in a single round trip: the active
+        price row is picked with a LATERAL join and the customer's accepted
+        discount history is aggregated per product in the same statement.
+        
         Args:
-            db: Database session
+            db: Async database session
             product_codes: List of product codes to price
             customer_id: Optional customer ID for customer-specific pricing
             
         Returns:
-            List of ProductPricing objects
+            List of ProductPricing objects, in the order of product_codes
         """
-        try:
-            pricing_list = []
-            
-            for product_code in product_codes:
-                # Query for product pricing from ERP database
-                # This queries the erp_product_pricing table and erp_product_price_history
-                query = text("""
-                    SELECT 
-                        p.product_code,
-                        p.product_name,
-                        pc.category_name as category,
-                        COALESCE(
-                            (SELECT pp.unit_cost 
-                             FROM erp.erp_product_pricing pp 
-                             WHERE pp.product_id = p.product_id 
-                             AND pp.is_active = true 
-                             AND CURRENT_DATE BETWEEN pp.effective_from AND COALESCE(pp.effective_to, '2099-12-31')
-                             ORDER BY pp.effective_from DESC 
-                             LIMIT 1
-                            ),
-                            100000.00
-                        ) as base_price,
-                        p.lead_time_days,
-                        (SELECT currency_code 
-                         FROM erp.erp_currency 
-                         WHERE currency_id = 1
-                        ) as currency
-                    FROM erp.erp_product p
-                    LEFT JOIN erp.erp_product_category pc ON p.category_id = pc.category_id
-                    WHERE p.product_code = :product_code
-                    AND p.is_active = true
-                """)
-                
-                result = db.execute(query, {"product_code": product_code}).fetchone()
+        if not product_codes:
+            return []
+        
+        # Serve hot catalog pricing from the in-process price book cache
+        pricing_date = date.today()
+        priced: Dict[str, ProductPricing] = {}
+        for product_code in dict.fromkeys(product_codes):
+            cached = self.price_cache.get(
+                (product_code, pricing_date, self.currency_id, customer_id)
+            )
+            if cached is not None:
+                priced[product_code] = cached
+        
+        missing_codes = [code for code in dict.fromkeys(product_codes) if code not in priced]
+        if missing_codes:
+            try:
+                result = await db.execute(
+                    _PRODUCT_PRICING_QUERY,
+                    {
+                        "product_codes": missing_codes,
+                        "customer_id": customer_id,
+                        "currency_id": self.currency_id
+                    }
+                )
                 
-                if result:
-                    # Calculate discount based on customer history or product type
+                for row in result.fetchall():
+                    # Discount based on customer history or standard discount
                     discount_percent = self._calculate_discount(
-                        db, 
-                        product_code, 
-                        customer_id
+                        customer_id,
+                        row.purchase_count,
+                        row.avg_discount
                     )
                     
-                    base_price = Decimal(str(result.base_price))
+                    base_price = Decimal(str(row.base_price))
                     final_price = base_price * (1 - discount_percent / 100)
                     
                     pricing = ProductPricing(
-                        product_code=result.product_code,
-                        product_name=result.product_name,
-                        category=result.category,
+                        product_code=row.product_code,
+                        product_name=row.product_name,
+                        category=row.category,
                         base_price=base_price,
                         discount_percent=discount_percent,
                         final_price=final_price,
-                        currency=result.currency or "USD",
-                        lead_time_days=result.lead_time_days or 30
+                        currency=row.currency or "USD",
+                        lead_time_days=row.lead_time_days or 30
                     )
-                    pricing_list.append(pricing)
-                else:
-                    # Fallback pricing if product not found
-                    logger.warning(f"Product {product_code} not found, using fallback pricing")
-                    pricing = ProductPricing(
-                        product_code=product_code,
-                        product_name=f"Product {product_code}",
-                        category="Unknown",
-                        base_price=Decimal("100000.00"),
-                        discount_percent=Decimal("0.00"),
-                        final_price=Decimal("100000.00"),
-                        currency="USD",
-                        lead_time_days=30
+                    priced[row.product_code] = pricing
+                    self.price_cache.set(
+                        (row.product_code, pricing_date, self.currency_id, customer_id),
+                        pricing
                     )
-                    pricing_list.append(pricing)
-            
-            return pricing_list
+                    
+            except Exception as e:
+                # Products left unpriced fall back below
+                logger.error(f"Error fetching product pricing: {e}")
+        
+        pricing_list = []
+        for product_code in product_codes:
+            pricing = priced.get(product_code)
+            if pricing is None:
+                # Fallback pricing if product not found
+                logger.warning(f"Product {product_code} not found, using fallback pricing")
+                pricing = self._fallback_pricing(product_code)
+            pricing_list.append(pricing.model_copy())
+        
+        return pricing_list
+    
+    def invalidate_pricing(self, product_codes: Optional[List[str]] = None) -> int:
+        """
+        Drop cached pricing so the next lookup reads from the database
+        
+        Args:
+            product_codes: Products to invalidate; the whole price book if omitted
             
-        except Exception as e:
-            logger.error(f"Error fetching product pricing: {e}")
-            # Return fallback pricing on error
-            return [
-                ProductPricing(
-                    product_code=code,
-                    product_name=f"Product {code}",
-                    category="Unknown",
-                    base_price=Decimal("100000.00"),
-                    discount_percent=Decimal("0.00"),
-                    final_price=Decimal("100000.00"),
-                    currency="USD",
-                    lead_time_days=30
-                )
-                for code in product_codes
-            ]
+        Returns:
+            Number of cache entries removed
+        """
+        if not product_codes:
+            removed = self.price_cache.invalidate()
+        else:
+            codes = set(product_codes)
+            removed = self.price_cache.invalidate(lambda key: key[0] in codes)
+        
+        logger.info(f"Invalidated {removed} cached price book entries")
+        return removed
     
     def _calculate_discount(
         self, 
-        db: Session, 
-        product_code: str,
-        customer_id: Optional[int]
+        customer_id: Optional[int],
+        purchase_count: int,
+        avg_discount: Optional[Decimal]
     ) -> Decimal:
         """
         Calculate discount percentage based on purchase history
         
         Args:
-            db: Database session
-            product_code: Product code
             customer_id: Customer ID
+            purchase_count: Number of accepted past quotes for the product
+            avg_discount: Average accepted discount for the product
             
         Returns:
             Discount percentage as Decimal
         """
-        try:
-            if customer_id:
-                # Check customer's purchase history
-                query = text("""
-                    SELECT 
-                        COUNT(*) as purchase_count,
-                        AVG(discount_percent) as avg_discount
-                    FROM crm.crm_product_price_history
-                    WHERE product_id = (
-                        SELECT product_id FROM erp.erp_product 
-                        WHERE product_code = :product_code
-                    )
-                    AND customer_id = :customer_id
-                    AND was_accepted = true
-                """)
-                
-                result = db.execute(
-                    query, 
-                    {"product_code": product_code, "customer_id": customer_id}
-                ).fetchone()
-                
-                if result and result.purchase_count > 0:
-                    # Return average discount from history
-                    return Decimal(str(result.avg_discount or "0.00"))
-            
-            # Default discount for new customers or no history
-            return Decimal("5.00")  # 5% standard discount
-            
-        except Exception as e:
-            logger.error(f"Error calculating discount: {e}")
-            return Decimal("0.00")
+        if customer_id and purchase_count > 0:
+            # Return average discount from history
+            return Decimal(str(avg_discount or "0.00"))
+        
+        # Default discount for new customers or no history
+        return Decimal("5.00")  # 5% standard discount
+    
+    def _fallback_pricing(self, product_code: str) -> ProductPricing:
+        """Fallback pricing for products that cannot be priced from the database"""
+        return ProductPricing(
+            product_code=product_code,
+            product_name=f"Product {product_code}",
+            category="Unknown",
+            base_price=Decimal("100000.00"),
+            discount_percent=Decimal("0.00"),
+            final_price=Decimal("100000.00"),
+            currency="USD",
+            lead_time_days=30
+        )
     
-    def generate_quote_from_summary(
+    async def generate_quote_from_summary(
         self,
-        db: Session,
+        db: AsyncSession,
         summary: EmailSummary,
         customer_name: str,
         customer_email: str,
-        customer_company: Optional[str] = None
+        customer_company: Optional[str] = None,
+        description_mode: QuoteDescriptionMode = QuoteDescriptionMode.INLINE
     ) -> QuoteWithLineItems:
         """
         Generate a complete quote from email summary
         
+        The description only needs the summary, so in INLINE mode the LLM
+        call is started first and runs while pricing is read from the
+        database. DEFERRED and NONE leave notes empty (see
+        fill_quote_description for the deferred case).
+        
         Args:
-            db: Database session
+            db: Async database session
             summary: Email summary with extracted information
             customer_name: Customer name
             customer_email: Customer email
             customer_company: Optional company name
+            description_mode: When to generate the AI description
             
         Returns:
             Complete quote with line items
         """
+        description_task = None
+        if description_mode == QuoteDescriptionMode.INLINE:
+            description_task = asyncio.ensure_future(self.generate_description(summary))
+        
         try:
             # Extract product codes from requested products
             # In production, you'd need a mapping service
             product_codes = self._extract_product_codes(summary.requested_products)
             
             # Get pricing for products
-            pricing_list = self.get_product_pricing(db, product_codes)
+            pricing_list = await self.get_product_pricing(db, product_codes)
             
             # Create line items
             line_items = []
@@ -244,12 +398,6 @@ class QuoteService:
             # Generate quote number
             quote_number = self._generate_quote_number()
             
-            # Generate quote description using AI
-            quote_description = azure_openai_service.generate_quote_description(
-                summary.dict(),
-                [p.dict() for p in pricing_list]
-            )
-            
             # Create quote
             quote = QuoteWithLineItems(
                 quote_number=quote_number,
@@ -265,7 +413,7 @@ class QuoteService:
                 total_amount=total_amount,
                 shipping_address=summary.shipping_address,
                 delivery_terms=summary.delivery_deadline or "Standard delivery within lead time",
-                notes=quote_description,
+                notes=await description_task if description_task else None,
                 line_items=line_items
             )
             
@@ -273,9 +421,226 @@ class QuoteService:
             return quote
             
         except Exception as e:
+            if description_task is not None:
+                description_task.cancel()
             logger.error(f"Error generating quote: {e}")
             raise
     
+    async def fill_quote_description(self, quote_number: str, summary: EmailSummary) -> None:
+        """
+        Generate the AI description for a saved quote and store it as notes
+        
+        Runs after the response has been sent, so it uses its own session.
+        Notes that were edited in the meantime are left alone.
+        
+        Args:
+            quote_number: Saved quote number
+            summary: Email summary the quote was generated from
+        """
+        try:
+            description = await self.generate_description(summary)
+            async with get_db_context() as db:
+                await db.execute(
+                    _FILL_DESCRIPTION_QUERY, {"notes": description, "quote_number": quote_number}
+                )
+                await db.commit()
+            logger.info(f"Stored description for quote {quote_number}")
+        except Exception as e:
+            logger.error(f"Error storing description for quote {quote_number}: {e}")
+    
+    async def generate_description(
+        self,
+        summary: EmailSummary,
+        on_token: Optional[TokenCallback] = None
+    ) -> str:
+        """
+        AI quote description from the requested products in the summary
+        
+        Args:
+            summary: Email summary the quote is generated from
+            on_token: Called with each fragment of the description as it streams
+            
+        Returns:
+            Description text
+        """
+        products_info = [
+            {
+                "product_name": product,
+                "quantity": self._extract_quantity(summary.quantities, product)
+            }
+            for product in summary.requested_products
+        ]
+        return await azure_openai_service.generate_quote_description(
+            summary.model_dump(), products_info, on_token=on_token
+        )
+    
+    async def save_quote(
+        self,
+        db: AsyncSession,
+        quote: QuoteWithLineItems
+    ) -> QuoteWithLineItems:
+        """
+        Persist a generated quote and its line items
+        
+        The customer, contact and owning sales rep are resolved from the
+        customer's contact email.
+        
+        Args:
+            db: Async database session
+            quote: Generated quote with line items
+            
+        Returns:
+            The quote with its database quote_id set
+            
+        Raises:
+            ValueError: If the customer email does not match a CRM contact
+        """
+        try:
+            result = await db.execute(_INSERT_QUOTE_QUERY, {
+                "customer_email": quote.customer_email,
+                "quote_number": quote.quote_number,
+                "quote_name": f"Quote for {quote.customer_company or quote.customer_name}",
+                "status": quote.status,
+                "quote_date": quote.quote_date,
+                "valid_until": quote.valid_until,
+                "subtotal": quote.subtotal,
+                "discount_amount": quote.discount_amount,
+                "tax_rate": quote.tax_rate,
+                "tax_amount": quote.tax_amount,
+                "shipping_amount": quote.shipping_amount,
+                "total_amount": quote.total_amount,
+                "delivery_terms": quote.delivery_terms,
+                "payment_terms": quote.payment_terms,
+                "notes": quote.notes,
+                "thread_id": quote.thread_id,
+                "shipping_address": quote.shipping_address,
+                "template_code": quote.template_code
+            })
+            quote_id = result.scalar()
+            
+            if quote_id is None:
+                raise ValueError(f"No CRM contact found for {quote.customer_email}")
+            
+            if quote.line_items:
+                await db.execute(_INSERT_LINE_ITEM_QUERY, [
+                    {"quote_id": quote_id, **item.dict()}
+                    for item in quote.line_items
+                ])
+            
+            await db.commit()
+            
+            quote.quote_id = quote_id
+            logger.info(f"Saved quote {quote.quote_number} with id {quote_id}")
+            return quote
+            
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error saving quote {quote.quote_number}: {e}")
+            raise
+    
+    async def get_quote_by_number(
+        self,
+        db: AsyncSession,
+        quote_number: str
+    ) -> Optional[QuoteWithLineItems]:
+        """
+        Load a stored quote with its line items in a single query
+        
+        Args:
+            db: Async database session
+            quote_number: Quote number
+            
+        Returns:
+            QuoteWithLineItems, or None if the quote does not exist
+        """
+        row = (await db.execute(_QUOTE_BY_NUMBER_QUERY, {"quote_number": quote_number})).fetchone()
+        if not row:
+            return None
+        
+        return self._row_to_quote(row)
+    
+    async def list_quotes(
+        self,
+        db: AsyncSession,
+        customer_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        status: Optional[str] = None,
+        limit: int = 500
+    ) -> List[QuoteWithLineItems]:
+        """
+        Load stored quotes matching a filter, newest first
+        
+        Args:
+            db: Async database session
+            customer_id: Only quotes for this customer
+            date_from: Earliest quote date (inclusive)
+            date_to: Latest quote date (inclusive)
+            status: Quote status code (e.g. draft, sent, accepted)
+            limit: Maximum number of quotes returned
+            
+        Returns:
+            List of quotes with line items
+        """
+        conditions = []
+        params: Dict[str, Any] = {"limit": limit}
+        
+        if customer_id is not None:
+            conditions.append("q.customer_id = :customer_id")
+            params["customer_id"] = customer_id
+        if date_from is not None:
+            conditions.append("q.quote_date >= :date_from")
+            params["date_from"] = date_from
+        if date_to is not None:
+            conditions.append("q.quote_date <= :date_to")
+            params["date_to"] = date_to
+        if status:
+            conditions.append("qs.status_code = UPPER(:status)")
+            params["status"] = status
+        
+        query = queries.variant(
+            "quotes.list",
+            tuple(conditions),
+            lambda: _QUOTE_SELECT
+            + (f"WHERE {' AND '.join(conditions)} " if conditions else "")
+            + "ORDER BY q.quote_date DESC, q.quote_id DESC LIMIT :limit"
+        )
+        
+        result = await db.execute(query, params)
+        return [self._row_to_quote(row) for row in result.fetchall()]
+    
+    def _row_to_quote(self, row) -> QuoteWithLineItems:
+        """Build a quote model from a _QUOTE_SELECT row"""
+        line_items = row.line_items
+        if isinstance(line_items, str):
+            line_items = json.loads(line_items, parse_float=Decimal)
+        
+        return QuoteWithLineItems(
+            quote_id=row.quote_id,
+            quote_number=row.quote_number,
+            thread_id=row.source_thread_id,
+            customer_name=row.customer_name,
+            customer_email=row.customer_email,
+            customer_company=row.customer_company,
+            quote_date=row.quote_date,
+            valid_until=row.valid_until,
+            subtotal=row.subtotal,
+            discount_amount=row.discount_amount or Decimal("0.00"),
+            tax_rate=row.tax_rate or Decimal("0.00"),
+            tax_amount=row.tax_amount or Decimal("0.00"),
+            shipping_amount=row.shipping_amount or Decimal("0.00"),
+            total_amount=row.total_amount,
+            shipping_address=row.shipping_address_text,
+            payment_terms=row.payment_terms or "Net 30",
+            delivery_terms=row.delivery_terms,
+            notes=row.notes,
+            status=(row.status_code or "draft").lower(),
+            template_code=row.template_code,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            line_items=[QuoteLineItem(**item) for item in line_items]
+        )
+    
     def _extract_product_codes(self, product_names: List[str]) -> List[str]:
         """
         Extract or map product codes from product names
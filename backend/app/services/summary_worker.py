@@ -0,0 +1,184 @@
+"""
+Background batch summarization of email threads with new messages
+
+Runs inside the API process when SUMMARY_WORKER_ENABLED is set, or as a
+separate process:
+
+    python -m app.services.summary_worker [--once]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+from app.config import settings
+from app.services.azure_openai_service import azure_openai_service, SUMMARIZATION_PROMPT_VERSION
+from app.services.email_service import email_service
+from app.utils.database import get_db_context, close_db
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryWorker:
+    """Summarizes threads whose newest message is not covered by a logged summary"""
+
+    def __init__(self):
+        """Initialize worker"""
+        self.batch_size = settings.SUMMARY_WORKER_BATCH_SIZE
+        self.concurrency = settings.SUMMARY_WORKER_CONCURRENCY
+        self.poll_seconds = settings.SUMMARY_WORKER_POLL_SECONDS
+        self.max_backoff_seconds = settings.SUMMARY_WORKER_MAX_BACKOFF_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        # thread_id -> (consecutive failures, monotonic time of next attempt)
+        self._failures: Dict[int, Tuple[int, float]] = {}
+
+    async def find_pending_threads(self) -> List[int]:
+        """
+        Threads with messages newer than their latest summary, newest first
+
+        Threads whose summarization recently failed are skipped until their
+        backoff expires, so they do not take the batch from the rest of the
+        backlog.
+
+        Returns:
+            Up to batch_size thread IDs
+        """
+        now = time.monotonic()
+        backing_off = [thread_id for thread_id, (_, retry_at) in self._failures.items() if retry_at > now]
+        async with get_db_context() as db:
+            result = await db.execute(text("""
+                SELECT t.thread_id
+                FROM crm.crm_email_thread t
+                LEFT JOIN LATERAL (
+                    SELECT (l.input_data->>'last_message_at')::timestamptz as summarized_through
+                    FROM crm.crm_ai_recommendation_log l
+                    WHERE l.recommendation_type = 'EMAIL_SUMMARY'
+                      AND l.reference_type = 'EMAIL_THREAD'
+                      AND l.reference_id = t.thread_id
+                      AND l.input_data->>'prompt_version' = :prompt_version
+                    ORDER BY l.created_at DESC, l.recommendation_id DESC
+                    LIMIT 1
+                ) s ON true
+                WHERE t.last_message_at IS NOT NULL
+                  AND t.thread_id <> ALL(:backing_off)
+                  AND (s.summarized_through IS NULL OR s.summarized_through < t.last_message_at)
+                  AND EXISTS (SELECT 1 FROM crm.crm_email_message m WHERE m.thread_id = t.thread_id)
+                ORDER BY t.last_message_at DESC
+                LIMIT :limit
+            """), {
+                "prompt_version": SUMMARIZATION_PROMPT_VERSION,
+                "backing_off": backing_off,
+                "limit": self.batch_size
+            })
+            return [row.thread_id for row in result.fetchall()]
+
+    async def run_once(self) -> int:
+        """
+        Summarize one batch of pending threads
+
+        Returns:
+            Number of threads summarized
+        """
+        thread_ids = await self.find_pending_threads()
+        if not thread_ids:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def summarize(thread_id: int) -> bool:
+            async with semaphore:
+                summarized = await self._summarize_thread(thread_id)
+            if summarized:
+                self._failures.pop(thread_id, None)
+            else:
+                self._record_failure(thread_id)
+            return summarized
+
+        results = await asyncio.gather(*(summarize(thread_id) for thread_id in thread_ids))
+        done = sum(results)
+        logger.info(f"Summarized {done}/{len(thread_ids)} pending email threads")
+        return done
+
+    async def run_forever(self) -> None:
+        """Process batches until stopped, sleeping when there is no backlog"""
+        while not self._stopping.is_set():
+            try:
+                if await self.run_once() >= self.batch_size:
+                    continue  # Full batch, there may be more backlog
+            except Exception as e:
+                logger.error(f"Summary worker batch failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Run the worker as a task on the current event loop"""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+            logger.info("Email summary worker started")
+
+    async def stop(self) -> None:
+        """Stop the worker task"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _record_failure(self, thread_id: int) -> None:
+        """Back off a thread exponentially, from poll_seconds up to max_backoff_seconds"""
+        failures = self._failures.get(thread_id, (0, 0.0))[0] + 1
+        delay = min(self.poll_seconds * 2 ** (failures - 1), self.max_backoff_seconds)
+        self._failures[thread_id] = (failures, time.monotonic() + delay)
+        logger.warning(f"Retrying email thread {thread_id} in {delay}s after {failures} failed attempt(s)")
+
+    async def _summarize_thread(self, thread_id: int) -> bool:
+        """Summarize one thread in its own session, incrementally where possible"""
+        try:
+            async with get_db_context() as db:
+                thread = await email_service.get_thread_by_id(db, thread_id)
+                if not thread or not thread.messages:
+                    return False
+
+                await email_service.summarize_thread(db, thread_id, thread=thread)
+                return True
+        except Exception as e:
+            logger.error(f"Failed to summarize email thread {thread_id}: {e}")
+            return False
+
+
+# Global worker instance
+summary_worker = SummaryWorker()
+
+
+async def _main(once: bool) -> None:
+    try:
+        if once:
+            await summary_worker.run_once()
+        else:
+            await summary_worker.run_forever()
+    finally:
+        await azure_openai_service.close()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize email threads with new messages")
+    parser.add_argument("--once", action="store_true", help="Process a single batch and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(_main(args.once))
@@ -1,4 +1,9 @@
 """Utilities module"""
-from .database import get_db, get_db_context, test_db_connection, init_db
+from .database import get_db, get_db_context, test_db_connection, init_db, close_db
+from .cache import TTLCache, DiskCache
+from .thread_compaction import count_tokens, chunk_thread
+from .sse import sse_event, sse_response
+from .queries import QueryRegistry, queries
 
-__all__ = ["get_db", "get_db_context", "test_db_connection", "init_db"]
+__all__ = ["get_db", "get_db_context", "test_db_connection", "init_db", "close_db", "TTLCache", "DiskCache",
+           "count_tokens", "chunk_thread", "sse_event", "sse_response", "QueryRegistry", "queries"]
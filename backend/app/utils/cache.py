@@ -0,0 +1,214 @@
+"""
+Caching utilities: in-process L1 cache (see ADR-006) and persistent disk cache
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import json
+import os
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry time-to-live
+
+    Entries are evicted least-recently-used first once ``maxsize`` is
+    reached, and are treated as missing once older than ``ttl`` seconds.
+    Hit/miss/eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300.0):
+        """
+        Initialize cache
+
+        Args:
+            maxsize: Maximum number of entries kept in memory
+            ttl: Entry time-to-live in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries"""
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        Remove entries from the cache
+
+        Args:
+            predicate: Optional filter on keys; all entries are removed if omitted
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if predicate is None:
+                removed = len(self._data)
+                self._data.clear()
+                return removed
+
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries and reset counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    Persistent JSON cache stored as one file per key on local disk
+
+    Entries older than ``ttl`` seconds are treated as missing, and the
+    directory is pruned back to ``max_entries`` (oldest first) as new
+    entries are written.
+    """
+
+    def __init__(self, directory: str, ttl: float = 86400.0, max_entries: int = 5000):
+        """
+        Initialize cache
+
+        Args:
+            directory: Directory holding cache files
+            ttl: Entry time-to-live in seconds
+            max_entries: Maximum number of files kept on disk
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                self.misses += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Atomically write value under key"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+
+        # Prune in batches so writes stay cheap
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= max(1, self.max_entries // 10):
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Remove expired entries and the oldest entries beyond max_entries
+
+        Returns:
+            Number of files removed
+        """
+        self._writes_since_prune = 0
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        entries.sort()
+        expired = [path for mtime, path in entries if now - mtime > self.ttl]
+        live = [path for mtime, path in entries if now - mtime <= self.ttl]
+        overflow = live[:max(0, len(live) - self.max_entries)]
+
+        removed = 0
+        for path in expired + overflow:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        return {
+            "directory": self.directory,
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
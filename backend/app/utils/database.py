@@ -1,65 +1,67 @@
 """
 Database connection and utilities
 """
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.ext.declarative import declarative_base
-from contextlib import contextmanager
-from typing import Generator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
 import logging
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Create database engine
-engine = create_engine(
-    settings.database_url,
+# Create async database engine (asyncpg driver)
+engine = create_async_engine(
+    settings.async_database_url,
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    # asyncpg prepares every statement; keep enough per connection for all
+    # registered statements and filter variants (app.utils.queries)
+    connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Dependency to get database session
-    Usage in FastAPI: db: Session = Depends(get_db)
+    Dependency to get async database session
+    Usage in FastAPI: db: AsyncSession = Depends(get_db)
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-@contextmanager
-def get_db_context():
+@asynccontextmanager
+async def get_db_context():
     """
-    Context manager for database sessions
-    Usage: 
-        with get_db_context() as db:
-            # do database operations
+    Async context manager for database sessions
+    Usage:
+        async with get_db_context() as db:
+            # await database operations
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def test_db_connection() -> bool:
+async def test_db_connection() -> bool:
     """Test database connectivity"""
     try:
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
         logger.info("Database connection successful")
         return True
     except Exception as e:
@@ -67,11 +69,18 @@ def test_db_connection() -> bool:
         return False
 
 
-def init_db():
+async def init_db():
     """Initialize database - create tables if they don't exist"""
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
+
+
+async def close_db():
+    """Dispose of the connection pool on shutdown"""
+    await engine.dispose()
+    logger.info("Database connection pool closed")
@@ -0,0 +1,92 @@
+"""
+Registry of compiled SQL statements
+
+Statements are wrapped in text() once, at import, instead of on every
+request, and statements assembled from optional filters are compiled once
+per filter combination and kept in a small LRU cache. Every statement and
+variant therefore has a single, stable SQL text, which is what lets the
+asyncpg driver reuse its server-side prepared statement for it on each
+pooled connection (see DB_PREPARED_STATEMENT_CACHE_SIZE) instead of parsing
+and planning it again.
+"""
+import logging
+from typing import Callable, Dict, Hashable
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRegistry:
+    """Named static statements and an LRU cache of dynamic statement variants"""
+
+    def __init__(self, max_variants: int = 256):
+        """
+        Initialize registry
+
+        Args:
+            max_variants: Dynamic statement variants kept compiled
+        """
+        self._statements: Dict[str, TextClause] = {}
+        self._variants = TTLCache(maxsize=max_variants, ttl=float("inf"))
+
+    def register(self, name: str, sql: str) -> TextClause:
+        """
+        Compile a static statement under a unique name
+
+        Args:
+            name: Statement name, e.g. "quotes.by_number"
+            sql: Statement text with :named bind parameters
+
+        Returns:
+            The compiled statement
+        """
+        if name in self._statements:
+            raise ValueError(f"Statement {name} is already registered")
+        statement = text(sql)
+        self._statements[name] = statement
+        return statement
+
+    def get(self, name: str) -> TextClause:
+        """Registered statement by name"""
+        return self._statements[name]
+
+    def variant(self, name: str, key: Hashable, build: Callable[[], str]) -> TextClause:
+        """
+        Compiled variant of a dynamic statement
+
+        build is only called the first time a variant is needed, so key must
+        determine the SQL text completely (e.g. which filters are present),
+        while the filter values themselves stay bind parameters.
+
+        Args:
+            name: Statement family name
+            key: Hashable description of the variant
+            build: Returns the variant's SQL text
+
+        Returns:
+            The compiled variant
+        """
+        cache_key = (name, key)
+        statement = self._variants.get(cache_key)
+        if statement is None:
+            statement = text(build())
+            self._variants.set(cache_key, statement)
+        return statement
+
+    def stats(self) -> Dict[str, int]:
+        """Registered statements and variant cache counters"""
+        return {
+            "statements": len(self._statements),
+            "variants": len(self._variants),
+            "variant_hits": self._variants.hits,
+            "variant_misses": self._variants.misses,
+            "variant_evictions": self._variants.evictions,
+        }
+
+
+# Global registry instance
+queries = QueryRegistry()
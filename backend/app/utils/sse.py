@@ -0,0 +1,81 @@
+"""
+Server-sent events for streaming LLM output to the browser
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Emits one event: emit(event_name, data)
+EventEmitter = Callable[[str, Any], None]
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+}
+
+_DONE = object()
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event with a JSON payload"""
+    payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def event_stream(
+    producer: Callable[[EventEmitter], Awaitable[None]],
+    error_message: str
+) -> AsyncIterator[str]:
+    """
+    Run producer and yield the events it emits as they happen
+
+    The producer runs as a separate task so LLM token callbacks never wait
+    on the client. An exception in the producer is sent as an "error" event
+    and ends the stream; a client disconnect cancels the producer.
+
+    Args:
+        producer: Coroutine function that calls emit(event, data)
+        error_message: Prefix for the error event detail
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Any) -> None:
+        queue.put_nowait(sse_event(event, data))
+
+    async def run() -> None:
+        try:
+            await producer(emit)
+        except Exception as e:
+            logger.error(f"{error_message}: {e}")
+            emit("error", {"detail": f"{error_message}: {str(e)}"})
+        finally:
+            queue.put_nowait(_DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def sse_response(
+    producer: Callable[[EventEmitter], Awaitable[None]],
+    error_message: str
+) -> StreamingResponse:
+    """StreamingResponse with text/event-stream for event_stream(producer)"""
+    return StreamingResponse(
+        event_stream(producer, error_message),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -0,0 +1,276 @@
+"""
+Email thread compaction for LLM prompts
+
+Strips quoted history and signatures, drops repeated content, counts tokens
+locally and splits threads that exceed a token budget into chunks.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a character-based estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by gpt-4o deployments
+TOKEN_ENCODING = "o200k_base"
+
+# Rough characters per token when tiktoken is not installed or its encoding
+# cannot be loaded
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "\n[... message truncated ...]\n"
+MESSAGE_SEPARATOR = "\n---\n"
+
+# Lines that start quoted history; everything from here on is dropped
+_QUOTE_HEADER_PATTERNS = [
+    re.compile(r"^\s*On .+ wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Forwarded message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*_{10,}\s*$"),
+]
+
+# Outlook-style quote header: "From:" followed by "Sent:" or "Date:"
+_OUTLOOK_FROM = re.compile(r"^\s*\*?From:\*?\s.+$", re.IGNORECASE)
+_OUTLOOK_SENT = re.compile(r"^\s*\*?(Sent|Date):\*?\s.+$", re.IGNORECASE)
+
+# Lines that start a signature block
+_SIGNATURE_DELIMITER = re.compile(r"^--\s*$")
+_SIGN_OFF = re.compile(
+    r"\s*(?:((best|kind|warm)\s+)?(regards|wishes)|(many\s+)?thanks?(\s+you)?(\s+again)?"
+    r"|cheers|sincerely(\s+yours)?|respectfully)\s*[,.!]?\s*",
+    re.IGNORECASE
+)
+_MOBILE_FOOTER = re.compile(r"^\s*sent from my \w+", re.IGNORECASE)
+
+# A sign-off only starts a signature when few lines follow it, and all of
+# them are contact data: an email address, URL or phone number, or a
+# capitalized name, title or company line ("Fleet Manager, Acme Corp.")
+_MAX_SIGNATURE_LINES = 6
+_MAX_SIGNATURE_LINE_WORDS = 6
+_CONTACT_LINE = re.compile(
+    r"\S+@\S+\.\w+|https?://|www\."
+    r"|^((phone|tel|mobile|cell|fax|office|direct|[mtpfo])\.?\s*:?\s*)?[+(]?\d[\d\s().-]{5,}\d$",
+    re.IGNORECASE
+)
+_NAME_WORD = r"[A-Z][A-Za-z'&.-]*"
+_NAME_LINE = re.compile(
+    rf"{_NAME_WORD}(,?\s+({_NAME_WORD}|of|and|the|for|&))*"
+)
+
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+
+_encoding = None
+_encoding_unavailable = tiktoken is None
+
+
+def _get_encoding():
+    """
+    Local tokenizer, or None to use the characters-per-token estimate
+
+    tiktoken downloads the encoding on first use unless it is already in
+    TIKTOKEN_CACHE_DIR, so without network access loading it fails; that is
+    logged once and the estimate is used from then on.
+    """
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            _encoding_unavailable = True
+            logger.warning(
+                f"Could not load tiktoken encoding {TOKEN_ENCODING}, "
+                f"estimating {CHARS_PER_TOKEN} characters per token: {e}"
+            )
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count prompt tokens locally
+
+    Uses tiktoken when its encoding is available and a characters-per-token
+    estimate otherwise.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to about max_tokens, keeping its start and end
+
+    The opening of a message usually states the request and the end the
+    latest change to it, so the middle is what gets cut.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max(max_tokens - count_tokens(TRUNCATION_MARKER), 2)
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        head = encoding.decode(tokens[:budget * 2 // 3])
+        tail = encoding.decode(tokens[-(budget - budget * 2 // 3):])
+    else:
+        chars = budget * CHARS_PER_TOKEN
+        head = text[:chars * 2 // 3]
+        tail = text[-(chars - chars * 2 // 3):]
+    return head.rstrip() + TRUNCATION_MARKER + tail.lstrip()
+
+
+def strip_quoted_text(body: str) -> str:
+    """Remove quoted replies and forwarded history from a message body"""
+    lines = body.splitlines()
+    kept = []
+    for idx, line in enumerate(lines):
+        if any(pattern.match(line) for pattern in _QUOTE_HEADER_PATTERNS):
+            break
+        if (_OUTLOOK_FROM.match(line) and idx + 1 < len(lines)
+                and _OUTLOOK_SENT.match(lines[idx + 1])):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _is_signature_line(line: str) -> bool:
+    """
+    Name, title, company or contact line rather than message text
+
+    Lowercase words, digits, bullets and "Label:" lines are message content,
+    e.g. the items of a request after a mid-body "Thanks!".
+    """
+    line = line.strip()
+    if not line or _CONTACT_LINE.search(line):
+        return True
+    return len(line.split()) <= _MAX_SIGNATURE_LINE_WORDS and bool(_NAME_LINE.fullmatch(line))
+
+
+def strip_signature(body: str) -> str:
+    """Remove a trailing signature block from a message body"""
+    lines = body.splitlines()
+    for idx, line in enumerate(lines):
+        if _SIGNATURE_DELIMITER.match(line) or _MOBILE_FOOTER.match(line):
+            return "\n".join(lines[:idx]).strip()
+    # Sign-off on its own line, followed only by a short name/contact block;
+    # a "Thanks!" followed by more of the request is part of the message
+    while lines and not lines[-1].strip():
+        lines.pop()
+    for idx in range(len(lines) - 1, max(len(lines) - _MAX_SIGNATURE_LINES - 2, 0), -1):
+        if not _is_signature_line(lines[idx]) and not _SIGN_OFF.fullmatch(lines[idx].strip()):
+            break
+        if _SIGN_OFF.fullmatch(lines[idx].strip()) and all(
+            _is_signature_line(line) for line in lines[idx + 1:]
+        ):
+            return "\n".join(lines[:idx]).strip()
+    return body.strip()
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _paragraphs(body: str) -> List[str]:
+    return [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+
+
+def compact_messages(email_thread: List[Dict[str, Any]], start: int = 1) -> List[Dict[str, Any]]:
+    """
+    Strip quoted history and signatures and drop repeated content
+
+    Paragraphs already seen earlier in the thread are removed, and messages
+    left with no new content are dropped. Messages keep their position in
+    the thread as "number".
+
+    Args:
+        email_thread: Messages, oldest first
+        start: Thread position of the first message
+
+    Returns:
+        Compacted copies of the messages with a "number" key
+    """
+    seen = set()
+    compacted = []
+    for number, email in enumerate(email_thread, start):
+        body = strip_signature(strip_quoted_text(email.get("body_text") or ""))
+        paragraphs = []
+        for paragraph in _paragraphs(body):
+            key = _normalize(paragraph)
+            if key in seen:
+                continue
+            seen.add(key)
+            paragraphs.append(paragraph)
+        if not paragraphs:
+            continue
+        compacted.append({**email, "body_text": "\n\n".join(paragraphs), "number": number})
+    return compacted
+
+
+def format_message(email: Dict[str, Any], show_subject: bool = True) -> str:
+    """Format one compacted message for a prompt"""
+    lines = [
+        f"Message {email['number']}:",
+        f"From: {email.get('from_name') or 'Unknown'} <{email.get('from_email', '')}>",
+        f"Date: {email.get('sent_at', '')}",
+    ]
+    if show_subject:
+        lines.append(f"Subject: {email.get('subject', '')}")
+    lines.append("")
+    lines.append(email.get("body_text", ""))
+    return "\n".join(lines)
+
+
+def chunk_thread(
+    email_thread: List[Dict[str, Any]],
+    max_tokens: int,
+    start: int = 1
+) -> List[str]:
+    """
+    Compact a thread and format it into chunks of at most max_tokens each
+
+    A thread that fits the budget comes back as a single chunk, and an
+    empty thread as one empty chunk. Single messages larger than the
+    budget are truncated.
+
+    Args:
+        email_thread: Messages, oldest first
+        max_tokens: Token budget per chunk
+        start: Thread position of the first message
+
+    Returns:
+        Formatted conversation chunks, oldest first
+    """
+    messages = compact_messages(email_thread, start)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    separator_tokens = count_tokens(MESSAGE_SEPARATOR)
+    last_subject: Optional[str] = None
+
+    for email in messages:
+        subject = _normalize(_SUBJECT_PREFIX.sub("", email.get("subject") or ""))
+        text = format_message(email, show_subject=subject != last_subject)
+        last_subject = subject
+
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            logger.info(f"Truncating message {email['number']} from {tokens} to {max_tokens} tokens")
+            text = truncate_to_tokens(text, max_tokens)
+            tokens = count_tokens(text)
+        if current and current_tokens + separator_tokens + tokens > max_tokens:
+            chunks.append(MESSAGE_SEPARATOR.join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens + (separator_tokens if len(current) > 1 else 0)
+
+    if current or not chunks:
+        chunks.append(MESSAGE_SEPARATOR.join(current))
+    return chunks
@@ -0,0 +1,117 @@
+"""
+Offline benchmark of the summarize -> price -> describe quote pipeline
+
+Runs the same service calls as POST /quotes/generate (with an inline
+description) against the local LLM stub, so throughput, the concurrency cap
+and retry behavior can be measured without an Azure endpoint. Needs the CRM
+database. Run from the backend directory:
+
+    python benchmarks/llm_pipeline_benchmark.py --requests 200 --concurrency 50
+    LLM_STUB_RATE_LIMIT_RATE=0.1 LLM_STUB_ERROR_RATE=0.05 python benchmarks/llm_pipeline_benchmark.py
+
+Quotes are generated but not saved, and summaries are neither read from nor
+written to the recommendation log.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Must be set before the services are imported
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("SUMMARY_CACHE_ENABLED", "False")
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.models import QuoteDescriptionMode
+from app.services import azure_openai_service, email_service, quote_service
+from app.utils.database import get_db_context, close_db
+
+
+async def thread_ids_with_messages(limit: int):
+    async with get_db_context() as db:
+        result = await db.execute(text("""
+            SELECT t.thread_id FROM crm.crm_email_thread t
+            WHERE EXISTS (SELECT 1 FROM crm.crm_email_message m WHERE m.thread_id = t.thread_id)
+            ORDER BY t.thread_id
+            LIMIT :limit
+        """), {"limit": limit})
+        return [row.thread_id for row in result.fetchall()]
+
+
+async def generate(thread_id: int) -> float:
+    """One /quotes/generate equivalent; returns its latency in seconds"""
+    started = time.perf_counter()
+    async with get_db_context() as db:
+        thread = await email_service.get_thread_by_id(db, thread_id)
+        summary = await email_service.summarize_thread(
+            db, thread_id, thread=thread, use_precomputed=False, store=False
+        )
+        await quote_service.generate_quote_from_summary(
+            db=db,
+            summary=summary,
+            customer_name=thread.customer_name or "Customer",
+            customer_email=thread.customer_email or "",
+            description_mode=QuoteDescriptionMode.INLINE
+        )
+    return time.perf_counter() - started
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def main(requests: int, concurrency: int) -> None:
+    if settings.LLM_BACKEND != "stub":
+        sys.exit("This benchmark only runs against LLM_BACKEND=stub")
+
+    thread_ids = await thread_ids_with_messages(requests)
+    if not thread_ids:
+        sys.exit("No email threads with messages to benchmark")
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies, failures = [], []
+
+    async def one(i: int) -> None:
+        async with gate:
+            try:
+                latencies.append(await generate(thread_ids[i % len(thread_ids)]))
+            except Exception as e:
+                failures.append(f"{e.__class__.__name__}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    stats = azure_openai_service.client.stats
+    print(f"Requests: {requests} ({len(failures)} failed), client concurrency {concurrency}")
+    print(f"Stub latency {settings.LLM_STUB_LATENCY_MS:.0f}+/-{settings.LLM_STUB_LATENCY_JITTER_MS:.0f} ms, "
+          f"429 {settings.LLM_STUB_RATE_LIMIT_RATE:.0%}, 503 {settings.LLM_STUB_ERROR_RATE:.0%}, "
+          f"timeout {settings.LLM_STUB_TIMEOUT_RATE:.0%}")
+    print(f"Throughput:      {requests / elapsed:8.2f} quotes/s over {elapsed:.1f}s")
+    if latencies:
+        print(f"Latency p50/p95/p99: {statistics.median(latencies) * 1000:.0f} / "
+              f"{percentile(latencies, 0.95) * 1000:.0f} / {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"LLM calls:       {stats.calls} ({stats.completed} completed, {stats.rate_limited} x 429, "
+          f"{stats.server_errors} x 503, {stats.timeouts} timeouts)")
+    print(f"Max in flight:   {stats.max_in_flight} (cap AZURE_OPENAI_MAX_CONCURRENCY="
+          f"{settings.AZURE_OPENAI_MAX_CONCURRENCY})")
+    for failure in sorted(set(failures))[:5]:
+        print(f"  {failure}")
+
+    await azure_openai_service.close()
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: per-document PDF setup cost with and without precompiled templates
+
+Run from the backend directory:
+    python benchmarks/pdf_template_benchmark.py
+"""
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.models import QuoteWithLineItems, QuoteLineItem
+from app.services.pdf_service import pdf_service
+from app.services.pdf_template import QuotePDFTemplate
+
+
+def sample_quote() -> QuoteWithLineItems:
+    """Small quote comparable to a typical generated one"""
+    line_items = [
+        QuoteLineItem(
+            line_number=i,
+            product_code=f"CAT-{300 + i}",
+            product_name=f"CAT {300 + i} Excavator",
+            quantity=2,
+            unit_price=Decimal("125000.00"),
+            line_total=Decimal("250000.00"),
+        )
+        for i in range(1, 6)
+    ]
+    return QuoteWithLineItems(
+        quote_number="Q-BENCH-0001",
+        customer_name="Benchmark Customer",
+        customer_email="bench@example.com",
+        customer_company="Benchmark Construction",
+        valid_until=date.today() + timedelta(days=30),
+        subtotal=Decimal("1250000.00"),
+        tax_rate=Decimal("8.00"),
+        tax_amount=Decimal("100000.00"),
+        total_amount=Decimal("1350000.00"),
+        notes="Five excavators for the northern site expansion.",
+        line_items=line_items,
+    )
+
+
+def main(runs: int = 200) -> None:
+    quote = sample_quote()
+
+    # Setup only: what every render paid before vs. a shared template lookup
+    rebuilt = timeit.timeit(QuotePDFTemplate, number=runs) / runs
+    shared = timeit.timeit(lambda: pdf_service.get_template(None), number=runs) / runs
+
+    # End to end, to put the setup saving in context
+    render_rebuilt = timeit.timeit(
+        lambda: pdf_service.render_quote_pdf(quote, QuotePDFTemplate()), number=runs // 4
+    ) / (runs // 4)
+    render_shared = timeit.timeit(
+        lambda: pdf_service.render_quote_pdf(quote), number=runs // 4
+    ) / (runs // 4)
+
+    print(f"Per-document style setup, rebuilt:  {rebuilt * 1e6:10.1f} us")
+    print(f"Per-document style setup, shared:   {shared * 1e6:10.1f} us")
+    print(f"Full render, rebuilt styles:        {render_rebuilt * 1e3:10.2f} ms")
+    print(f"Full render, shared template:       {render_shared * 1e3:10.2f} ms")
+    print(f"Setup saving per document:          {(rebuilt - shared) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
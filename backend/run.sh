@@ -38,7 +38,7 @@ echo "✓ Output directories created"
 # Test database connection
 echo ""
 echo "Testing database connection..."
-python -c "from app.utils import test_db_connection; exit(0 if test_db_connection() else 1)"
+python -c "import asyncio; from app.utils import test_db_connection; exit(0 if asyncio.run(test_db_connection()) else 1)"
 if [ $? -eq 0 ]; then
     echo "✓ Database connection successful"
 else
@@ -0,0 +1,60 @@
+"""Tests for Azure OpenAI retry timing"""
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+from openai import APIConnectionError, RateLimitError
+
+from app.config import settings
+from app.services.azure_openai_service import azure_openai_service
+
+REQUEST = httpx.Request("POST", "https://example.openai.azure.com/openai/deployments/gpt-4o/chat/completions")
+
+
+def _rate_limited(headers=None):
+    response = httpx.Response(429, headers=headers or {}, request=REQUEST)
+    return RateLimitError("Too many requests", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def retry_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AZURE_OPENAI_RETRY_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "AZURE_OPENAI_RETRY_MAX_SECONDS", 30.0)
+
+
+class TestRetryDelay:
+    @pytest.mark.parametrize("attempt, ceiling", [(0, 1.0), (1, 2.0), (3, 8.0), (10, 30.0)])
+    def test_full_jitter_backoff_is_capped(self, attempt, ceiling):
+        error = APIConnectionError(request=REQUEST)
+        delays = [azure_openai_service._retry_delay(error, attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Jittered, not a fixed step
+        assert len(set(delays)) > 1
+
+    def test_status_error_without_retry_after_backs_off(self):
+        assert 0 <= azure_openai_service._retry_delay(_rate_limited(), 2) <= 4.0
+
+    def test_honors_retry_after_ms(self):
+        delay = azure_openai_service._retry_delay(_rate_limited({"retry-after-ms": "1500"}), 0)
+        assert 1.5 <= delay <= 2.0
+
+    def test_retry_after_ms_takes_precedence(self):
+        error = _rate_limited({"retry-after-ms": "250", "retry-after": "20"})
+        assert 0.25 <= azure_openai_service._retry_delay(error, 0) <= 0.75
+
+    def test_honors_retry_after_seconds(self):
+        delay = azure_openai_service._retry_delay(_rate_limited({"retry-after": "7"}), 0)
+        assert 7.0 <= delay <= 7.5
+
+    def test_honors_retry_after_http_date(self):
+        error = _rate_limited({"retry-after": formatdate(time.time() + 10, usegmt=True)})
+        assert 8.0 <= azure_openai_service._retry_delay(error, 0) <= 10.5
+
+    def test_retry_after_is_capped(self):
+        delay = azure_openai_service._retry_delay(_rate_limited({"retry-after": "600"}), 0)
+        assert 30.0 <= delay <= 30.5
+
+    def test_invalid_retry_after_falls_back_to_backoff(self):
+        delay = azure_openai_service._retry_delay(_rate_limited({"retry-after": "soon"}), 1)
+        assert 0 <= delay <= 2.0
@@ -0,0 +1,149 @@
+"""Tests for mock-mail parsing and corpus synthesis"""
+from datetime import datetime, timedelta, timezone
+
+from app.services.mail_ingest import MockMessage, MockThread, parse_conversations, synthesize
+
+MOCK_MAIL = """\
+## Section 1
+
+### Conversation 1: Excavator Inquiry
+
+**Subject:** Inquiry about CAT 320 Excavator
+
+**From:** John Martinez (Customer) <john.martinez@constructionpro.com>
+**To:** Sarah Johnson (Salesperson) <sarah.johnson@heavyequipdealer.com>
+**Date:** November 15, 2025 09:30 AM
+
+---
+
+Hi,
+
+Could you send me some information?
+
+---
+
+**From:** Sarah Johnson (Salesperson) <sarah.johnson@heavyequipdealer.com>
+**To:** John Martinez (Customer) <john.martinez@constructionpro.com>, Ops (Manager) <ops@constructionpro.com>
+**CC:** Team Lead (Manager) <lead@heavyequipdealer.com>
+**Date:** November 15, 2025 11:00 AM
+
+---
+
+Brochure attached.
+
+---
+
+**Subject:** Financing question
+
+**From:** John Martinez (Customer) <john.martinez@constructionpro.com>
+**To:** Sarah Johnson (Salesperson) <sarah.johnson@heavyequipdealer.com>
+**Date:** 2025-11-20 08:00
+
+---
+
+Do you offer financing?
+
+---
+
+*[Deal closed - customer went with a competitor]*
+
+---
+
+### Conversation 2: Bad Date
+
+**Subject:** Wheel loaders
+
+**From:** Maria Garcia (Customer) <maria.garcia@smallcontractors.com>
+**Date:** sometime next week
+
+---
+
+Hello.
+
+---
+"""
+
+
+def _parse(text):
+    return list(parse_conversations(text.splitlines(keepends=True)))
+
+
+class TestParseConversations:
+    def test_parses_messages_and_headers(self):
+        thread = _parse(MOCK_MAIL)[0]
+        assert thread.title == "Conversation 1: Excavator Inquiry"
+        assert thread.subject == "Inquiry about CAT 320 Excavator"
+        assert [m.subject for m in thread.messages] == [
+            "Inquiry about CAT 320 Excavator",
+            "RE: Inquiry about CAT 320 Excavator",
+        ]
+
+        first, reply = thread.messages
+        assert (first.from_name, first.from_role, first.from_email) == (
+            "John Martinez", "Customer", "john.martinez@constructionpro.com"
+        )
+        assert first.body_text == "Hi,\n\nCould you send me some information?"
+        assert first.sent_at == datetime(2025, 11, 15, 9, 30, tzinfo=timezone.utc)
+        assert first.direction == "INBOUND"
+        assert reply.direction == "OUTBOUND"
+        assert reply.to_emails == ["john.martinez@constructionpro.com", "ops@constructionpro.com"]
+        assert reply.cc_emails == ["lead@heavyequipdealer.com"]
+        assert thread.customer_email == "john.martinez@constructionpro.com"
+
+    def test_subject_after_messages_starts_new_thread(self):
+        threads = _parse(MOCK_MAIL)
+        assert [t.subject for t in threads] == ["Inquiry about CAT 320 Excavator", "Financing question"]
+        financing = threads[1]
+        assert financing.title == threads[0].title
+        assert financing.messages[0].sent_at == datetime(2025, 11, 20, 8, 0, tzinfo=timezone.utc)
+
+    def test_closed_note_marks_thread_closed(self):
+        first, financing = _parse(MOCK_MAIL)
+        assert first.status == "OPEN"
+        assert financing.status == "CLOSED"
+
+    def test_skips_unparseable_message(self, caplog):
+        # Conversation 2 has no valid message, so it yields no thread
+        assert len(_parse(MOCK_MAIL)) == 2
+        assert "Unrecognized date" in caplog.text
+
+
+def _template(hours):
+    sent = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return MockThread(subject="Quote", messages=[
+        MockMessage(
+            from_name="A", from_email="a@example.com", from_role="Customer", to_emails=[],
+            cc_emails=[], subject="Quote", body_text="Body", sent_at=sent + timedelta(hours=h)
+        )
+        for h in hours
+    ])
+
+
+class TestSynthesize:
+    def test_produces_target_message_count(self):
+        threads = list(synthesize([_template([0, 1, 2])], target_messages=7))
+        assert sum(len(t.messages) for t in threads) == 7
+        assert [t.subject for t in threads] == ["Quote [#1]", "Quote [#2]", "Quote [#3]"]
+
+    def test_keeps_spacing_within_span_and_not_in_future(self):
+        before = datetime.now(timezone.utc)
+        threads = list(synthesize([_template([0, 24, 72])], target_messages=300, span_days=5))
+        after = datetime.now(timezone.utc)
+        for thread in threads:
+            sent = [m.sent_at for m in thread.messages]
+            assert [s - sent[0] for s in sent] == [timedelta(0), timedelta(hours=24), timedelta(hours=72)]
+            assert sent[-1] <= after
+            assert sent[0] >= before - timedelta(days=5)
+
+    def test_template_longer_than_span_ends_now(self):
+        thread = next(synthesize([_template([0, 24 * 10])], target_messages=2, span_days=1))
+        sent = [m.sent_at for m in thread.messages]
+        assert sent[1] - sent[0] == timedelta(days=10)
+        assert datetime.now(timezone.utc) - sent[1] < timedelta(seconds=5)
+
+    def test_is_reproducible_for_a_seed(self):
+        def run():
+            return [m.sent_at for t in synthesize([_template([0, 1])], 10, seed=3) for m in t.messages]
+        # Start times are relative to now, so compare the spacing between copies
+        first, second = run(), run()
+        assert [b - a for a, b in zip(first, first[1:])] == [b - a for a, b in zip(second, second[1:])]
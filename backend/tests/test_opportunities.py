@@ -0,0 +1,96 @@
+"""Tests for opportunity list paging helpers"""
+import base64
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.api.opportunities import _decode_cursor, _encode_cursor, _list_page_query
+
+
+class TestCursor:
+    @pytest.mark.parametrize("sort, value", [
+        ("created_at", datetime(2025, 11, 15, 9, 30, 12, 345678, tzinfo=timezone.utc)),
+        ("expected_close_date", date(2026, 3, 31)),
+        ("opportunity_number", "OPP-2025-0042"),
+        ("expected_close_date", None),
+    ])
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_round_trip(self, sort, value, order):
+        cursor = _encode_cursor(sort, order, value, 42)
+        assert _decode_cursor(cursor, sort, order) == (value, 42)
+
+    def test_cursor_is_url_safe(self):
+        cursor = _encode_cursor("opportunity_number", "asc", "OPP/??>>", 7)
+        assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+    @pytest.mark.parametrize("sort, order", [("created_at", "asc"), ("opportunity_number", "desc")])
+    def test_rejects_cursor_from_another_sort(self, sort, order):
+        cursor = _encode_cursor("opportunity_number", "asc", "OPP-001", 1)
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            _decode_cursor(cursor, sort, order)
+
+    @pytest.mark.parametrize("cursor", [
+        "not base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(json.dumps(["created_at", "asc", "x"]).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps(["created_at", "asc", "yesterday", 1]).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps(["created_at", "asc", None, "one"]).encode()).decode(),
+        "cursör",
+    ])
+    def test_rejects_malformed_cursor(self, cursor):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            _decode_cursor(cursor, "created_at", "asc")
+
+
+def _branches(sql):
+    """WHERE clauses of each UNION ALL branch"""
+    parts = sql.split(" UNION ALL ")
+    return [part.split(" WHERE ", 1)[1].split(" ORDER BY ")[0] for part in parts]
+
+
+class TestListPageQuery:
+    FILTER = "o.owner_id = :owner_id"
+
+    def test_first_page_is_a_single_query(self):
+        sql = _list_page_query("created_at", True, [self.FILTER], None)
+        assert "UNION ALL" not in sql
+        assert _branches(sql) == [self.FILTER]
+        assert sql.endswith("ORDER BY sort_value DESC, opportunity_id DESC LIMIT :limit")
+
+    def test_first_page_without_filters_has_no_where(self):
+        assert " WHERE " not in _list_page_query("created_at", False, [], None)
+
+    def test_null_cursor_descending_continues_into_non_null_values(self):
+        # NULLs come first descending, so the rest of the NULL block and then
+        # every non-NULL value follow the cursor
+        branches = _branches(_list_page_query("expected_close_date", True, [self.FILTER], "null"))
+        assert branches == [
+            f"{self.FILTER} AND o.expected_close_date IS NULL AND o.opportunity_id < :cursor_id",
+            f"{self.FILTER} AND o.expected_close_date IS NOT NULL",
+        ]
+
+    def test_null_cursor_ascending_stays_in_null_block(self):
+        # NULLs come last ascending, so only the rest of the NULL block follows
+        sql = _list_page_query("expected_close_date", False, [], "null")
+        assert "UNION ALL" not in sql
+        assert _branches(sql) == ["o.expected_close_date IS NULL AND o.opportunity_id > :cursor_id"]
+
+    def test_value_cursor_ascending_continues_into_null_block(self):
+        sql = _list_page_query("expected_close_date", False, [self.FILTER], "value")
+        assert _branches(sql) == [
+            f"{self.FILTER} AND (o.expected_close_date, o.opportunity_id) > (:cursor_value, :cursor_id)",
+            f"{self.FILTER} AND o.expected_close_date IS NULL",
+        ]
+        # Each branch is ordered and limited, then the union as a whole
+        assert sql.count("LIMIT :limit") == 3
+        assert sql.endswith("ORDER BY sort_value ASC, opportunity_id ASC LIMIT :limit")
+
+    def test_value_cursor_descending_has_no_null_branch(self):
+        sql = _list_page_query("created_at", True, [], "value")
+        assert _branches(sql) == ["(o.created_at, o.opportunity_id) < (:cursor_value, :cursor_id)"]
+
+    def test_value_cursor_on_non_nullable_sort_has_no_null_branch(self):
+        sql = _list_page_query("opportunity_number", False, [], "value")
+        assert "UNION ALL" not in sql
+        assert "IS NULL" not in sql
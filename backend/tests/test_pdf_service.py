@@ -0,0 +1,75 @@
+"""Tests for quote PDF content hashing"""
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.models import QuoteLineItem, QuoteWithLineItems
+from app.services.pdf_service import PDFService
+from app.services.pdf_template import QuotePDFTemplate
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_OUTPUT_DIR", str(tmp_path))
+    return PDFService()
+
+
+def _quote(**overrides):
+    fields = dict(
+        quote_number="Q-2025-0001",
+        customer_name="John Martinez",
+        customer_email="john.martinez@constructionpro.com",
+        quote_date=date(2025, 11, 15),
+        valid_until=date(2025, 12, 15),
+        subtotal=Decimal("250000.00"),
+        total_amount=Decimal("270000.00"),
+        line_items=[QuoteLineItem(
+            line_number=1, product_code="CAT-320", product_name="CAT 320 Excavator",
+            quantity=1, unit_price=Decimal("250000.00"), line_total=Decimal("250000.00")
+        )],
+    )
+    fields.update(overrides)
+    return QuoteWithLineItems(**fields)
+
+
+class TestQuoteFingerprint:
+    def test_is_stable_for_the_same_content(self, service):
+        fingerprint = service.quote_fingerprint(_quote())
+        assert fingerprint == service.quote_fingerprint(_quote())
+        assert len(fingerprint) == 64
+
+    def test_ignores_timestamps(self, service):
+        touched = _quote(created_at=datetime(2020, 1, 1), updated_at=datetime(2030, 1, 1))
+        assert service.quote_fingerprint(touched) == service.quote_fingerprint(_quote())
+
+    @pytest.mark.parametrize("overrides", [
+        {"total_amount": Decimal("270000.01")},
+        {"notes": "Delivery to Dallas"},
+        {"status": "sent"},
+        {"line_items": []},
+    ])
+    def test_changes_with_rendered_content(self, service, overrides):
+        assert service.quote_fingerprint(_quote(**overrides)) != service.quote_fingerprint(_quote())
+
+    def test_changes_with_line_item(self, service):
+        quote = _quote()
+        changed = quote.model_copy(deep=True)
+        changed.line_items[0].quantity = 2
+        assert service.quote_fingerprint(changed) != service.quote_fingerprint(quote)
+
+    def test_changes_with_template_layout(self, service):
+        quote = _quote(template_code="BRANDED")
+        before = service.quote_fingerprint(quote)
+        service._templates["BRANDED"] = QuotePDFTemplate("BRANDED", primary_color="#AA0000")
+        branded = service.quote_fingerprint(quote)
+        service._templates["BRANDED"] = QuotePDFTemplate("BRANDED", primary_color="#00AA00")
+        assert len({before, branded, service.quote_fingerprint(quote)}) == 3
+
+    def test_changes_with_template_version(self, service, monkeypatch):
+        before = service.quote_fingerprint(_quote())
+        # app.services.pdf_service is shadowed by the service instance of the same name
+        monkeypatch.setattr(sys.modules[PDFService.__module__], "PDF_TEMPLATE_VERSION", "test")
+        assert service.quote_fingerprint(_quote()) != before
@@ -0,0 +1,129 @@
+"""Tests for email thread compaction"""
+import pytest
+
+from app.utils import thread_compaction
+from app.utils.thread_compaction import (
+    CHARS_PER_TOKEN,
+    MESSAGE_SEPARATOR,
+    chunk_thread,
+    count_tokens,
+    strip_signature,
+)
+
+
+@pytest.fixture
+def estimated_tokens(monkeypatch):
+    """Count tokens with the characters-per-token estimate"""
+    monkeypatch.setattr(thread_compaction, "_encoding", None)
+    monkeypatch.setattr(thread_compaction, "_encoding_unavailable", True)
+
+
+def _email(body, subject="Excavator quote", sender="bob@example.com"):
+    return {
+        "from_name": "Bob",
+        "from_email": sender,
+        "subject": subject,
+        "sent_at": "2025-06-01T10:00:00",
+        "body_text": body,
+    }
+
+
+class TestStripSignature:
+    def test_keeps_request_after_mid_body_thanks(self):
+        body = "Hi Bob,\n\nThanks!\n\nWe need 5 excavators delivered to Dallas by June 1.\n\nJohn"
+        assert "We need 5 excavators delivered to Dallas by June 1." in strip_signature(body)
+
+    def test_keeps_request_after_thank_you_line(self):
+        body = "Hello,\nThank you.\nPlease also add two wheel loaders to the quote."
+        assert strip_signature(body) == body
+
+    def test_keeps_item_list_after_mid_body_thanks(self):
+        body = "Hi Sarah,\n\nThanks!\nCould you also add:\n- 2x CAT 320 excavators\n- 1x D6 dozer"
+        assert strip_signature(body) == body
+
+    def test_keeps_short_item_lines_after_thanks(self):
+        assert strip_signature("Hi,\nThanks!\nQty: 3\nModel: D6") == "Hi,\nThanks!\nQty: 3\nModel: D6"
+        assert strip_signature("Hi,\nThanks\nCAT 320\nD6 Dozer") == "Hi,\nThanks\nCAT 320\nD6 Dozer"
+
+    def test_strips_title_and_labelled_phone(self):
+        body = "Please quote.\n\nThanks,\nJohn\nVP of Sales\nM: +1 555 123 4567\nwww.acme.com"
+        assert strip_signature(body) == "Please quote."
+
+    def test_strips_sign_off_and_contact_block(self):
+        body = (
+            "Hi,\nPlease quote 3 wheel loaders.\n\n"
+            "Best regards,\nJohn Smith\nFleet Manager, Acme Corp.\n"
+            "Phone: (555) 123-4567\njohn.smith@acme.com\n"
+        )
+        assert strip_signature(body) == "Hi,\nPlease quote 3 wheel loaders."
+
+    def test_strips_sign_off_with_name(self):
+        assert strip_signature("Please quote 3 wheel loaders.\n\nThanks,\nJohn") == "Please quote 3 wheel loaders."
+
+    def test_strips_after_delimiter_and_mobile_footer(self):
+        assert strip_signature("See you Monday.\n-- \nJohn Smith") == "See you Monday."
+        assert strip_signature("Confirmed.\n\nSent from my iPhone") == "Confirmed."
+
+    def test_keeps_message_that_is_only_a_sign_off(self):
+        assert strip_signature("Thanks!") == "Thanks!"
+
+
+class TestTokenCounting:
+    def test_estimate_when_encoding_unavailable(self, estimated_tokens):
+        assert count_tokens("x" * (CHARS_PER_TOKEN * 3 + 1)) == 4
+        assert count_tokens("") == 0
+
+    def test_encoding_load_failure_falls_back_once(self, monkeypatch):
+        calls = []
+
+        class OfflineTiktoken:
+            @staticmethod
+            def get_encoding(name):
+                calls.append(name)
+                raise ConnectionError("Name resolution failed")
+
+        monkeypatch.setattr(thread_compaction, "tiktoken", OfflineTiktoken)
+        monkeypatch.setattr(thread_compaction, "_encoding", None)
+        monkeypatch.setattr(thread_compaction, "_encoding_unavailable", False)
+
+        assert count_tokens("x" * CHARS_PER_TOKEN * 2) == 2
+        assert count_tokens("x" * CHARS_PER_TOKEN) == 1
+        assert len(calls) == 1
+
+
+class TestChunkThread:
+    def test_empty_thread_is_one_empty_chunk(self, estimated_tokens):
+        assert chunk_thread([], max_tokens=100) == [""]
+
+    def test_small_thread_is_one_chunk(self, estimated_tokens):
+        chunks = chunk_thread(
+            [_email("Please quote 3 wheel loaders."), _email("Add a bucket to each.")],
+            max_tokens=1000,
+        )
+        assert len(chunks) == 1
+        assert chunks[0].count("Message ") == 2
+        assert MESSAGE_SEPARATOR in chunks[0]
+
+    def test_drops_quoted_history_and_repeated_paragraphs(self, estimated_tokens):
+        first = "Please quote 3 wheel loaders for the Dallas site."
+        reply = f"Delivery by June 1 works.\n\n{first}\n\nOn Mon, Bob wrote:\n> {first}"
+        chunk = chunk_thread([_email(first), _email(reply, subject="RE: Excavator quote")], max_tokens=1000)[0]
+        assert chunk.count(first) == 1
+        assert "wrote:" not in chunk
+        # Subject is only repeated when it changes
+        assert chunk.count("Subject:") == 1
+
+    def test_splits_thread_over_budget(self, estimated_tokens):
+        thread = [_email(f"Message {n}: " + "word " * 40) for n in range(4)]
+        chunks = chunk_thread(thread, max_tokens=80)
+        assert len(chunks) > 1
+        assert all(count_tokens(chunk) <= 80 for chunk in chunks)
+        assert "".join(chunks).count("Message 4:") == 1
+
+    def test_truncates_single_oversized_message(self, estimated_tokens):
+        body = "start " + "filler " * 400 + "end"
+        chunks = chunk_thread([_email(body)], max_tokens=60)
+        assert len(chunks) == 1
+        assert thread_compaction.TRUNCATION_MARKER.strip() in chunks[0]
+        assert chunks[0].rstrip().endswith("end")
+        assert count_tokens(chunks[0]) <= 60
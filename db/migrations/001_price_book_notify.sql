@@ -0,0 +1,39 @@
+-- =====================================================================
+-- MIGRATION 001: Price book change notifications
+-- =====================================================================
+--
+-- Purpose: Notify API instances when erp_product_pricing changes so the
+--          in-process price book cache (L1, ADR-006) can drop stale entries
+--          before their TTL expires.
+--
+-- Payload: the affected product_code, sent on channel 'price_book_changed'.
+-- Enable in the backend with PRICE_CACHE_NOTIFY_CHANNEL=price_book_changed
+--
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION erp.notify_price_book_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_product_id INTEGER;
+    v_product_code VARCHAR(100);
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_product_id := OLD.product_id;
+    ELSE
+        v_product_id := NEW.product_id;
+    END IF;
+
+    SELECT product_code INTO v_product_code
+    FROM erp.erp_product
+    WHERE product_id = v_product_id;
+
+    PERFORM pg_notify('price_book_changed', COALESCE(v_product_code, ''));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_price_book_changed ON erp.erp_product_pricing;
+
+CREATE TRIGGER trg_price_book_changed
+AFTER INSERT OR UPDATE OR DELETE ON erp.erp_product_pricing
+FOR EACH ROW EXECUTE FUNCTION erp.notify_price_book_changed();
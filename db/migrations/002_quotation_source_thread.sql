@@ -0,0 +1,17 @@
+-- =====================================================================
+-- MIGRATION 002: Persist generated quotes with their source thread
+-- =====================================================================
+--
+-- Purpose: Quotes generated from email conversations are stored in
+--          crm_quotation so PDF downloads can load them by quote_number
+--          instead of regenerating them. These columns keep the source
+--          email thread and the free-text shipping address extracted by
+--          the summarizer (which has no crm_customer_address row).
+--
+-- =====================================================================
+
+ALTER TABLE crm.crm_quotation
+    ADD COLUMN IF NOT EXISTS source_thread_id INTEGER,
+    ADD COLUMN IF NOT EXISTS shipping_address_text TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_quote_source_thread ON crm.crm_quotation(source_thread_id);
@@ -0,0 +1,20 @@
+-- =====================================================================
+-- MIGRATION 003: Keyset pagination indexes for email threads
+-- =====================================================================
+--
+-- Purpose: GET /emails/ pages through threads ordered by
+--          (last_message_at DESC NULLS LAST, thread_id DESC), optionally
+--          filtered by status or customer. These indexes match that
+--          ordering so each page is an index range scan, however deep
+--          the cursor is.
+--
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_email_thread_last_message
+    ON crm.crm_email_thread (last_message_at DESC NULLS LAST, thread_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_email_thread_status_last_message
+    ON crm.crm_email_thread (status, last_message_at DESC NULLS LAST, thread_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_email_thread_customer_last_message
+    ON crm.crm_email_thread (customer_id, last_message_at DESC NULLS LAST, thread_id DESC);
@@ -0,0 +1,13 @@
+-- =====================================================================
+-- MIGRATION 004: Index messages by thread in send order
+-- =====================================================================
+--
+-- Purpose: GET /emails/{thread_id} loads the latest messages of a thread
+--          (optionally older than a given message) in a single query
+--          ordered by (sent_at, message_id). This index serves that
+--          ordering directly instead of sorting every message of the thread.
+--
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_email_message_thread_sent
+    ON crm.crm_email_message (thread_id, sent_at, message_id);
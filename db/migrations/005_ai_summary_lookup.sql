@@ -0,0 +1,14 @@
+-- =====================================================================
+-- MIGRATION 005: Latest-summary lookup on the AI recommendation log
+-- =====================================================================
+--
+-- Purpose: The background summary worker logs email thread summaries to
+--          crm_ai_recommendation_log (recommendation_type = 'EMAIL_SUMMARY',
+--          reference_type = 'EMAIL_THREAD'). Both the worker and
+--          POST /emails/{id}/summarize look up the newest summary per
+--          thread; this index serves that lookup without a sort.
+--
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_ai_rec_type_reference_date
+    ON crm.crm_ai_recommendation_log (recommendation_type, reference_type, reference_id, created_at DESC);
@@ -0,0 +1,74 @@
+-- =====================================================================
+-- MIGRATION 006: Incremental refresh of the pre-aggregated analytics
+-- =====================================================================
+--
+-- Purpose: The analytics refresher (app.services.analytics_refresher)
+--          keeps crm_pipeline_summary and crm_quote_analytics current by
+--          re-aggregating only the groups touched by opportunities and
+--          quotes changed since its last run.
+--
+--   - updated_at is maintained by trigger on crm_opportunity and
+--     crm_quotation, so it can serve as the change watermark
+--   - crm_aggregate_watermark records how far each aggregate has been
+--     refreshed
+--   - The *_member tables record the group each row was last counted in,
+--     so a row that moves (stage change, reassignment, closed) also
+--     refreshes the group it left
+--
+-- Hard deletes are not tracked; run the refresher with --full after
+-- deleting opportunities or quotes.
+--
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION crm.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_opportunity_touch ON crm.crm_opportunity;
+
+CREATE TRIGGER trg_opportunity_touch
+BEFORE UPDATE ON crm.crm_opportunity
+FOR EACH ROW EXECUTE FUNCTION crm.touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_quotation_touch ON crm.crm_quotation;
+
+CREATE TRIGGER trg_quotation_touch
+BEFORE UPDATE ON crm.crm_quotation
+FOR EACH ROW EXECUTE FUNCTION crm.touch_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_opportunity_updated ON crm.crm_opportunity (updated_at);
+CREATE INDEX IF NOT EXISTS idx_quote_updated ON crm.crm_quotation (updated_at);
+
+CREATE TABLE IF NOT EXISTS crm.crm_aggregate_watermark (
+    aggregate_name VARCHAR(100) PRIMARY KEY,
+    high_watermark TIMESTAMP WITH TIME ZONE NOT NULL,
+    rows_refreshed INTEGER DEFAULT 0,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Open opportunities and their crm_pipeline_summary group
+CREATE TABLE IF NOT EXISTS crm.crm_pipeline_summary_member (
+    opportunity_id INTEGER PRIMARY KEY,
+    sales_rep_id INTEGER,
+    team_id INTEGER,
+    stage_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_member_group
+    ON crm.crm_pipeline_summary_member (sales_rep_id, stage_id);
+
+-- Quotes and their crm_quote_analytics group
+CREATE TABLE IF NOT EXISTS crm.crm_quote_analytics_member (
+    quote_id INTEGER PRIMARY KEY,
+    analytics_date DATE NOT NULL,
+    sales_rep_id INTEGER,
+    team_id INTEGER,
+    industry_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_quote_analytics_member_group
+    ON crm.crm_quote_analytics_member (analytics_date, sales_rep_id);
@@ -0,0 +1,28 @@
+-- =====================================================================
+-- MIGRATION 007: Trigram indexes for opportunity search
+-- =====================================================================
+--
+-- Purpose: GET /api/v1/opportunities/search matches substrings (ILIKE)
+--          and misspellings (pg_trgm word similarity, <%) in opportunity
+--          name, number and description and in customer name. These GIN
+--          trigram indexes serve both operators, so a search reads only
+--          the matching rows instead of scanning the tables.
+--
+-- Requires the pg_trgm contrib extension (CREATE privilege on the
+-- database, or have a superuser create the extension first).
+--
+-- =====================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_opportunity_name_trgm
+    ON crm.crm_opportunity USING gin (opportunity_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_opportunity_number_trgm
+    ON crm.crm_opportunity USING gin (opportunity_number gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_opportunity_description_trgm
+    ON crm.crm_opportunity USING gin (description gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_customer_name_trgm
+    ON crm.crm_customer USING gin (customer_name gin_trgm_ops);